@@ -0,0 +1,110 @@
+"""
+Recall, throughput and memory of the local IVF index vs exact search.
+
+Builds indexes over synthetic clustered unit vectors (embedding-like:
+many topics, noisy members) at each corpus size and quantization, then
+for each nprobe reports recall@k against exact float32 search,
+single-query QPS, and the index size that queries page in. The exact
+baseline's memory is the float32 matrix it scans.
+
+    cd backend
+    python -m benchmarks.ann_benchmark --sizes 10000,100000,1000000 --dim 256
+
+1M vectors at dim 256 needs roughly 4 GB of RAM while building.
+"""
+import time
+import argparse
+import tempfile
+from typing import List
+
+import numpy as np
+
+from services.ann_index import build_ivf_index
+
+
+def synthetic_vectors(count: int, centers: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    topics, dim = centers.shape
+    vectors = np.empty((count, dim), dtype=np.float32)
+    for start in range(0, count, 100_000):
+        end = min(start + 100_000, count)
+        members = centers[rng.integers(0, topics, end - start)]
+        vectors[start:end] = members + 0.6 * rng.standard_normal((end - start, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    scores = queries @ vectors.T
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return top
+
+
+def qps(search, queries: np.ndarray) -> float:
+    start = time.perf_counter()
+    for query in queries:
+        search(query)
+    return len(queries) / (time.perf_counter() - start)
+
+
+def run_size(count: int, args, rng: np.random.Generator) -> List[dict]:
+    centers = rng.standard_normal((args.topics, args.dim)).astype(np.float32)
+    vectors = synthetic_vectors(count, centers, rng)
+    # Held-out queries from the same topics
+    queries = synthetic_vectors(args.queries, centers, rng)
+    truth = exact_top_k(vectors, queries, args.k)
+
+    rows = [{
+        "size": count,
+        "index": "exact float32",
+        "nprobe": "-",
+        "recall": 1.0,
+        "qps": qps(lambda q: np.argpartition(-(vectors @ q), args.k - 1)[:args.k], queries[:args.qps_queries]),
+        "mib": vectors.nbytes / 2**20,
+        "build_s": 0.0,
+    }]
+
+    for quantization in args.quantizations.split(","):
+        with tempfile.TemporaryDirectory() as tmp:
+            start = time.perf_counter()
+            index = build_ivf_index(vectors, f"{tmp}/index", quantization=quantization, seed=args.seed)
+            build_seconds = time.perf_counter() - start
+
+            for nprobe in (int(n) for n in args.nprobe.split(",")):
+                found = [index.search(query, args.k, nprobe)[0] for query in queries]
+                recall = np.mean([len(set(f) & set(t)) / args.k for f, t in zip(found, truth)])
+                rows.append({
+                    "size": count,
+                    "index": f"ivf {quantization} ({index.nlist} lists)",
+                    "nprobe": nprobe,
+                    "recall": recall,
+                    "qps": qps(lambda q: index.search(q, args.k, nprobe), queries[:args.qps_queries]),
+                    "mib": index.nbytes() / 2**20,
+                    "build_s": build_seconds,
+                })
+            del index
+    return rows
+
+
+def main(args):
+    rng = np.random.default_rng(args.seed)
+    header = f"{'size':>9} {'index':>28} {'nprobe':>6} {f'recall@{args.k}':>9} {'qps':>9} {'MiB':>9} {'build s':>8}"
+    print(header)
+    print("-" * len(header))
+    for count in (int(size) for size in args.sizes.split(",")):
+        for r in run_size(count, args, rng):
+            print(f"{r['size']:>9} {r['index']:>28} {r['nprobe']:>6} {r['recall']:>9.3f} "
+                  f"{r['qps']:>9.0f} {r['mib']:>9.1f} {r['build_s']:>8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--topics", type=int, default=2000, help="clusters in the synthetic corpus")
+    parser.add_argument("--quantizations", default="int8,float16")
+    parser.add_argument("--nprobe", default="1,4,8,16,32")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200, help="queries for recall")
+    parser.add_argument("--qps-queries", type=int, default=200, help="queries timed for QPS")
+    parser.add_argument("--seed", type=int, default=42)
+    main(parser.parse_args())
@@ -0,0 +1,260 @@
+"""
+Local stand-ins for Gemini, ElevenLabs, Pinecone and DuckDuckGo.
+
+Each upstream gets a latency distribution (log-normal around `median_ms`)
+and an error rate from a JSON profile, so load tests are reproducible and
+need no network access.
+
+Run standalone:
+    FAKE_UPSTREAM_PROFILE=benchmarks/profiles/default.json \
+        uvicorn benchmarks.fake_upstreams:app --port 9100
+
+Then start the backend with:
+    ELEVENLABS_BASE_URL=http://127.0.0.1:9100/v1
+    GEMINI_API_ENDPOINT=http://127.0.0.1:9100
+    PINECONE_INDEX_HOST=http://127.0.0.1:9100/pinecone
+    SEARCH_BASE_URL=http://127.0.0.1:9100/ddg
+"""
+import os
+import json
+import math
+import random
+import asyncio
+import hashlib
+from typing import Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+DEFAULT_PROFILE = {
+    "gemini": {"median_ms": 400, "sigma": 0.4, "error_rate": 0.0, "error_status": 429},
+    "embedding": {"median_ms": 60, "sigma": 0.3, "error_rate": 0.0, "error_status": 500},
+    "elevenlabs": {"median_ms": 350, "sigma": 0.4, "error_rate": 0.0, "error_status": 500},
+    "pinecone": {"median_ms": 40, "sigma": 0.3, "error_rate": 0.0, "error_status": 500},
+    "search": {"median_ms": 250, "sigma": 0.5, "error_rate": 0.0, "error_status": 500},
+}
+
+EMBEDDING_DIM = 768
+REALTIME_WORDS = ("news", "weather", "price", "today", "latest", "current", "score", "stock")
+
+TRANSCRIPTS = [
+    "What's the weather like in Chennai today?",
+    "Tell me a fun fact about octopuses.",
+    "How do I make a cup of masala chai?",
+    "What is the latest news about electric cars?",
+    "Explain what a neural network is in simple words.",
+    "Hello, how are you doing?",
+]
+
+CHUNKS = [
+    "Supervised learning trains a model on labelled examples so it can predict labels for new data.",
+    "Overfitting happens when a model memorises noise in the training data and fails to generalise.",
+    "A confusion matrix summarises true positives, false positives, true negatives and false negatives.",
+    "Gradient descent iteratively updates parameters in the direction that reduces the loss.",
+    "Principal component analysis projects data onto directions of maximum variance.",
+    "Cross-validation estimates generalisation by training and testing on different folds.",
+]
+
+
+def load_profile() -> dict:
+    profile = {k: dict(v) for k, v in DEFAULT_PROFILE.items()}
+    path = os.getenv("FAKE_UPSTREAM_PROFILE")
+    if path:
+        with open(path) as f:
+            for name, overrides in json.load(f).items():
+                profile.setdefault(name, {}).update(overrides)
+    return profile
+
+
+PROFILE = load_profile()
+RNG = random.Random(int(os.getenv("FAKE_UPSTREAM_SEED", "42")))
+
+app = FastAPI(title="Fake upstreams")
+
+
+async def simulate(upstream: str) -> Optional[Response]:
+    """Sleep for a sampled latency; return an error response if one is drawn."""
+    cfg = PROFILE[upstream]
+    median = cfg.get("median_ms", 100)
+    delay = median * math.exp(RNG.gauss(0, cfg.get("sigma", 0.3)))
+    await asyncio.sleep(delay / 1000)
+
+    if RNG.random() < cfg.get("error_rate", 0.0):
+        status = cfg.get("error_status", 500)
+        return JSONResponse({"error": {"code": status, "message": f"fake {upstream} error"}}, status_code=status)
+    return None
+
+
+def fake_vector(text: str) -> list:
+    seed = int(hashlib.sha256(text.encode()).hexdigest()[:8], 16)
+    rng = random.Random(seed)
+    values = [rng.gauss(0, 1) for _ in range(EMBEDDING_DIM)]
+    norm = math.sqrt(sum(v * v for v in values)) or 1.0
+    return [v / norm for v in values]
+
+
+def fake_mp3(text: str) -> bytes:
+    # ~128 kbps MPEG-1 Layer III frames; roughly 15 characters of speech per second
+    frame = b"\xff\xfb\x90\x64" + b"\x00" * 413
+    frames_per_second = 38
+    seconds = max(1, len(text) // 15)
+    return b"ID3\x03\x00\x00\x00\x00\x00\x00" + frame * (frames_per_second * seconds)
+
+
+# --------------------------------------------------
+# GEMINI
+# --------------------------------------------------
+def _parts(body: dict) -> list:
+    return [p for c in body.get("contents", []) for p in c.get("parts", [])]
+
+
+def _gemini_text(text: str) -> dict:
+    return {
+        "candidates": [{
+            "content": {"parts": [{"text": text}], "role": "model"},
+            "finishReason": "STOP",
+            "index": 0,
+        }],
+        "usageMetadata": {"promptTokenCount": 50, "candidatesTokenCount": len(text) // 4, "totalTokenCount": 50 + len(text) // 4},
+    }
+
+
+@app.get("/v1beta/models/{model}")
+async def gemini_model(model: str):
+    return {"name": f"models/{model}", "displayName": model, "supportedGenerationMethods": ["generateContent"]}
+
+
+@app.post("/v1beta/models/{target}")
+async def gemini(target: str, request: Request):
+    model, _, action = target.partition(":")
+    body = await request.json()
+
+    if action in ("embedContent", "batchEmbedContents"):
+        if (error := await simulate("embedding")) is not None:
+            return error
+        if action == "embedContent":
+            text = " ".join(p.get("text", "") for p in body.get("content", {}).get("parts", []))
+            return {"embedding": {"values": fake_vector(text)}}
+        texts = [
+            " ".join(p.get("text", "") for p in req.get("content", {}).get("parts", []))
+            for req in body.get("requests", [])
+        ]
+        return {"embeddings": [{"values": fake_vector(t)} for t in texts]}
+
+    if (error := await simulate("gemini")) is not None:
+        return error
+
+    response = _gemini_response(body)
+    # Without alt=sse the REST stream is one JSON array of response chunks
+    return [response] if action == "streamGenerateContent" else response
+
+
+def _gemini_response(body: dict) -> dict:
+    parts = _parts(body)
+    audio = next((p.get("inlineData") or p.get("inline_data") for p in parts if "inlineData" in p or "inline_data" in p), None)
+    if audio:
+        digest = int(hashlib.sha256(str(audio.get("data", ""))[:4096].encode()).hexdigest()[:8], 16)
+        return _gemini_text(TRANSCRIPTS[digest % len(TRANSCRIPTS)])
+
+    prompt = " ".join(p.get("text", "") for p in parts).lower()
+    has_tools = bool(body.get("tools"))
+    answered_tool = any("functionResponse" in p or "function_response" in p for p in parts)
+
+    if has_tools and not answered_tool and any(w in prompt for w in REALTIME_WORDS):
+        return {
+            "candidates": [{
+                "content": {"parts": [{"functionCall": {"name": "web_search", "args": {"query": prompt[-120:]}}}], "role": "model"},
+                "finishReason": "STOP",
+                "index": 0,
+            }],
+        }
+
+    answer = (
+        "Here is a short answer based on what I know. "
+        "The key idea is to break the problem into small steps and check each one. "
+        "Let me know if you want more detail."
+    )
+    return _gemini_text(answer)
+
+
+# --------------------------------------------------
+# ELEVENLABS
+# --------------------------------------------------
+@app.get("/v1/voices")
+async def voices():
+    if (error := await simulate("elevenlabs")) is not None:
+        return error
+    return {"voices": [
+        {"voice_id": "EXAVITQu4vr4xnSDxMaL", "name": "Sarah"},
+        {"voice_id": "21m00Tcm4TlvDq8ikWAM", "name": "Rachel"},
+        {"voice_id": "pNInz6obpgDQGcFmaJgB", "name": "Adam"},
+    ]}
+
+
+@app.get("/v1/models")
+async def models():
+    return [{"model_id": "eleven_turbo_v2", "name": "Eleven Turbo v2"}]
+
+
+@app.post("/v1/text-to-speech/{voice_id}")
+async def text_to_speech(voice_id: str, request: Request):
+    body = await request.json()
+    if (error := await simulate("elevenlabs")) is not None:
+        return error
+    return Response(fake_mp3(body.get("text", "")), media_type="audio/mpeg")
+
+
+@app.post("/v1/text-to-speech/{voice_id}/stream")
+async def text_to_speech_stream(voice_id: str, request: Request):
+    body = await request.json()
+    if (error := await simulate("elevenlabs")) is not None:
+        return error
+    audio = fake_mp3(body.get("text", ""))
+
+    async def chunks():
+        # First bytes arrive quickly, the rest trickles in like real synthesis
+        for i in range(0, len(audio), 4096):
+            yield audio[i:i + 4096]
+            await asyncio.sleep(0.005)
+
+    return StreamingResponse(chunks(), media_type="audio/mpeg")
+
+
+# --------------------------------------------------
+# PINECONE (data plane)
+# --------------------------------------------------
+@app.post("/pinecone/query")
+async def pinecone_query(request: Request):
+    body = await request.json()
+    if (error := await simulate("pinecone")) is not None:
+        return error
+
+    top_k = body.get("topK", 3)
+    include_metadata = body.get("includeMetadata", False)
+    matches = []
+    for i in range(top_k):
+        match = {"id": f"chunk_{i}", "score": round(0.9 - i * 0.05, 3), "values": []}
+        if include_metadata:
+            match["metadata"] = {"text": CHUNKS[i % len(CHUNKS)], "page": i}
+        matches.append(match)
+    return {"matches": matches, "namespace": body.get("namespace", ""), "usage": {"readUnits": 5}}
+
+
+@app.api_route("/pinecone/describe_index_stats", methods=["GET", "POST"])
+async def pinecone_stats():
+    if (error := await simulate("pinecone")) is not None:
+        return error
+    return {"dimension": EMBEDDING_DIM, "indexFullness": 0.0, "totalVectorCount": len(CHUNKS), "namespaces": {"": {"vectorCount": len(CHUNKS)}}}
+
+
+# --------------------------------------------------
+# DUCKDUCKGO-SHAPED SEARCH
+# --------------------------------------------------
+@app.get("/ddg/search")
+async def search(q: str, max_results: int = 3):
+    if (error := await simulate("search")) is not None:
+        return error
+    return [
+        {"title": f"Result {i + 1} for {q[:40]}", "body": f"Snippet {i + 1} about {q[:80]}.", "href": f"https://example.com/{i}"}
+        for i in range(max_results)
+    ]
@@ -0,0 +1,115 @@
+"""
+Intent router benchmark on a labelled sample of voice-agent turns.
+
+1. Classification: accuracy of rules-only routing and of rules plus the
+   Naive Bayes model (leave-one-out over the sample).
+2. Latency: /api/text-agent against the fake upstreams, once with
+   INTENT_ROUTER=0 (every turn through the tool-calling agent) and once
+   with routing on, each in a fresh backend process.
+
+    cd backend
+    python -m benchmarks.intent_benchmark --rounds 3
+    python -m benchmarks.intent_benchmark --train-model intent_model.json   # then set INTENT_MODEL_PATH
+"""
+import json
+import time
+import asyncio
+import argparse
+import statistics
+from pathlib import Path
+
+import httpx
+
+from benchmarks.load_test import free_port, is_fallback, percentile, start_backend, start_fake_upstreams, wait_ready
+from services.intent_router import IntentRouter, NaiveBayesIntentModel
+
+SAMPLES_PATH = Path(__file__).parent / "intent_samples.jsonl"
+
+
+def load_samples(path: Path):
+    with open(path) as f:
+        return [(row["text"], row["label"]) for row in map(json.loads, f) if row]
+
+
+def classification_report(samples):
+    rules = IntentRouter()
+    rules_correct = sum(rules.route(text)[0] == label for text, label in samples)
+
+    loo_correct = 0
+    for i, (text, label) in enumerate(samples):
+        model = NaiveBayesIntentModel.train(samples[:i] + samples[i + 1:])
+        loo_correct += IntentRouter(model).route(text)[0] == label
+
+    n = len(samples)
+    print(f"Classification on {n} labelled turns")
+    print(f"  rules only          : {rules_correct / n:.1%}")
+    print(f"  rules + NB (LOO)    : {loo_correct / n:.1%}\n")
+
+
+async def measure(samples, rounds: int, router_enabled: bool, profile: str):
+    upstream_port, backend_port = free_port(), free_port()
+    upstreams = start_fake_upstreams(upstream_port, profile, seed=7)
+    backend = None
+    latencies = {"direct": [], "agent": []}
+    try:
+        await wait_ready(f"http://127.0.0.1:{upstream_port}/v1/voices")
+        backend = start_backend(backend_port, upstream_port, 1, {"INTENT_ROUTER": "1" if router_enabled else "0"})
+        base_url = f"http://127.0.0.1:{backend_port}"
+        await wait_ready(f"{base_url}/health/ready")
+
+        async with httpx.AsyncClient(base_url=base_url, timeout=120.0) as client:
+            for round_no in range(rounds):
+                for text, label in samples:
+                    # Unique per round so the search cache doesn't flatter later rounds
+                    start = time.perf_counter()
+                    res = await client.post("/api/text-agent", json={"text": f"{text} ({round_no})"})
+                    elapsed = time.perf_counter() - start
+                    res.raise_for_status()
+                    # A fallback answer comes back 200 but timed nothing worth comparing
+                    if is_fallback(res):
+                        raise RuntimeError(f"Fallback answer for {text!r}: {res.json()}")
+                    latencies[label].append(elapsed)
+    finally:
+        for proc in (backend, upstreams):
+            if proc and proc.poll() is None:
+                proc.terminate()
+                proc.wait(timeout=10)
+    return latencies
+
+
+def describe(values):
+    return (f"mean {statistics.mean(values) * 1000:7.1f} ms | p50 {percentile(values, 50) * 1000:7.1f} ms "
+            f"| p95 {percentile(values, 95) * 1000:7.1f} ms")
+
+
+async def main(args):
+    samples = load_samples(Path(args.samples))
+
+    if args.train_model:
+        NaiveBayesIntentModel.train(samples).save(args.train_model)
+        print(f"Wrote intent model to {args.train_model}")
+        return
+
+    classification_report(samples)
+
+    baseline = await measure(samples, args.rounds, router_enabled=False, profile=args.profile)
+    routed = await measure(samples, args.rounds, router_enabled=True, profile=args.profile)
+
+    for label in ("direct", "agent"):
+        print(f"[{label} turns]")
+        print(f"  agent always : {describe(baseline[label])}")
+        print(f"  routed       : {describe(routed[label])}")
+
+    all_base = baseline["direct"] + baseline["agent"]
+    all_routed = routed["direct"] + routed["agent"]
+    reduction = 1 - statistics.mean(all_routed) / statistics.mean(all_base)
+    print(f"\nOverall mean latency reduction: {reduction:.1%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", default=str(SAMPLES_PATH))
+    parser.add_argument("--rounds", type=int, default=2)
+    parser.add_argument("--profile", help="fake upstream latency profile (JSON)")
+    parser.add_argument("--train-model", help="train the NB model on the samples, write it here and exit")
+    asyncio.run(main(parser.parse_args()))
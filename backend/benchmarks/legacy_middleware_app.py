@@ -0,0 +1,45 @@
+"""
+The backend app with RequestIDMiddleware swapped for the previous
+BaseHTTPMiddleware implementation, for benchmarks/middleware_benchmark.py.
+
+    uvicorn benchmarks.legacy_middleware_app:app
+"""
+import time
+import uuid
+
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+
+from main import app
+from middleware.request_id import RequestIDMiddleware
+from utils.context import request_id_var, request_spans_var
+from utils.tracing import tracer, server_timing
+
+
+class LegacyRequestIDMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        request.state.request_id = request.headers.get("x-request-id") or str(uuid.uuid4())
+        request_id_var.set(request.state.request_id)
+        spans = []
+        request_spans_var.set(spans)
+
+        start = time.perf_counter()
+        response = await call_next(request)
+        elapsed = time.perf_counter() - start
+
+        route = request.scope.get("route")
+        path = getattr(route, "path", "unmatched")
+        tracer.observe_request(request.method, path, response.status_code, elapsed)
+
+        response.headers["X-Request-ID"] = request.state.request_id
+        if spans:
+            response.headers["Server-Timing"] = server_timing(spans)
+        return response
+
+
+# The middleware stack is built on the first request, so swapping here is enough
+app.user_middleware = [
+    Middleware(LegacyRequestIDMiddleware) if m.cls is RequestIDMiddleware else m
+    for m in app.user_middleware
+]
@@ -0,0 +1,320 @@
+"""
+End-to-end load test against local fake upstreams.
+
+Boots benchmarks/fake_upstreams.py and the backend (uvicorn main:app) as
+subprocesses, drives a weighted mix of /api/voice-agent, /api/text-agent,
+/api/ds-rag-agent and /api/speech at increasing concurrency, and reports
+throughput, p50/p95/p99 latency, error rate and backend RSS per level.
+
+    cd backend
+    python -m benchmarks.load_test --levels 1,4,16 --duration 10
+    python -m benchmarks.load_test --profile benchmarks/profiles/degraded.json --json bench.json
+
+No network access or real API keys are needed. Run it from a checkout
+without backend/.env: main.py loads .env with override=True, which would
+replace the fake upstream settings below.
+"""
+import os
+import sys
+import json
+import math
+import time
+import random
+import socket
+import asyncio
+import argparse
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+VOICE_IDS = ["EXAVITQu4vr4xnSDxMaL", "21m00Tcm4TlvDq8ikWAM"]
+
+AGENT_QUESTIONS = [
+    "Hi there!",
+    "What's the latest news about space exploration?",
+    "Explain recursion like I'm five.",
+    "What is the weather in Bangalore today?",
+    "Give me a quick tip for better sleep.",
+    "Thanks, that was helpful.",
+    "What is the current price of gold?",
+    "How do airplanes stay in the air?",
+]
+
+RAG_QUESTIONS = [
+    "What is overfitting?",
+    "Explain gradient descent.",
+    "What is a confusion matrix?",
+    "How does cross-validation work?",
+    "What is principal component analysis?",
+    "Difference between supervised and unsupervised learning?",
+]
+
+SPEECH_TEXTS = [
+    "Welcome to today's lesson on linear regression.",
+    "Remember to normalise your features before training.",
+    "Great job! Let's move on to the next topic, which covers decision trees and how they split data.",
+]
+
+DEFAULT_MIX = "voice=2,text=3,rag=3,speech=2"
+
+# 200 responses whose text is the pipeline's own error fallback
+FALLBACK_TEXTS = {"I encountered an error.", "Unable to generate response.", "RAG service is not available."}
+FAILED_FALLBACK = -1
+
+
+# --------------------------------------------------
+# PROCESS MANAGEMENT
+# --------------------------------------------------
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def rss_mb(pid: int) -> float:
+    """Resident memory of a process and its children (uvicorn workers), via /proc."""
+    total_kb = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+            for task in os.listdir(f"/proc/{current}/task"):
+                with open(f"/proc/{current}/task/{task}/children") as f:
+                    pending.extend(int(c) for c in f.read().split())
+        except (FileNotFoundError, ProcessLookupError, PermissionError):
+            continue
+    return round(total_kb / 1024, 1)
+
+
+def start_fake_upstreams(port: int, profile: Optional[str], seed: int) -> subprocess.Popen:
+    env = dict(os.environ, FAKE_UPSTREAM_SEED=str(seed))
+    if profile:
+        env["FAKE_UPSTREAM_PROFILE"] = str(Path(profile).resolve())
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.fake_upstreams:app",
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+
+
+def start_backend(
+    port: int, upstream_port: int, workers: int, extra_env: Dict[str, str], app: str = "main:app",
+) -> subprocess.Popen:
+    upstream = f"http://127.0.0.1:{upstream_port}"
+    env = dict(
+        os.environ,
+        ELEVENLABS_BASE_URL=f"{upstream}/v1",
+        GEMINI_API_ENDPOINT=upstream,
+        PINECONE_INDEX_HOST=f"{upstream}/pinecone",
+        SEARCH_BASE_URL=f"{upstream}/ddg",
+        GEMINI_API_KEY="fake-gemini-key",
+        ELEVENLABS_API_KEY="fake-elevenlabs-key",
+        PINECONE_API_KEY="fake-pinecone-key",
+        CACHE_BACKEND="memory",
+        ADMISSION_RATE_LIMITS="0",
+        WEB_CONCURRENCY=str(workers),
+    )
+    env.update(extra_env)
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app,
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+
+
+async def wait_ready(url: str, timeout: float = 120.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(timeout=2.0) as client:
+        while time.monotonic() < deadline:
+            try:
+                res = await client.get(url)
+                if res.status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.5)
+    raise RuntimeError(f"{url} not ready after {timeout}s")
+
+
+# --------------------------------------------------
+# TRAFFIC
+# --------------------------------------------------
+class TrafficMix:
+    def __init__(self, mix: str, rng: random.Random, unique_ratio: float):
+        pairs = [item.split("=") for item in mix.split(",") if item]
+        self.kinds = [k for k, _ in pairs]
+        self.weights = [float(w) for _, w in pairs]
+        self.rng = rng
+        self.unique_ratio = unique_ratio
+
+    def _vary(self, text: str) -> str:
+        # A share of requests is made unique so caches don't hide upstream cost
+        if self.rng.random() < self.unique_ratio:
+            return f"{text} (#{self.rng.randint(0, 10**9)})"
+        return text
+
+    def next_request(self) -> dict:
+        kind = self.rng.choices(self.kinds, weights=self.weights)[0]
+        voice = self.rng.choice(VOICE_IDS)
+
+        if kind == "voice":
+            size = self.rng.randint(8_000, 64_000)
+            seed = self.rng.randint(0, 10**9) if self.rng.random() < self.unique_ratio else self.rng.randint(0, 5)
+            audio = random.Random(seed).randbytes(size)
+            return {"kind": kind, "method": "POST", "path": "/api/voice-agent",
+                    "files": {"file": ("clip.webm", audio, "audio/webm")}, "data": {"voiceId": voice}}
+        if kind == "text":
+            return {"kind": kind, "method": "POST", "path": "/api/text-agent",
+                    "json": {"text": self._vary(self.rng.choice(AGENT_QUESTIONS)), "voiceId": voice}}
+        if kind == "rag":
+            return {"kind": kind, "method": "POST", "path": "/api/ds-rag-agent",
+                    "json": {"question": self._vary(self.rng.choice(RAG_QUESTIONS)),
+                             "voiceId": voice, "includeAudio": self.rng.random() < 0.3}}
+        if kind == "speech":
+            return {"kind": kind, "method": "POST", "path": "/api/speech",
+                    "data": {"text": self._vary(self.rng.choice(SPEECH_TEXTS)), "voiceId": voice}}
+        raise ValueError(f"Unknown traffic kind: {kind}")
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    # nearest-rank
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def is_fallback(res: httpx.Response) -> bool:
+    if res.status_code != 200 or not res.headers.get("content-type", "").startswith("application/json"):
+        return False
+    body = res.json()
+    return body.get("text") in FALLBACK_TEXTS or body.get("answer") in FALLBACK_TEXTS
+
+
+def summarize(samples: List[tuple], elapsed: float) -> dict:
+    latencies = [s[1] for s in samples]
+    errors = sum(1 for s in samples if s[2] >= 500 or s[2] in (0, FAILED_FALLBACK))
+    return {
+        "requests": len(samples),
+        "rps": round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+    }
+
+
+async def run_level(base_url: str, concurrency: int, duration: float, mix: TrafficMix, backend_pid: int) -> dict:
+    samples: List[tuple] = []
+    peak_rss = rss_mb(backend_pid)
+    stop_at = time.monotonic() + duration
+
+    async def user(client: httpx.AsyncClient):
+        while time.monotonic() < stop_at:
+            req = mix.next_request()
+            start = time.perf_counter()
+            try:
+                res = await client.request(
+                    req["method"], req["path"],
+                    json=req.get("json"), data=req.get("data"), files=req.get("files"),
+                )
+                await res.aread()
+                status = FAILED_FALLBACK if is_fallback(res) else res.status_code
+            except httpx.HTTPError:
+                status = 0
+            samples.append((req["kind"], time.perf_counter() - start, status))
+
+    async def sample_memory():
+        nonlocal peak_rss
+        while time.monotonic() < stop_at:
+            peak_rss = max(peak_rss, rss_mb(backend_pid))
+            await asyncio.sleep(0.5)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120.0, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(sample_memory(), *(user(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    result = {"concurrency": concurrency, **summarize(samples, elapsed), "peak_rss_mb": peak_rss}
+    result["by_endpoint"] = {
+        kind: summarize([s for s in samples if s[0] == kind], elapsed)
+        for kind in sorted({s[0] for s in samples})
+    }
+    return result
+
+
+def print_table(results: List[dict]):
+    header = f"{'conc':>5} {'req':>6} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'err %':>7} {'rss MB':>8}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['concurrency']:>5} {r['requests']:>6} {r['rps']:>8} {r['p50_ms']:>9} "
+              f"{r['p95_ms']:>9} {r['p99_ms']:>9} {r['error_rate'] * 100:>7.2f} {r['peak_rss_mb']:>8}")
+
+
+# --------------------------------------------------
+# MAIN
+# --------------------------------------------------
+async def main(args):
+    rng = random.Random(args.seed)
+    mix = TrafficMix(args.mix, rng, args.unique_ratio)
+
+    upstream_port = free_port()
+    backend_port = free_port()
+    extra_env = dict(item.split("=", 1) for item in args.env)
+
+    upstreams = start_fake_upstreams(upstream_port, args.profile, args.seed)
+    backend = None
+    try:
+        await wait_ready(f"http://127.0.0.1:{upstream_port}/v1/voices")
+        backend = start_backend(backend_port, upstream_port, args.workers, extra_env)
+        base_url = f"http://127.0.0.1:{backend_port}"
+        await wait_ready(f"{base_url}/health/ready")
+        print(f"Backend ready on {base_url} (workers={args.workers}), idle RSS {rss_mb(backend.pid)} MB\n")
+
+        if args.warmup:
+            await run_level(base_url, 1, args.warmup, mix, backend.pid)
+
+        results = []
+        for level in (int(x) for x in args.levels.split(",")):
+            results.append(await run_level(base_url, level, args.duration, mix, backend.pid))
+        print_table(results)
+
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump({"args": vars(args), "results": results}, f, indent=2)
+            print(f"\nWrote {args.json}")
+
+    finally:
+        for proc in (backend, upstreams):
+            if proc and proc.poll() is None:
+                proc.terminate()
+                try:
+                    proc.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--levels", default="1,4,16,32", help="comma-separated concurrency levels")
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per level")
+    parser.add_argument("--warmup", type=float, default=3.0, help="seconds of unmeasured traffic first")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="weighted traffic mix, e.g. voice=2,text=3,rag=3,speech=2")
+    parser.add_argument("--unique-ratio", type=float, default=0.5, help="share of requests made unique to defeat caches")
+    parser.add_argument("--profile", help="fake upstream latency/error profile (JSON)")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the backend")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--env", action="append", default=[], help="extra backend env, KEY=VALUE (repeatable)")
+    parser.add_argument("--json", help="write results to this file")
+    asyncio.run(main(parser.parse_args()))
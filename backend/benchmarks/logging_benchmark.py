@@ -0,0 +1,79 @@
+"""
+Request throughput with logging off, on, and at sampled DEBUG volume.
+
+Each configuration runs in a fresh backend process against the fake
+upstreams, with the same traffic mix and seed, so the only difference is
+the logging setup (LOG_LEVEL / LOG_SAMPLE; stdout and the log file are
+both written, as in production).
+
+    cd backend
+    python -m benchmarks.logging_benchmark --concurrency 16 --duration 15
+"""
+import random
+import asyncio
+import argparse
+import tempfile
+from pathlib import Path
+
+from benchmarks.load_test import (
+    DEFAULT_MIX, TrafficMix, free_port, run_level, start_backend, start_fake_upstreams, wait_ready,
+)
+
+CONFIGS = {
+    "off": {"LOG_LEVEL": "CRITICAL"},
+    "info": {"LOG_LEVEL": "INFO"},
+    "debug-sampled": {"LOG_LEVEL": "DEBUG", "LOG_SAMPLE": "httpcore=0.01,httpx=0.1,urllib3=0.1,langchain=0.1"},
+}
+
+
+async def measure(name: str, env: dict, args, log_dir: Path) -> dict:
+    upstream_port, backend_port = free_port(), free_port()
+    upstreams = start_fake_upstreams(upstream_port, args.profile, seed=args.seed)
+    backend = None
+    try:
+        await wait_ready(f"http://127.0.0.1:{upstream_port}/v1/voices")
+        backend_env = {**env, "LOG_FILE": str(log_dir / f"{name}.log")}
+        backend = start_backend(backend_port, upstream_port, 1, backend_env)
+        base_url = f"http://127.0.0.1:{backend_port}"
+        await wait_ready(f"{base_url}/health/ready")
+
+        mix = TrafficMix(args.mix, random.Random(args.seed), args.unique_ratio)
+        await run_level(base_url, args.concurrency, args.warmup, mix, backend.pid)
+        return await run_level(base_url, args.concurrency, args.duration, mix, backend.pid)
+    finally:
+        for proc in (backend, upstreams):
+            if proc and proc.poll() is None:
+                proc.terminate()
+                proc.wait(timeout=10)
+
+
+async def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {}
+        for name, env in CONFIGS.items():
+            results[name] = await measure(name, env, args, Path(tmp))
+            log_size = (Path(tmp) / f"{name}.log").stat().st_size if (Path(tmp) / f"{name}.log").exists() else 0
+            results[name]["log_kb"] = round(log_size / 1024, 1)
+
+    header = f"{'logging':>14} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'err %':>7} {'log KB':>8}"
+    print(header)
+    print("-" * len(header))
+    for name, r in results.items():
+        print(f"{name:>14} {r['rps']:>8} {r['p50_ms']:>9} {r['p95_ms']:>9} {r['p99_ms']:>9} "
+              f"{r['error_rate'] * 100:>7.2f} {r['log_kb']:>8}")
+
+    off, on = results["off"]["rps"], results["info"]["rps"]
+    if off:
+        print(f"\nThroughput cost of INFO logging: {(1 - on / off):.1%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=15.0, help="measured seconds per configuration")
+    parser.add_argument("--warmup", type=float, default=3.0, help="unmeasured seconds first")
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--unique-ratio", type=float, default=0.5)
+    parser.add_argument("--profile", help="fake upstream latency profile (JSON)")
+    parser.add_argument("--seed", type=int, default=42)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,123 @@
+"""
+Microbenchmark: pure-ASGI RequestIDMiddleware vs the old BaseHTTPMiddleware.
+
+Runs the backend twice against the fake upstreams, once as `main:app` and
+once as `benchmarks.legacy_middleware_app:app` (identical except for the
+request-ID middleware), and drives GET /health and POST /api/speech at a
+fixed concurrency. Reports requests/sec, time-to-first-byte and total time.
+
+    cd backend
+    python -m benchmarks.middleware_benchmark --concurrency 8 --duration 10
+"""
+import time
+import random
+import asyncio
+import argparse
+from typing import Dict, List
+
+import httpx
+
+from benchmarks.load_test import SPEECH_TEXTS, free_port, percentile, start_backend, start_fake_upstreams, wait_ready
+
+APPS = {
+    "BaseHTTPMiddleware": "benchmarks.legacy_middleware_app:app",
+    "pure ASGI": "main:app",
+}
+
+
+def make_request(kind: str, rng: random.Random) -> dict:
+    if kind == "health":
+        return {"method": "GET", "url": "/health"}
+    # Unique text so every call streams from the (fake) upstream
+    text = f"{rng.choice(SPEECH_TEXTS)} #{rng.randint(0, 10**9)}"
+    return {"method": "POST", "url": "/api/speech", "data": {"text": text}}
+
+
+async def drive(base_url: str, kind: str, concurrency: int, duration: float, seed: int) -> Dict[str, float]:
+    rng = random.Random(seed)
+    ttfb: List[float] = []
+    total: List[float] = []
+    errors = 0
+    stop_at = time.monotonic() + duration
+
+    async def user(client: httpx.AsyncClient):
+        nonlocal errors
+        while time.monotonic() < stop_at:
+            start = time.perf_counter()
+            try:
+                async with client.stream(**make_request(kind, rng)) as res:
+                    first = None
+                    async for _ in res.aiter_raw():
+                        if first is None:
+                            first = time.perf_counter() - start
+                    if res.status_code >= 400:
+                        errors += 1
+                        continue
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            ttfb.append(first if first is not None else time.perf_counter() - start)
+            total.append(time.perf_counter() - start)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60.0, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(user(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "rps": round(len(total) / elapsed, 1),
+        "ttfb_p50_ms": round(percentile(ttfb, 50) * 1000, 2),
+        "ttfb_p95_ms": round(percentile(ttfb, 95) * 1000, 2),
+        "total_p50_ms": round(percentile(total, 50) * 1000, 2),
+        "errors": errors,
+    }
+
+
+async def measure(app: str, args) -> Dict[str, dict]:
+    upstream_port, backend_port = free_port(), free_port()
+    upstreams = start_fake_upstreams(upstream_port, args.profile, seed=args.seed)
+    backend = None
+    try:
+        await wait_ready(f"http://127.0.0.1:{upstream_port}/v1/voices")
+        # Quiet logs and a high global in-flight cap; both runs share the same per-endpoint caps
+        backend = start_backend(backend_port, upstream_port, 1, {
+            "LOG_LEVEL": "WARNING",
+            "ADMISSION_MAX_INFLIGHT": "1000",
+        }, app=app)
+        base_url = f"http://127.0.0.1:{backend_port}"
+        await wait_ready(f"{base_url}/health/ready")
+
+        results = {}
+        for kind in ("health", "speech"):
+            await drive(base_url, kind, args.concurrency, args.warmup, args.seed)
+            results[kind] = await drive(base_url, kind, args.concurrency, args.duration, args.seed)
+        return results
+    finally:
+        for proc in (backend, upstreams):
+            if proc and proc.poll() is None:
+                proc.terminate()
+                proc.wait(timeout=10)
+
+
+async def main(args):
+    results = {name: await measure(app, args) for name, app in APPS.items()}
+
+    header = f"{'endpoint':>8} {'middleware':>20} {'rps':>8} {'ttfb p50':>10} {'ttfb p95':>10} {'total p50':>10} {'err':>5}"
+    print(header)
+    print("-" * len(header))
+    for kind in ("health", "speech"):
+        for name in APPS:
+            r = results[name][kind]
+            print(f"{kind:>8} {name:>20} {r['rps']:>8} {r['ttfb_p50_ms']:>10} {r['ttfb_p95_ms']:>10} "
+                  f"{r['total_p50_ms']:>10} {r['errors']:>5}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0, help="measured seconds per endpoint")
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--profile", help="fake upstream latency profile (JSON)")
+    parser.add_argument("--seed", type=int, default=42)
+    asyncio.run(main(parser.parse_args()))
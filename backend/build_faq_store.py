@@ -0,0 +1,158 @@
+"""
+Precompute DS Tutor answers for the questions students are most likely to ask.
+
+For every docstore chunk Gemini writes a few questions the chunk answers.
+Near-duplicate questions are merged, the rest are answered through the
+live RAG pipeline (same retriever, prompt and model as /api/ds-rag-agent),
+and the question embeddings and answers are written to FAQ_STORE_PATH
+(default data/faq). RAGService answers a question from the store when
+it is within FAQ_MATCH_THRESHOLD of a stored one. Rebuild it whenever
+the docstore or the tutor prompt changes.
+
+    python build_faq_store.py [--per-chunk 3] [--limit N] [--concurrency 4]
+    python build_faq_store.py --audio [--voice-id ID] [--audio-format mp3]   # also precompute speech
+"""
+import os
+import re
+import time
+import asyncio
+import argparse
+from typing import List
+
+import numpy as np
+from dotenv import load_dotenv
+
+from routes.ds_rag_agent import DEFAULT_VOICE_ID, ds_tutor_audio
+from services.audio_formats import negotiate_format
+from services.embeddings import normalize_query
+from services.faq_store import audio_key, faq_store_path, write_faq_store
+from services.rag_service import EMBEDDING_MODEL, RAGService
+from services.response_shaper import get_response_shaper
+from utils.logger import logger
+from utils.upstreams import close_http_client, gemini_client_kwargs
+
+load_dotenv()
+
+BATCH_SIZE = 100
+NOT_COVERED = "This topic is not covered in the material."
+
+QUESTION_PROMPT = """You are helping a Data Science tutor prepare for exam season.
+
+Write {count} different questions a student might ask that the passage below answers.
+Phrase them the way a student would ask out loud. One question per line, no numbering.
+
+Passage:
+{text}
+"""
+
+
+def parse_questions(text: str) -> List[str]:
+    questions = []
+    for line in text.splitlines():
+        line = re.sub(r"^\s*(?:[-*•]|\d+[.)])\s*", "", line).strip()
+        if len(line) >= 10:
+            questions.append(line)
+    return questions
+
+
+def near_duplicates_removed(vectors: np.ndarray, threshold: float) -> List[int]:
+    """Rows kept after dropping any within `threshold` cosine of an earlier kept row."""
+    vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    kept: List[int] = []
+    for i, vector in enumerate(vectors):
+        if kept and float((vectors[kept] @ vector).max()) >= threshold:
+            continue
+        kept.append(i)
+    return kept
+
+
+async def main(args):
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    service = RAGService()
+    if not await service.startup():
+        raise SystemExit("RAG is disabled by config; see the startup log")
+    if service.docstore is None:
+        raise SystemExit("No docstore; run ingest_pdfs.py first")
+    # Answer through the pipeline itself, not through a previous store
+    service.faq = None
+
+    llm = ChatGoogleGenerativeAI(
+        model="gemini-2.5-flash-lite",
+        google_api_key=os.getenv("RAG_GEMINI_API_KEY") or os.getenv("GEMINI_API_KEY"),
+        temperature=0.7,
+        **gemini_client_kwargs(),
+    )
+    limit = asyncio.Semaphore(args.concurrency)
+    start = time.perf_counter()
+
+    # 1. Likely questions per chunk
+    async def generate(ordinal: int) -> List[str]:
+        text = service.docstore.get_by_ordinal(ordinal)["text"]
+        async with limit:
+            try:
+                message = await asyncio.to_thread(llm.invoke, QUESTION_PROMPT.format(count=args.per_chunk, text=text))
+            except Exception as e:
+                logger.warning(f"Question generation failed for chunk {ordinal}: {e}")
+                return []
+        return parse_questions(message.content)[:args.per_chunk]
+
+    chunks = min(len(service.docstore), args.limit or len(service.docstore))
+    generated = await asyncio.gather(*(generate(i) for i in range(chunks)))
+    questions = list({normalize_query(q): q for batch in generated for q in batch}.values())
+    print(f"Generated {len(questions)} questions from {chunks} chunks")
+
+    # 2. Embed them as queries and merge paraphrases
+    vectors = []
+    for offset in range(0, len(questions), BATCH_SIZE):
+        vectors.extend(await asyncio.to_thread(service.embeddings.embed_queries, questions[offset:offset + BATCH_SIZE]))
+    vectors = np.asarray(vectors, dtype=np.float32)
+    kept = near_duplicates_removed(vectors, args.dedupe)
+    print(f"{len(kept)} questions after merging near-duplicates")
+
+    # 3. Answer through RetrievalQA
+    async def answer(question: str):
+        async with limit:
+            return await service.process_question(question)
+
+    answers = await asyncio.gather(*(answer(questions[i]) for i in kept))
+    entries, rows = [], []
+    for i, (text, sources, provider) in zip(kept, answers):
+        if provider != "gemini" or text.strip().startswith(NOT_COVERED):
+            continue
+        entries.append({"question": questions[i], "answer": text, "sources": sources})
+        rows.append(i)
+    print(f"Answered {len(entries)} questions ({len(kept) - len(entries)} skipped as unanswerable)")
+    if not entries:
+        raise SystemExit("Nothing to store")
+
+    # 4. Optionally the spoken answer, as /api/ds-rag-agent would synthesize it
+    audio = {}
+    if args.audio:
+        audio_format = negotiate_format(args.audio_format)
+        shaper = get_response_shaper()
+        for entry in entries:
+            spoken_text = shaper.shape(entry["answer"]).spoken_text
+            data = await ds_tutor_audio(spoken_text, args.voice_id, audio_format)
+            if data:
+                audio[audio_key(spoken_text, args.voice_id, audio_format.name)] = data
+        print(f"Synthesized {len(audio)} answers as {audio_format.name}")
+
+    store = write_faq_store(faq_store_path(), entries, vectors[rows], EMBEDDING_MODEL, audio)
+    print(f"✅ Done! {len(store)} answers at {faq_store_path()} in {time.perf_counter() - start:.1f}s")
+
+    await service.shutdown()
+    await close_http_client()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--per-chunk", type=int, default=3, help="questions generated per chunk")
+    parser.add_argument("--limit", type=int, help="only the first N chunks (trial runs)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Gemini calls in flight")
+    parser.add_argument("--dedupe", type=float, default=float(os.getenv("FAQ_MATCH_THRESHOLD", "0.92")),
+                        help="cosine above which generated questions count as the same question")
+    parser.add_argument("--audio", action="store_true", help="precompute spoken answers")
+    parser.add_argument("--voice-id", default=DEFAULT_VOICE_ID)
+    parser.add_argument("--audio-format", default="mp3")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,88 @@
+"""
+Build the local ANN index (VECTOR_INDEX=local) from the docstore.
+
+Embeds every docstore chunk with the same Gemini model the DS Tutor
+queries with, then writes a quantized IVF index to ANN_INDEX_PATH
+(default data/ann_index). Row i of the index is docstore chunk i, so
+rebuild it whenever the docstore changes. Vectors are kept beside the
+index keyed by chunk text, so a rebuild only embeds new or changed chunks.
+
+    python build_local_index.py [--quantization int8|float16|float32] [--nlist N]
+"""
+import os
+import time
+import hashlib
+import argparse
+
+import numpy as np
+from dotenv import load_dotenv
+
+from services.ann_index import QUANTIZATIONS, ann_index_path, build_ivf_index
+from services.docstore import docstore_path, load_docstore
+from services.embeddings import gemini_embeddings
+from services.rag_service import EMBEDDING_MODEL
+
+load_dotenv()
+
+BATCH_SIZE = 100
+
+
+def vector_cache_path() -> str:
+    return f"{ann_index_path()}.vectors.npz"
+
+
+def load_vector_cache() -> dict:
+    path = vector_cache_path()
+    if not os.path.exists(path):
+        return {}
+    cache = np.load(path)
+    if str(cache["model"]) != EMBEDDING_MODEL:
+        return {}
+    return dict(zip(cache["keys"].tolist(), cache["vectors"]))
+
+
+def save_vector_cache(keys, vectors: np.ndarray):
+    path = vector_cache_path()
+    with open(f"{path}.tmp", "wb") as f:
+        np.savez(f, model=np.array(EMBEDDING_MODEL), keys=np.array(keys), vectors=vectors)
+    os.replace(f"{path}.tmp", path)
+
+
+def main(args):
+    docstore = load_docstore()
+    if docstore is None:
+        raise SystemExit(f"No docstore at {docstore_path()}; run the ingestion first")
+
+    embeddings = gemini_embeddings(EMBEDDING_MODEL, os.getenv("RAG_GEMINI_API_KEY") or os.getenv("GEMINI_API_KEY"))
+
+    texts = [docstore.get_by_ordinal(i)["text"] for i in range(len(docstore))]
+    keys = [hashlib.sha1(text.encode()).hexdigest() for text in texts]
+    cache = load_vector_cache()
+    missing = [i for i, key in enumerate(keys) if key not in cache]
+    print(f"{len(texts) - len(missing)} chunks unchanged, {len(missing)} to embed")
+
+    start = time.perf_counter()
+    for offset in range(0, len(missing), BATCH_SIZE):
+        batch = missing[offset:offset + BATCH_SIZE]
+        for i, vector in zip(batch, embeddings.embed_documents([texts[i] for i in batch])):
+            cache[keys[i]] = np.asarray(vector, dtype=np.float32)
+        print(f"Embedded {offset + len(batch)}/{len(missing)} chunks")
+    print(f"Embedding took {time.perf_counter() - start:.1f}s")
+
+    vectors = np.stack([cache[key] for key in keys]).astype(np.float32)
+    save_vector_cache(keys, vectors)
+
+    index = build_ivf_index(
+        vectors,
+        ann_index_path(),
+        nlist=args.nlist,
+        quantization=args.quantization,
+    )
+    print(f"✅ Done! {len(index)} vectors in {index.nlist} lists ({index.nbytes() / 2**20:.1f} MiB) at {ann_index_path()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quantization", choices=QUANTIZATIONS, default=os.getenv("ANN_QUANTIZATION", "int8"))
+    parser.add_argument("--nlist", type=int, help="inverted lists (default: 4 * sqrt(chunks))")
+    main(parser.parse_args())
@@ -0,0 +1,51 @@
+"""
+Check that the shared cache tier is visible across worker processes.
+Run: CACHE_BACKEND=disk python check_shared_cache.py   (or CACHE_BACKEND=redis)
+"""
+import os
+import sys
+import asyncio
+import tempfile
+from multiprocessing import Process, Queue
+
+os.environ.setdefault("CACHE_BACKEND", "disk")
+os.environ.setdefault("CACHE_DIR", tempfile.mkdtemp(prefix="voice-agent-cache-"))
+
+WORKERS = 4
+
+
+def worker(index: int, results: Queue):
+    from services.cache import get_cache
+
+    async def run():
+        cache = get_cache("check_shared")
+        if index == 0:
+            await cache.set("answer", {"written_by": os.getpid()}, ttl=60)
+            return "wrote"
+        for _ in range(50):
+            value = await cache.get("answer")
+            if value is not None:
+                return f"read {value}"
+            await asyncio.sleep(0.1)
+        return "MISS"
+
+    results.put((index, asyncio.run(run())))
+
+
+if __name__ == "__main__":
+    print(f"Backend: {os.environ['CACHE_BACKEND']} | dir: {os.environ['CACHE_DIR']}\n")
+
+    results = Queue()
+    procs = [Process(target=worker, args=(i, results)) for i in range(WORKERS)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+
+    outcomes = dict(results.get() for _ in procs)
+    for i in sorted(outcomes):
+        print(f"worker {i}: {outcomes[i]}")
+
+    ok = all(v != "MISS" for v in outcomes.values())
+    print(f"\n{'OK' if ok else 'FAIL'} shared cache across {WORKERS} processes")
+    sys.exit(0 if ok else 1)
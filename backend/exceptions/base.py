@@ -1,5 +1,14 @@
 class AppException(Exception):
+    status_code = 400
+
     def __init__(self, message: str, code: str = "APP_ERROR"):
         self.message = message
         self.code = code
         super().__init__(message)
+
+
+class DeadlineExceeded(AppException):
+    status_code = 504
+
+    def __init__(self, message: str = "Request deadline exceeded"):
+        super().__init__(message, code="DEADLINE_EXCEEDED")
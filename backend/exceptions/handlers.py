@@ -5,7 +5,7 @@ from exceptions.base import AppException
 
 async def app_exception_handler(request: Request, exc: AppException):
     return JSONResponse(
-        status_code=400,
+        status_code=exc.status_code,
         content={
             "success": False,
             "data": None,
@@ -0,0 +1,49 @@
+"""
+Chunk the DS Tutor PDFs into the local docstore.
+
+Parses every PDF under --source (default data/ds_notes) in a process
+pool, chunks it along headings, lists and formulas, and writes the
+chunks to DOCSTORE_PATH (default data/docstore.bin). Files whose hash
+has not changed since the last run are read from INGEST_CACHE_DIR
+(default data/ingest_cache) instead of being parsed again.
+
+    python ingest_pdfs.py [--workers N] [--chunk-size 1000] [--overlap 200] [--force]
+
+Then rebuild the vectors: build_local_index.py for VECTOR_INDEX=local,
+or reupload_with_huggingface.py for Pinecone.
+"""
+import argparse
+
+from dotenv import load_dotenv
+
+from services.docstore import docstore_path, write_docstore
+from services.ingestion import ingest_directory
+
+load_dotenv()
+
+
+def main(args):
+    result = ingest_directory(
+        args.source,
+        chunk_size=args.chunk_size,
+        overlap=args.overlap,
+        workers=args.workers,
+        force=args.force,
+    )
+    print(f"{result.files} PDFs: {result.parsed_files} parsed, {result.files - result.parsed_files} unchanged")
+    if result.parsed_pages:
+        print(f"Parsed {result.parsed_pages} pages at {result.pages_per_second:.1f} pages/sec")
+    print(f"{result.pages} pages -> {len(result.chunks)} chunks in {result.seconds:.2f}s")
+
+    count = write_docstore(docstore_path(), result.chunks)
+    print(f"✅ Done! Wrote {count} chunks to {docstore_path()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", default="data/ds_notes")
+    parser.add_argument("--workers", type=int, help="parser processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--overlap", type=int, default=200)
+    parser.add_argument("--force", action="store_true", help="re-parse files even if unchanged")
+    main(parser.parse_args())
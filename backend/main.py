@@ -1,4 +1,5 @@
 from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from slowapi import Limiter
@@ -9,16 +10,24 @@ from slowapi import _rate_limit_exceeded_handler
 from routes.ds_rag_agent import router as ds_rag_router
 from routes.text_speech_routes import router as text_speech_router
 from routes.voice_transform import router as voice_transform_router
-from routes.voice_agent import router as voice_agent_router
+from routes.voice_agent import router as voice_agent_router, get_orchestrator
 
-from utils.logger import setup_logging, logger
+from utils.logger import logger
 from dotenv import load_dotenv
 from pathlib import Path
 
 from exceptions.base import AppException
 from exceptions.handlers import app_exception_handler
+from middleware.admission import AdmissionMiddleware
+from middleware.deadline import DeadlineMiddleware
 from middleware.request_id import RequestIDMiddleware
 from services.rag_service import RAGService
+from services.startup import startup_registry, DISABLED
+from services.audio_formats import can_transcode
+from services.tts_backends import PiperBackend, get_local_backend
+from services.warmup import get_upstream_warmer
+from utils.tracing import tracer
+from utils.upstreams import close_http_client
 
 import logging
 import warnings
@@ -28,9 +37,7 @@ import asyncio
 env_path = Path(__file__).parent / ".env"
 load_dotenv(dotenv_path=env_path, override=True)
 
-# LOGGING
-setup_logging()
-
+# LOGGING (configured once, when utils.logger is first imported)
 logging.getLogger("sentence_transformers").setLevel(logging.WARNING)
 logging.getLogger("httpx").setLevel(logging.WARNING)
 logging.getLogger("transformers").setLevel(logging.WARNING)
@@ -58,6 +65,56 @@ app = FastAPI(
 """
 )
 
+# -----------------------------------------------------
+# SUBSYSTEMS (heavy imports are deferred until warmup or first use)
+# -----------------------------------------------------
+startup_registry.register("voice_agent", ["google.generativeai", "langchain_google_genai", "langchain.agents"])
+startup_registry.register("voice_transform", ["google.generativeai"])
+startup_registry.register("tts", ["gtts"], required=False)
+startup_registry.register("rag", ["langchain_google_genai", "langchain_pinecone", "langchain.chains", "pinecone"])
+# DNS, pooled TLS connections and probe calls; informative, not a readiness gate
+startup_registry.register("upstreams", [], required=False)
+
+
+async def warm_rag():
+    enabled = await app.state.rag_service.startup()
+    if not enabled:
+        return DISABLED
+    try:
+        await app.state.rag_service.probe()
+    except Exception as e:
+        # The chain is built; a cold first query beats marking RAG as down
+        logger.warning(f"RAG warmup probe failed: {e}")
+
+
+async def warm_voice_agent():
+    # Builds the Gemini client, LangChain LLM handle and intent model once, up front
+    try:
+        orchestrator = get_orchestrator()
+        await asyncio.to_thread(orchestrator.agent.get_llm)
+    except Exception as e:
+        logger.warning(f"Voice agent pre-init failed, will retry on first request: {e}")
+
+
+async def warm_tts():
+    # Detect the offline engine and load a Piper voice now, not on the first fallback
+    backend = await asyncio.to_thread(get_local_backend)
+    if isinstance(backend, PiperBackend):
+        await asyncio.to_thread(backend.load)
+    startup_registry.record("tts", {
+        "local": {"engine": backend.name if backend else None},
+        "transcode": {"ffmpeg": can_transcode()},
+    })
+
+
+async def warm_upstreams():
+    results = await app.state.upstream_warmer.warm_once()
+    startup_registry.record("upstreams", results)
+    failed = [name for name, result in results.items() if not result["ok"]]
+    if failed:
+        raise RuntimeError(f"unreachable: {', '.join(failed)}")
+
+
 # -----------------------------------------------------
 # LIFECYCLE (IMPORTANT)
 # -----------------------------------------------------
@@ -65,18 +122,41 @@ app = FastAPI(
 async def startup():
     logger.info("Starting backend services...")
     app.state.rag_service = RAGService()
-    asyncio.create_task(app.state.rag_service.startup())
-    logger.info("All services ready")
+
+    # Warm in the background so the server accepts liveness probes immediately;
+    # /health/ready stays 503 until every required subsystem is warm.
+    app.state.upstream_warmer = get_upstream_warmer(app.state.rag_service)
+    app.state.warmup_task = asyncio.create_task(
+        startup_registry.warm_all({
+            "rag": warm_rag,
+            "voice_agent": warm_voice_agent,
+            "tts": warm_tts,
+            "upstreams": warm_upstreams,
+        })
+    )
+    if app.state.upstream_warmer.interval > 0:
+        app.state.keepwarm_task = asyncio.create_task(
+            app.state.upstream_warmer.keep_warm(lambda results: startup_registry.record("upstreams", results))
+        )
+    logger.info("Backend accepting connections, warmup in progress")
 
 
 @app.on_event("shutdown")
 async def shutdown():
+    if hasattr(app.state, "keepwarm_task"):
+        app.state.keepwarm_task.cancel()
+
     if hasattr(app.state, "rag_service"):
         await app.state.rag_service.shutdown()
         logger.info("RAG service shutdown complete")
 
+    await close_http_client()
+
 
-# MIDDLEWARE
+# MIDDLEWARE (last added runs first)
+app.add_middleware(AdmissionMiddleware)
+# Outside admission so time spent queued counts against the request deadline
+app.add_middleware(DeadlineMiddleware)
 app.add_middleware(RequestIDMiddleware)
 
 app.add_middleware(
@@ -114,4 +194,30 @@ async def root(request: Request):
 @app.get("/health")
 async def health():
     rag_ok = app.state.rag_service.health_check()
-    return {"status": "ok", "vector_db": rag_ok}
+    return {
+        "status": "ok",
+        "ready": startup_registry.is_ready(),
+        "vector_db": rag_ok,
+        "subsystems": startup_registry.snapshot(),
+    }
+
+@app.get("/health/live")
+async def health_live():
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def health_ready():
+    ready = startup_registry.is_ready()
+    return JSONResponse(
+        {"ready": ready, "subsystems": startup_registry.snapshot()},
+        status_code=200 if ready else 503,
+    )
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    # Per-process histograms in Prometheus text format; scrape each worker
+    return PlainTextResponse(
+        tracer.render_prometheus(),
+        media_type="text/plain; version=0.0.4",
+    )
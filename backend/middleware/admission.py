@@ -0,0 +1,254 @@
+import os
+import time
+import heapq
+import asyncio
+import itertools
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from utils.logger import logger
+
+
+class EndpointPolicy:
+    """
+    Admission rules for one expensive endpoint.
+
+    priority: lower is served first when requests queue for a slot.
+    rate_per_minute / burst: per-client token bucket.
+    """
+
+    def __init__(self, path: str, max_concurrency: int, priority: int, rate_per_minute: float, burst: int):
+        self.path = path
+        self.max_concurrency = max_concurrency
+        self.priority = priority
+        self.rate_per_minute = rate_per_minute
+        self.burst = burst
+        self.active = 0
+
+
+DEFAULT_POLICIES = [
+    # Interactive turns first, one-shot TTS last
+    EndpointPolicy("/api/voice-agent", max_concurrency=8, priority=0, rate_per_minute=20, burst=5),
+    EndpointPolicy("/api/text-agent", max_concurrency=8, priority=0, rate_per_minute=30, burst=5),
+    EndpointPolicy("/api/ds-rag-agent", max_concurrency=6, priority=1, rate_per_minute=20, burst=5),
+    EndpointPolicy("/api/voice-transform", max_concurrency=4, priority=1, rate_per_minute=10, burst=3),
+    EndpointPolicy("/api/speech", max_concurrency=4, priority=2, rate_per_minute=30, burst=10),
+    # Each batch fans out to its own bounded pool, so admit only a couple at once
+    EndpointPolicy("/api/speech/batch", max_concurrency=2, priority=3, rate_per_minute=6, burst=2),
+]
+
+
+class Rejected(Exception):
+    def __init__(self, status_code: int, message: str, retry_after: float):
+        self.status_code = status_code
+        self.message = message
+        self.retry_after = retry_after
+        super().__init__(message)
+
+
+class TokenBucket:
+    def __init__(self, rate_per_second: float, capacity: int):
+        self.rate = rate_per_second
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """Consume a token; return 0 on success or seconds until one is available."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class AdmissionController:
+    """
+    Per-client rate limits plus a shared pool of in-flight slots.
+
+    Buckets and slots live in this process: with several uvicorn workers
+    each worker enforces the limits on its own, so a client's effective
+    rate is up to WEB_CONCURRENCY times the configured one.
+
+    When every slot (or the endpoint's own cap) is taken, requests wait in a
+    bounded priority queue; a full queue or a wait past `queue_timeout`
+    is turned away with 503 so latency for admitted requests stays flat.
+    """
+
+    def __init__(
+        self,
+        policies: List[EndpointPolicy],
+        max_inflight: int = 16,
+        max_queue: int = 64,
+        queue_timeout: float = 10.0,
+        max_clients: int = 10_000,
+        rate_limits: bool = True,
+    ):
+        self.policies: Dict[str, EndpointPolicy] = {p.path: p for p in policies}
+        self.max_inflight = max_inflight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.max_clients = max_clients
+        self.rate_limits = rate_limits
+        self.inflight = 0
+        self._waiters: List[Tuple[int, int, EndpointPolicy, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._buckets: "OrderedDict[Tuple[str, str], TokenBucket]" = OrderedDict()
+
+    def policy_for(self, path: str) -> Optional[EndpointPolicy]:
+        return self.policies.get(path.rstrip("/") or "/")
+
+    # --------------------------------------------------
+    # RATE LIMIT
+    # --------------------------------------------------
+    def check_rate(self, policy: EndpointPolicy, client: str):
+        if not self.rate_limits:
+            return
+
+        key = (client, policy.path)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(policy.rate_per_minute / 60, policy.burst)
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        self._buckets.move_to_end(key)
+
+        wait = bucket.take()
+        if wait:
+            raise Rejected(429, "Too many requests", wait)
+
+    # --------------------------------------------------
+    # CONCURRENCY
+    # --------------------------------------------------
+    def _has_slot(self, policy: EndpointPolicy) -> bool:
+        return self.inflight < self.max_inflight and policy.active < policy.max_concurrency
+
+    def _take_slot(self, policy: EndpointPolicy):
+        self.inflight += 1
+        policy.active += 1
+
+    async def acquire(self, policy: EndpointPolicy):
+        if self._has_slot(policy) and not self._waiters:
+            self._take_slot(policy)
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            raise Rejected(503, "Server busy, try again shortly", self.queue_timeout)
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (policy.priority, next(self._seq), policy, future))
+        self._dispatch()
+
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # Slot was granted just as we gave up; hand it back
+                self.release(policy)
+            else:
+                future.cancel()
+                self._waiters = [w for w in self._waiters if w[3] is not future]
+                heapq.heapify(self._waiters)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            raise Rejected(503, "Server busy, try again shortly", self.queue_timeout)
+
+    def release(self, policy: EndpointPolicy):
+        self.inflight -= 1
+        policy.active -= 1
+        self._dispatch()
+
+    def _dispatch(self):
+        """Grant free slots to the highest-priority waiters whose endpoint has room."""
+        skipped = []
+        while self._waiters and self.inflight < self.max_inflight:
+            entry = heapq.heappop(self._waiters)
+            _, _, policy, future = entry
+            if future.done():
+                continue
+            if policy.active >= policy.max_concurrency:
+                skipped.append(entry)
+                continue
+            self._take_slot(policy)
+            future.set_result(None)
+
+        for entry in skipped:
+            heapq.heappush(self._waiters, entry)
+
+
+class AdmissionMiddleware:
+    """Pure ASGI so streamed bodies pass through untouched and the slot is held until the last chunk."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        controller: Optional[AdmissionController] = None,
+        trusted_proxies: Optional[List[str]] = None,
+    ):
+        self.app = app
+        if trusted_proxies is None:
+            trusted_proxies = os.getenv("ADMISSION_TRUSTED_PROXIES", "").split(",")
+        self.trusted_proxies = {proxy.strip() for proxy in trusted_proxies if proxy.strip()}
+        self.controller = controller or AdmissionController(
+            DEFAULT_POLICIES,
+            max_inflight=int(os.getenv("ADMISSION_MAX_INFLIGHT", "16")),
+            max_queue=int(os.getenv("ADMISSION_MAX_QUEUE", "64")),
+            queue_timeout=float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "10")),
+            # Off for single-IP load tests; concurrency caps still apply
+            rate_limits=os.getenv("ADMISSION_RATE_LIMITS", "1") != "0",
+        )
+
+    def client_key(self, scope: Scope) -> str:
+        """
+        The peer address, which uvicorn already resolves from X-Forwarded-For
+        for proxies in --forwarded-allow-ips. X-Forwarded-For is only read
+        here when the peer is in ADMISSION_TRUSTED_PROXIES; anyone else could
+        pick a fresh bucket per request by rewriting the header.
+        """
+        client = scope.get("client")
+        peer = client[0] if client else "unknown"
+        if peer not in self.trusted_proxies:
+            return peer
+
+        for name, value in scope.get("headers", []):
+            if name == b"x-forwarded-for":
+                # Rightmost hop that is not one of our proxies is the real client
+                for hop in reversed(value.decode().split(",")):
+                    hop = hop.strip()
+                    if hop and hop not in self.trusted_proxies:
+                        return hop
+        return peer
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        policy = self.controller.policy_for(scope["path"])
+        if policy is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            self.controller.check_rate(policy, self.client_key(scope))
+            await self.controller.acquire(policy)
+        except Rejected as e:
+            logger.warning(f"Admission rejected {scope['path']}: {e.status_code} {e.message}")
+            response = JSONResponse(
+                {"error": e.message},
+                status_code=e.status_code,
+                headers={"Retry-After": str(max(1, round(e.retry_after)))},
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(policy)
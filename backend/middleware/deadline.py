@@ -0,0 +1,122 @@
+import os
+import asyncio
+import contextlib
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from utils.deadline import Deadline, deadline_var, default_deadline_seconds
+from utils.logger import logger
+
+# Bulk endpoints that legitimately run for minutes
+LONG_RUNNING_PATHS = {
+    "/api/speech/batch": "BATCH_TTS_DEADLINE_SECONDS",
+}
+
+
+class DeadlineMiddleware:
+    """
+    Give every request an end-to-end deadline and cancel its handler when
+    the client disconnects or the deadline passes before a response starts.
+
+    Cancelling the handler task aborts in-flight httpx calls and skips the
+    remaining pipeline stages. Work already handed to `asyncio.to_thread`
+    finishes in its thread, but its result is dropped.
+
+    Clients may ask for a shorter budget with `X-Request-Timeout: <seconds>`.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.path_seconds = {
+            path: float(os.getenv(env, "600")) for path, env in LONG_RUNNING_PATHS.items()
+        }
+
+    def _budget(self, scope: Scope) -> float:
+        seconds = self.path_seconds.get(scope["path"].rstrip("/")) or default_deadline_seconds()
+        for name, value in scope.get("headers", []):
+            if name == b"x-request-timeout":
+                with contextlib.suppress(ValueError):
+                    # Only ever shortens the budget
+                    seconds = min(seconds, float(value))
+        return max(1.0, seconds)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        deadline = Deadline(self._budget(scope))
+        token = deadline_var.set(deadline)
+
+        body_consumed = asyncio.Event()
+        disconnected = asyncio.Event()
+        response_started = False
+
+        async def app_receive() -> Message:
+            # The app reads the body as usual; afterwards only our watcher
+            # touches the real `receive`, and the app sees its disconnect.
+            if not body_consumed.is_set():
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    disconnected.set()
+                elif not message.get("more_body", False):
+                    body_consumed.set()
+                return message
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def app_send(message: Message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        async def watch_disconnect():
+            await body_consumed.wait()
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    disconnected.set()
+                    return
+
+        app_task = asyncio.create_task(self.app(scope, app_receive, app_send))
+        watcher = asyncio.create_task(watch_disconnect())
+        disconnect_wait = asyncio.create_task(disconnected.wait())
+
+        try:
+            while True:
+                # The deadline bounds time-to-first-byte; streams then run until done or disconnect
+                timeout = None if response_started else deadline.remaining()
+                done, _ = await asyncio.wait(
+                    {app_task, disconnect_wait},
+                    timeout=timeout,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+
+                if app_task in done:
+                    break
+
+                if disconnect_wait in done:
+                    logger.info(f"Client disconnected, cancelling {scope['path']}")
+                    app_task.cancel()
+                    break
+
+                if not response_started:
+                    logger.warning(f"Deadline of {deadline.seconds:g}s exceeded, cancelling {scope['path']}")
+                    app_task.cancel()
+                    with contextlib.suppress(asyncio.CancelledError):
+                        await app_task
+                    if not response_started:
+                        response = JSONResponse({"error": "Request deadline exceeded"}, status_code=504)
+                        await response(scope, receive, send)
+                    break
+
+            with contextlib.suppress(asyncio.CancelledError):
+                await app_task
+
+        finally:
+            for task in (watcher, disconnect_wait, app_task):
+                if not task.done():
+                    task.cancel()
+            deadline_var.reset(token)
@@ -1,11 +1,64 @@
+import re
+import time
 import uuid
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+from utils.context import request_id_var, request_spans_var
+from utils.tracing import tracer, server_timing
 
-class RequestIDMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        request.state.request_id = str(uuid.uuid4())
-        response = await call_next(request)
-        response.headers["X-Request-ID"] = request.state.request_id
-        return response
+# Client IDs end up in headers and every log line; anything else gets a fresh one
+REQUEST_ID_RE = re.compile(r"[A-Za-z0-9._-]{1,64}")
+
+
+class RequestIDMiddleware:
+    """
+    Request ID, Server-Timing and request metrics as pure ASGI.
+
+    Unlike BaseHTTPMiddleware there is no extra task or memory stream per
+    request: headers are added to `http.response.start` as it goes out and
+    streamed body chunks pass straight through. The request histogram is
+    recorded after the last chunk, so it covers the full streamed response.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Honour an upstream proxy's ID so traces line up end to end
+        request_id = Headers(scope=scope).get("x-request-id", "")
+        if not REQUEST_ID_RE.fullmatch(request_id):
+            request_id = str(uuid.uuid4())
+        scope.setdefault("state", {})["request_id"] = request_id
+        id_token = request_id_var.set(request_id)
+        spans = []
+        spans_token = request_spans_var.set(spans)
+
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("X-Request-ID", request_id)
+                if spans:
+                    headers.append("Server-Timing", server_timing(spans))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            # Route template, not the raw URL, to keep label cardinality bounded
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            tracer.observe_request(scope["method"], path, status_code, elapsed)
+
+            request_spans_var.reset(spans_token)
+            request_id_var.reset(id_token)
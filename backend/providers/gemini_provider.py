@@ -1,16 +1,16 @@
-import os
-import time
 import asyncio
 from typing import Optional
 import google.generativeai as genai
 
 from providers.base_provider import BaseLLMProvider
 from utils.logger import logger
+from utils.tracing import tracer
+from utils.upstreams import gemini_client_kwargs
 
 
 class GeminiProvider(BaseLLMProvider):
     def __init__(self, api_key: str):
-        genai.configure(api_key=api_key)
+        genai.configure(api_key=api_key, **gemini_client_kwargs())
         self.model = "gemini-2.5-flash-lite"
 
     @property
@@ -19,13 +19,9 @@ class GeminiProvider(BaseLLMProvider):
 
     async def generate(self, prompt: str) -> Optional[str]:
         try:
-            start = time.perf_counter()
-
             model = genai.GenerativeModel(self.model)
-            response = await asyncio.to_thread(model.generate_content, prompt)
-
-            latency = round(time.perf_counter() - start, 3)
-            logger.info(f"Gemini latency={latency}s")
+            with tracer.span("llm", provider=self.provider_name):
+                response = await asyncio.to_thread(model.generate_content, prompt)
 
             return response.text.strip() if response.text else None
 
@@ -1,66 +1,77 @@
 """
 Re-upload PDFs to Pinecone with HuggingFace embeddings (384 dimensions)
 Run this ONCE to fix the dimension mismatch
+
+PDFs are chunked by services.ingestion (see ingest_pdfs.py); chunk text
+and page numbers go to the local docstore (DOCSTORE_PATH, default
+data/docstore.bin); Pinecone only stores ids and vectors.
+Ship the docstore with the backend whenever the index is rebuilt.
 """
 import os
 from dotenv import load_dotenv
 from pinecone import Pinecone
 from sentence_transformers import SentenceTransformer
-from langchain_community.document_loaders import PyPDFDirectoryLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 import time
 
+from services.docstore import docstore_path, write_docstore
+from services.ingestion import ingest_directory
+
 load_dotenv()
 
-# Initialize HuggingFace embeddings
-model = SentenceTransformer('all-MiniLM-L6-v2')
+BATCH_SIZE = 100
+
+
+def main():
+    # Initialize HuggingFace embeddings
+    model = SentenceTransformer('all-MiniLM-L6-v2')
 
-pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-index_name = "ds-tutor"
+    pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+    index_name = "ds-tutor"
 
-# Delete old index
-if index_name in pc.list_indexes().names():
-    print(f"Deleting old index: {index_name}")
-    pc.delete_index(index_name)
+    # Delete old index
+    if index_name in pc.list_indexes().names():
+        print(f"Deleting old index: {index_name}")
+        pc.delete_index(index_name)
+        time.sleep(5)
+
+    # Create new index with 384 dimensions (HuggingFace)
+    pc.create_index(
+        name=index_name,
+        dimension=384,
+        metric="cosine",
+        spec={"serverless": {"cloud": "aws", "region": "us-east-1"}}
+    )
+    print(f"Created index: {index_name}")
+
+    index = pc.Index(index_name)
     time.sleep(5)
 
-# Create new index with 384 dimensions (HuggingFace)
-pc.create_index(
-    name=index_name,
-    dimension=384,
-    metric="cosine",
-    spec={"serverless": {"cloud": "aws", "region": "us-east-1"}}
-)
-print(f"Created index: {index_name}")
-
-index = pc.Index(index_name)
-time.sleep(5)
-
-# Load PDFs
-loader = PyPDFDirectoryLoader("data/ds_notes")
-documents = loader.load()
-print(f"Loaded {len(documents)} pages")
-
-# Split
-splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-chunks = splitter.split_documents(documents)
-print(f"Split into {len(chunks)} chunks")
-
-# Upload to Pinecone with HuggingFace embeddings
-for i, doc in enumerate(chunks):
-    embedding = model.encode(doc.page_content).tolist()
-    
-    index.upsert(vectors=[{
-        "id": f"chunk_{i}",
-        "values": embedding,
-        "metadata": {
-            "text": doc.page_content,
-            "page": doc.metadata.get("page", 0)
-        }
-    }])
-    
-    if (i + 1) % 10 == 0:
-        print(f"Uploaded {i + 1}/{len(chunks)} chunks")
-
-print(f"✅ Done! Uploaded {len(chunks)} chunks to Pinecone")
-print(f"Index stats: {index.describe_index_stats()}")
+    # Load and chunk PDFs (unchanged files come from the ingest cache)
+    result = ingest_directory("data/ds_notes")
+    chunks = result.chunks
+    print(f"Loaded {result.pages} pages, split into {len(chunks)} chunks in {result.seconds:.2f}s")
+
+    # Write the docstore first: retrieval needs every uploaded id to resolve
+    ids = [chunk_id for chunk_id, _, _ in chunks]
+    count = write_docstore(docstore_path(), chunks)
+    print(f"Wrote {count} chunks to {docstore_path()}")
+
+    # Upload ids + HuggingFace embeddings to Pinecone, no text
+    for start in range(0, len(chunks), BATCH_SIZE):
+        batch = chunks[start:start + BATCH_SIZE]
+        embeddings = model.encode([text for _, text, _ in batch])
+
+        index.upsert(vectors=[
+            {"id": chunk_id, "values": embedding.tolist()}
+            for chunk_id, embedding in zip(ids[start:start + BATCH_SIZE], embeddings)
+        ])
+
+        print(f"Uploaded {start + len(batch)}/{len(chunks)} chunks")
+
+    print(f"✅ Done! Uploaded {len(chunks)} chunks to Pinecone")
+    print(f"Index stats: {index.describe_index_stats()}")
+
+
+# Guarded: ingestion parses PDFs in worker processes that re-import this module
+if __name__ == "__main__":
+    main()
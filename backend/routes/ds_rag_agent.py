@@ -1,24 +1,30 @@
-from fastapi import APIRouter, Depends, Request
+from fastapi import APIRouter, Depends, HTTPException, Request
 from pydantic import BaseModel
 from typing import List, Optional
 import time
-import base64
-import httpx
 import os
 
+from services.audio_formats import AudioFormat, negotiate_format
 from services.rag_service import RAGService
+from services.response_shaper import get_response_shaper
+from services.tts_service import synthesize, to_data_uri
+from services.startup import startup_registry, COLD, WARMING
 from utils.logger import logger
+from utils.tracing import tracer
 
 router = APIRouter(tags=["📚 DS Tutor (RAG)"])
 
+DEFAULT_VOICE_ID = "EXAVITQu4vr4xnSDxMaL"  # Sarah voice
+
 
 # ------------------------------------------
 # REQUEST / RESPONSE MODELS
 # ------------------------------------------
 class DSRagRequest(BaseModel):
     question: str
-    voiceId: Optional[str] = "EXAVITQu4vr4xnSDxMaL"  # Sarah voice
+    voiceId: Optional[str] = DEFAULT_VOICE_ID
     includeAudio: Optional[bool] = False
+    audioFormat: Optional[str] = None  # mp3 (default), mp3_low, opus or webm
 
 
 class RAGResponse(BaseModel):
@@ -26,46 +32,30 @@ class RAGResponse(BaseModel):
     sources: List[str]
     provider: Optional[str] = None
     audio: Optional[str] = None  # Base64 encoded audio
+    spokenText: Optional[str] = None  # what the audio says; `answer` is the full text
 
 
 # ------------------------------------------
 # TTS FOR DS TUTOR
 # ------------------------------------------
-async def synthesize_ds_tutor_speech(text: str, voice_id: str) -> Optional[str]:
+async def ds_tutor_audio(text: str, voice_id: str, audio_format: Optional[AudioFormat] = None) -> Optional[bytes]:
     ds_elevenlabs_key = os.getenv("DS_TUTOR_ELEVENLABS_API_KEY") or os.getenv("ELEVENLABS_API_KEY")
 
-    if not text:
-        return None
-
-    # Try ElevenLabs first
-    if ds_elevenlabs_key:
-        try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                res = await client.post(
-                    f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}",
-                    headers={"xi-api-key": ds_elevenlabs_key, "Content-Type": "application/json"},
-                    json={"text": text[:5000], "model_id": "eleven_turbo_v2", "voice_settings": {"stability": 0.7, "similarity_boost": 0.8}},
-                )
-            if res.status_code == 200:
-                audio_b64 = base64.b64encode(res.content).decode()
-                return f"data:audio/mpeg;base64,{audio_b64}"
-            logger.error(f"DS Tutor ElevenLabs error {res.status_code}, falling back to gTTS")
-        except Exception as e:
-            logger.error(f"DS Tutor ElevenLabs failed: {e}, falling back to gTTS")
-
-    # Fallback to gTTS
-    try:
-        from gtts import gTTS
-        import io
-        tts = gTTS(text=text[:5000], lang='en', slow=False)
-        buf = io.BytesIO()
-        tts.write_to_fp(buf)
-        buf.seek(0)
-        audio_b64 = base64.b64encode(buf.read()).decode()
-        return f"data:audio/mpeg;base64,{audio_b64}"
-    except Exception as e:
-        logger.error(f"gTTS error: {e}")
-        return None
+    return await synthesize(
+        text,
+        voice_id,
+        api_key=ds_elevenlabs_key,
+        voice_settings={"stability": 0.7, "similarity_boost": 0.8},
+        context="DS Tutor",
+        audio_format=audio_format,
+    )
+
+
+async def synthesize_ds_tutor_speech(text: str, voice_id: str, audio_format: Optional[AudioFormat] = None) -> Optional[str]:
+    with tracer.span("tts"):
+        audio = await ds_tutor_audio(text, voice_id, audio_format)
+    with tracer.span("encode"):
+        return to_data_uri(audio)
 
 
 # ------------------------------------------
@@ -84,13 +74,24 @@ async def ds_rag_query(
     service: RAGService = Depends(get_service),
 ):
     start = time.perf_counter()
+    audio_format = negotiate_format(body.audioFormat) if body.includeAudio else None
+
+    # Refuse rather than answer "not available" while the chain is still building
+    if startup_registry.status("rag") in (COLD, WARMING):
+        raise HTTPException(503, "DS Tutor is warming up", headers={"Retry-After": "5"})
 
     answer, sources, provider = await service.process_question(body.question)
     
     # Generate audio if requested
     audio = None
+    spoken_text = None
     if body.includeAudio and body.voiceId:
-        audio = await synthesize_ds_tutor_speech(answer, body.voiceId)
+        spoken_text = get_response_shaper().shape(answer).spoken_text
+        if provider == "faq":
+            precomputed = service.faq_audio(spoken_text, body.voiceId, audio_format.name)
+            audio = to_data_uri(precomputed) if precomputed else None
+        if audio is None:
+            audio = await synthesize_ds_tutor_speech(spoken_text, body.voiceId, audio_format)
 
     elapsed = round(time.perf_counter() - start, 3)
     logger.info(f"RAG response generated in {elapsed}s (audio: {audio is not None})")
@@ -100,4 +101,5 @@ async def ds_rag_query(
         sources=sources,
         provider=provider,
         audio=audio,
+        spokenText=spoken_text,
     )
@@ -1,78 +1,167 @@
-from fastapi import APIRouter, Form, Request
-from fastapi.responses import StreamingResponse, JSONResponse
-import httpx
+from fastapi import APIRouter, Depends, Form, Request
+from fastapi.responses import StreamingResponse, JSONResponse, Response
+from pydantic import BaseModel
+from typing import List, Literal, Optional
 import os
+import re
 
-from utils.logger import log_error
+from exceptions.base import AppException, DeadlineExceeded
+from services.audio_formats import audio_mime_type, negotiate_format
+from services.tts_batch import TTSBatch, batch_audio_cache, batch_concurrency, batch_max_items, stream_zip
+from services.tts_service import MAX_TEXT_CHARS, open_stream
+from services.voice_catalog import VoiceCatalog, VoiceCatalogError, etag_matches, get_voice_catalog
+from utils.logger import log_error, logger
+from utils.tracing import tracer
 
 router = APIRouter(tags=["🔊 Text to Speech"])
 
-ELEVEN_URL = "https://api.elevenlabs.io/v1"
+# How long browsers may reuse /voices without revalidating
+VOICES_BROWSER_MAX_AGE = int(os.getenv("VOICES_BROWSER_MAX_AGE", "300"))
+
+DEFAULT_VOICE_ID = "EXAVITQu4vr4xnSDxMaL"
+SPEECH_VOICE_SETTINGS = {"stability": 0.5, "similarity_boost": 0.8}
+
+AUDIO_ID_RE = re.compile(r"^[0-9a-f]{64}$")
 
 def get_api_key():
     return os.getenv("ELEVENLABS_API_KEY")
 
 
+class SpeechBatchItem(BaseModel):
+    text: str
+    voiceId: str = DEFAULT_VOICE_ID
+
+
+class SpeechBatchRequest(BaseModel):
+    items: List[SpeechBatchItem]
+    format: Literal["ids", "zip"] = "ids"
+
+
 # ---------------------------------------------
 # 🔊 TEXT → SPEECH
 # ---------------------------------------------
 # Fix default voiceId to use valid ElevenLabs voice
-@router.post("/speech", summary="🔊 Convert text to audio", description="Send text → get MP3 audio back using ElevenLabs (fallback: gTTS)")
+@router.post("/speech", summary="🔊 Convert text to audio", description="Send text → get audio back using ElevenLabs (fallback: local engine, then gTTS). Pick the encoding with audioFormat (mp3, mp3_low, opus, webm) or Accept")
 async def text_to_speech(
     request: Request,
     text: str = Form(None),
-    voiceId: str = Form("EXAVITQu4vr4xnSDxMaL"),
+    voiceId: str = Form(DEFAULT_VOICE_ID),
+    audioFormat: Optional[str] = Form(None),
 ):
     try:
         if text is None:
             try:
                 data = await request.json()
                 text = data.get("text", "").strip()
+                audioFormat = data.get("audioFormat")
             except Exception as e:
                 log_error(e, "JSON parsing")
                 return JSONResponse({"error": "Invalid JSON body"}, status_code=400)
 
         if not text:
             return JSONResponse({"error": "Text is empty"}, status_code=400)
+        if len(text) > MAX_TEXT_CHARS:
+            return JSONResponse({"error": f"Text is longer than {MAX_TEXT_CHARS} characters"}, status_code=413)
+
+        audio_format = negotiate_format(audioFormat, request.headers.get("accept"))
+
+        # ElevenLabs first, then the local engine and gTTS; long text streams segment by segment
+        with tracer.span("tts"):
+            stream = await open_stream(
+                text,
+                voiceId,
+                api_key=get_api_key(),
+                voice_settings=SPEECH_VOICE_SETTINGS,
+                context="TTS",
+                audio_format=audio_format,
+            )
+        if stream is None:
+            return JSONResponse({"error": "Speech synthesis failed"}, status_code=500)
 
-        # Try ElevenLabs first, fallback to gTTS
-        api_key = get_api_key()
-        if api_key:
-            url = f"{ELEVEN_URL}/text-to-speech/{voiceId}"
-            payload = {
-                "text": text[:5000],
-                "model_id": "eleven_turbo_v2",
-                "voice_settings": {"stability": 0.5, "similarity_boost": 0.8},
-            }
-            headers = {"xi-api-key": api_key, "Content-Type": "application/json"}
-
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                res = await client.post(url, headers=headers, json=payload)
-
-            if res.status_code == 200:
-                return StreamingResponse(iter([res.content]), media_type="audio/mpeg")
-
-            log_error(Exception(res.text), "TTS failed, falling back to gTTS")
-
-        # Fallback to gTTS
-        from gtts import gTTS
-        import io
-        tts = gTTS(text=text[:5000], lang='en', slow=False)
-        buf = io.BytesIO()
-        tts.write_to_fp(buf)
-        buf.seek(0)
-        return StreamingResponse(buf, media_type="audio/mpeg")
+        # The format may come from Accept, so caches must key on it
+        return StreamingResponse(stream, media_type=stream.media_type, headers={"Vary": "Accept"})
+
+    except DeadlineExceeded as e:
+        log_error(e, "TTS")
+        return JSONResponse({"error": e.message}, status_code=504)
+
+    except AppException as e:
+        return JSONResponse({"error": e.message}, status_code=e.status_code)
 
     except Exception as e:
         log_error(e, "TTS")
         return JSONResponse({"error": "Internal server error"}, status_code=500)
 
 
+# ---------------------------------------------
+# 📦 BATCH TEXT → SPEECH
+# ---------------------------------------------
+@router.post("/speech/batch", summary="📦 Convert many texts to audio", description="Send many (text, voiceId) items → duplicates are synthesized once; get audio IDs with per-item status, or a streamed zip")
+async def text_to_speech_batch(body: SpeechBatchRequest):
+    if not body.items:
+        return JSONResponse({"error": "No items"}, status_code=400)
+
+    max_items = batch_max_items()
+    if len(body.items) > max_items:
+        return JSONResponse({"error": f"At most {max_items} items per batch"}, status_code=413)
+    too_long = [i for i, item in enumerate(body.items) if len(item.text) > MAX_TEXT_CHARS]
+    if too_long:
+        return JSONResponse(
+            {"error": f"Item text is longer than {MAX_TEXT_CHARS} characters", "items": too_long},
+            status_code=413,
+        )
+
+    batch = TTSBatch(
+        [(item.text, item.voiceId) for item in body.items],
+        api_key=get_api_key(),
+        voice_settings=SPEECH_VOICE_SETTINGS,
+        concurrency=batch_concurrency(),
+    )
+    logger.info(f"TTS batch: {batch.size} items, {len(batch.jobs)} unique, format={body.format}")
+
+    if body.format == "zip":
+        return StreamingResponse(
+            stream_zip(batch),
+            media_type="application/zip",
+            headers={"Content-Disposition": 'attachment; filename="speech.zip"'},
+        )
+
+    try:
+        with tracer.span("tts", batch=True):
+            async for _ in batch.run():
+                pass
+    except Exception as e:
+        log_error(e, "TTS Batch")
+        return JSONResponse({"error": "Internal server error"}, status_code=500)
+
+    return batch.summary()
+
+
+@router.get("/speech/audio/{audio_id}", summary="🎧 Fetch batch audio", description="Audio for an audio ID returned by /speech/batch (kept for 24h)")
+async def get_batch_audio(audio_id: str):
+    if not AUDIO_ID_RE.match(audio_id):
+        return JSONResponse({"error": "Invalid audio ID"}, status_code=400)
+
+    audio = await batch_audio_cache().get(audio_id)
+    if audio is None:
+        return JSONResponse({"error": "Audio not found or expired"}, status_code=404)
+
+    # Content-addressed, so it never changes
+    return Response(
+        audio,
+        media_type=audio_mime_type(audio),
+        headers={"Cache-Control": "public, max-age=86400, immutable", "ETag": f'"{audio_id}"'},
+    )
+
+
 # ---------------------------------------------
 # 🎵 GET VOICES
 # ---------------------------------------------
-@router.get("/voices", summary="🎵 Get available voices", description="Returns list of ElevenLabs voices for the voice selector dropdown")
-async def get_voices():
+@router.get("/voices", summary="🎵 Get available voices", description="Returns list of ElevenLabs voices for the voice selector dropdown (cached server-side, supports ETag / 304)")
+async def get_voices(
+    request: Request,
+    catalog: VoiceCatalog = Depends(get_voice_catalog),
+):
     try:
         api_key = get_api_key()
         if not api_key:
@@ -81,31 +170,24 @@ async def get_voices():
                 status_code=500,
             )
 
-        url = f"{ELEVEN_URL}/voices"
+        voices, etag = await catalog.get()
+
         headers = {
-            "xi-api-key": api_key,
-            "Accept": "application/json",
+            "ETag": etag,
+            "Cache-Control": f"public, max-age={VOICES_BROWSER_MAX_AGE}, stale-while-revalidate={int(catalog.stale_ttl)}",
         }
 
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            res = await client.get(url, headers=headers)
-
-        if res.status_code != 200:
-            log_error(Exception(res.text), "Get Voices")
-            return JSONResponse(
-                {"error": "Failed to fetch voices"},
-                status_code=500,
-            )
-
-        voices = res.json().get("voices", [])
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
 
-        clean = [
-            {"id": v.get("voice_id"), "name": v.get("name")}
-            for v in voices
-            if v.get("voice_id") and v.get("name")
-        ]
+        return JSONResponse({"voices": voices}, headers=headers)
 
-        return {"voices": clean}
+    except VoiceCatalogError as e:
+        log_error(e, "Get Voices")
+        return JSONResponse(
+            {"error": "Failed to fetch voices"},
+            status_code=500,
+        )
 
     except Exception as e:
         log_error(e, "Get Voices")
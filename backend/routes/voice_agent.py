@@ -8,12 +8,26 @@ import os
 from abc import ABC, abstractmethod
 from typing import Optional
 from pathlib import Path
-import google.generativeai as genai
 
+from services.audio_formats import AudioFormat, negotiate_format
+from services.conversation import get_conversation_store
+from services.intent_router import AGENT, DIRECT, get_intent_router
+from services.response_shaper import get_response_shaper
+from services.transcription import STT_MODEL, get_transcript_cache
+from services.tts_service import synthesize, to_data_uri
+from services.web_search import get_search_service
+from exceptions.base import DeadlineExceeded
+from utils.deadline import run_stage
 from utils.logger import logger
+from utils.tracing import tracer
+from utils.upstreams import gemini_async_supported, gemini_client_kwargs, get_http_client
 
 router = APIRouter(tags=["🤖 Voice Agent"])
 
+# Spoken when generation fails; never stored as a real assistant turn
+ERROR_REPLY = "I encountered an error."
+EMPTY_REPLY = "I couldn't process that."
+
 # --------------------------------------------
 # MODELS
 # --------------------------------------------
@@ -21,12 +35,16 @@ router = APIRouter(tags=["🤖 Voice Agent"])
 class TextAgentRequest(BaseModel):
     text: str
     voiceId: str = "21m00Tcm4TlvDq8ikWAM"
+    sessionId: Optional[str] = None
+    audioFormat: Optional[str] = None  # mp3 (default), mp3_low, opus or webm
 
 
 class AgentResponse(BaseModel):
     userText: str
     text: str
     audio: Optional[str] = None
+    spokenText: Optional[str] = None  # what the audio says; `text` is the full answer
+    sessionId: Optional[str] = None
 
 
 # --------------------------------------------
@@ -39,11 +57,15 @@ class BaseVoiceAgent(ABC):
         pass
 
     @abstractmethod
-    async def generate_response(self, text: str) -> str:
+    async def generate_response(self, text: str, history: str = "") -> str:
         pass
 
     @abstractmethod
-    async def synthesize_speech(self, text: str, voice_id: str) -> Optional[str]:
+    async def generate_direct_response(self, text: str, history: str = "") -> str:
+        pass
+
+    @abstractmethod
+    async def synthesize_speech(self, text: str, voice_id: str, audio_format: Optional[AudioFormat] = None) -> Optional[str]:
         pass
 
 
@@ -53,14 +75,29 @@ class BaseVoiceAgent(ABC):
 
 class GeminiVoiceAgent(BaseVoiceAgent):
     def __init__(self, http_client: httpx.AsyncClient):
+        import google.generativeai as genai
+
         # Use ONLY the dedicated Voice Agent Gemini key
         voice_agent_key = os.getenv("VOICE_AGENT_GEMINI_API_KEY") or os.getenv("GEMINI_API_KEY")
-        genai.configure(api_key=voice_agent_key)
+        genai.configure(api_key=voice_agent_key, **gemini_client_kwargs())
         self.http = http_client
+        self._llm = None
 
     def get_elevenlabs_key(self):
         return os.getenv("ELEVENLABS_API_KEY")
 
+    def get_llm(self):
+        if self._llm is None:
+            from langchain_google_genai import ChatGoogleGenerativeAI
+
+            self._llm = ChatGoogleGenerativeAI(
+                model="gemini-1.5-flash",
+                google_api_key=os.getenv("VOICE_AGENT_GEMINI_API_KEY") or os.getenv("GEMINI_API_KEY"),
+                temperature=0.3,
+                **gemini_client_kwargs(),
+            )
+        return self._llm
+
     async def transcribe(self, audio_path: str) -> str:
         try:
             with open(audio_path, "rb") as f:
@@ -71,92 +108,106 @@ class GeminiVoiceAgent(BaseVoiceAgent):
 
             audio_b64 = base64.b64encode(audio).decode()
 
-            model = genai.GenerativeModel("gemini-2.5-flash-lite")
-            response = await asyncio.to_thread(model.generate_content, [
+            import google.generativeai as genai
+            model = genai.GenerativeModel(STT_MODEL)
+            response = await run_stage("transcribe", asyncio.to_thread(model.generate_content, [
                 "Transcribe this audio accurately. Output ONLY the text:",
                 {"mime_type": "audio/webm", "data": audio_b64},
-            ])
+            ]))
 
             return response.text.strip() if response.text else ""
 
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.error(f"Transcription error: {e}")
             return ""
 
-    async def generate_response(self, text: str) -> str:
+    async def generate_response(self, text: str, history: str = "") -> str:
         try:
-            from langchain_google_genai import ChatGoogleGenerativeAI
             from langchain.agents import AgentExecutor, create_tool_calling_agent
             from langchain_core.prompts import ChatPromptTemplate
-            from langchain_core.tools import tool
-
-            @tool
-            def web_search(query: str) -> str:
-                """Search the web for real-time information, latest news, current events, prices."""
-                try:
-                    from ddgs import DDGS
-                    results = DDGS().text(query, max_results=3)
-                    if not results:
-                        return "No results found."
-                    return "\n".join([f"{r['title']}: {r['body']}" for r in results])
-                except Exception as e:
-                    return f"Search failed: {e}"
-
-            llm = ChatGoogleGenerativeAI(
-                model="gemini-1.5-flash",
-                google_api_key=os.getenv("VOICE_AGENT_GEMINI_API_KEY") or os.getenv("GEMINI_API_KEY"),
-                temperature=0.3
+            from langchain_core.tools import StructuredTool
+
+            search_service = get_search_service()
+            loop = asyncio.get_running_loop()
+
+            async def search(query: str) -> str:
+                return await search_service.search(query)
+
+            def search_from_thread(query: str) -> str:
+                # The agent runs on a worker thread when it can't run async
+                return asyncio.run_coroutine_threadsafe(search_service.search(query), loop).result()
+
+            web_search = StructuredTool.from_function(
+                func=search_from_thread,
+                coroutine=search,
+                name="web_search",
+                description="Search the web for real-time information, latest news, current events, prices.",
             )
 
+            llm = self.get_llm()
+
             prompt = ChatPromptTemplate.from_messages([
-                ("system", "You are a helpful voice assistant. Answer briefly and clearly. Use web_search tool for real-time info like news, weather, prices, current events."),
+                ("system", "You are a helpful voice assistant. Answer briefly and clearly. Use web_search tool for real-time info like news, weather, prices, current events. " + get_response_shaper().prompt_hint()),
+                ("system", "{history}"),
                 ("human", "{input}"),
                 ("placeholder", "{agent_scratchpad}"),
             ])
 
             agent = create_tool_calling_agent(llm, [web_search], prompt)
-            executor = AgentExecutor(agent=agent, tools=[web_search], verbose=True, max_iterations=3)
-            result = await asyncio.to_thread(executor.invoke, {"input": text})
-            logger.info(f"Agent result: {result}")
-            return result.get("output", "I couldn't process that.")
-
+            executor = AgentExecutor(agent=agent, tools=[web_search], verbose=False, max_iterations=3)
+            inputs = {"input": text, "history": history or "This is the start of the conversation."}
+            if gemini_async_supported():
+                # ainvoke: tool calls issued in the same step run concurrently
+                call = executor.ainvoke(inputs)
+            else:
+                call = asyncio.to_thread(executor.invoke, inputs)
+            result = await run_stage("llm", call)
+            output = result.get("output", EMPTY_REPLY)
+            logger.info(f"Agent answered ({len(output)} chars)")
+            return output
+
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.error(f"Response generation error: {e}")
-            return "I encountered an error."
-
-    async def synthesize_speech(self, text: str, voice_id: str) -> Optional[str]:
-        if not text:
-            return None
-
-        # Try ElevenLabs first
-        elevenlabs_key = self.get_elevenlabs_key()
-        if elevenlabs_key:
-            try:
-                res = await self.http.post(
-                    f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}",
-                    headers={"xi-api-key": elevenlabs_key, "Content-Type": "application/json"},
-                    json={"text": text[:5000], "model_id": "eleven_turbo_v2"},
-                )
-                if res.status_code == 200:
-                    audio_b64 = base64.b64encode(res.content).decode()
-                    return f"data:audio/mpeg;base64,{audio_b64}"
-                logger.error(f"ElevenLabs error {res.status_code}, falling back to gTTS")
-            except Exception as e:
-                logger.error(f"ElevenLabs failed: {e}, falling back to gTTS")
-
-        # Fallback to gTTS
+            return ERROR_REPLY
+
+    async def generate_direct_response(self, text: str, history: str = "") -> str:
+        """Single LLM call without tool scaffolding, for turns that need no web search."""
         try:
-            from gtts import gTTS
-            import io
-            tts = gTTS(text=text[:5000], lang='en', slow=False)
-            buf = io.BytesIO()
-            tts.write_to_fp(buf)
-            buf.seek(0)
-            audio_b64 = base64.b64encode(buf.read()).decode()
-            return f"data:audio/mpeg;base64,{audio_b64}"
+            messages = [
+                ("system", "You are a helpful voice assistant. Answer briefly and clearly. " + get_response_shaper().prompt_hint()),
+                ("system", history or "This is the start of the conversation."),
+                ("human", text),
+            ]
+            llm = self.get_llm()
+            if gemini_async_supported():
+                call = llm.ainvoke(messages)
+            else:
+                call = asyncio.to_thread(llm.invoke, messages)
+            result = await run_stage("llm", call)
+            return result.content or EMPTY_REPLY
+
+        except DeadlineExceeded:
+            raise
         except Exception as e:
-            logger.error(f"gTTS error: {e}")
-            return None
+            logger.error(f"Direct response error: {e}")
+            return ERROR_REPLY
+
+    async def synthesize_speech(self, text: str, voice_id: str, audio_format: Optional[AudioFormat] = None) -> Optional[str]:
+        with tracer.span("tts"):
+            audio = await synthesize(
+                text,
+                voice_id,
+                api_key=self.get_elevenlabs_key(),
+                client=self.http,
+                context="Voice Agent",
+                audio_format=audio_format,
+            )
+        with tracer.span("encode"):
+            return to_data_uri(audio)
 
 
 # --------------------------------------------
@@ -165,11 +216,56 @@ class GeminiVoiceAgent(BaseVoiceAgent):
 
 class VoiceAgentOrchestrator:
     def __init__(self):
-        self.http_client = httpx.AsyncClient(timeout=30.0)
+        self.http_client = get_http_client()
         self.agent = GeminiVoiceAgent(self.http_client)
+        self.conversations = get_conversation_store()
+        self.transcripts = get_transcript_cache()
+        self.shaper = get_response_shaper()
+        # INTENT_ROUTER=0 sends every turn through the agent (baseline for benchmarks)
+        self.router = get_intent_router() if os.getenv("INTENT_ROUTER", "1") != "0" else None
         self.max_file_size = 50 * 1024 * 1024
 
-    async def process_voice(self, file: UploadFile, voice_id: str) -> AgentResponse:
+    async def respond(
+        self,
+        user_text: str,
+        voice_id: str,
+        session_id: Optional[str],
+        audio_format: Optional[AudioFormat] = None,
+    ) -> AgentResponse:
+        session_id, session = await self.conversations.load(session_id)
+
+        route, reason = self.router.route(user_text) if self.router else (AGENT, "router_disabled")
+        logger.info(f"Intent route={route} ({reason})")
+
+        with tracer.span("llm", route=route):
+            if route == DIRECT:
+                ai_text = await self.agent.generate_direct_response(user_text, session.render())
+            else:
+                ai_text = await self.agent.generate_response(user_text, session.render())
+
+        if ai_text not in (ERROR_REPLY, EMPTY_REPLY):
+            session.add_turn(user_text, ai_text)
+            await self.conversations.save(session_id, session)
+
+        # Only the spoken budget goes to TTS; the full answer is returned as text
+        shaped = self.shaper.shape(ai_text)
+        audio = await self.agent.synthesize_speech(shaped.spoken_text, voice_id, audio_format)
+
+        return AgentResponse(
+            userText=user_text,
+            text=ai_text,
+            audio=audio,
+            spokenText=shaped.spoken_text,
+            sessionId=session_id,
+        )
+
+    async def process_voice(
+        self,
+        file: UploadFile,
+        voice_id: str,
+        session_id: Optional[str] = None,
+        audio_format: Optional[AudioFormat] = None,
+    ) -> AgentResponse:
         tmp_path = None
 
         try:
@@ -180,45 +276,43 @@ class VoiceAgentOrchestrator:
             if ext not in {".webm", ".wav", ".mp3"}:
                 raise HTTPException(400, "Unsupported audio format")
 
-            content = await file.read()
+            with tracer.span("upload_read"):
+                content = await file.read()
             if len(content) > self.max_file_size:
                 raise HTTPException(413, "File too large")
 
-            with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as tmp:
-                tmp.write(content)
-                tmp_path = tmp.name
+            async def transcribe() -> str:
+                nonlocal tmp_path
+                with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as tmp:
+                    tmp.write(content)
+                    tmp_path = tmp.name
+                return await self.agent.transcribe(tmp_path)
 
-            user_text = await self.agent.transcribe(tmp_path)
+            # Retried or repeated clips skip STT entirely
+            with tracer.span("transcribe"):
+                user_text = await self.transcripts.get_or_transcribe(content, transcribe)
             if not user_text:
                 raise HTTPException(400, "No speech detected")
 
-            ai_text = await self.agent.generate_response(user_text)
-            audio = await self.agent.synthesize_speech(ai_text, voice_id)
-
-            return AgentResponse(
-                userText=user_text,
-                text=ai_text,
-                audio=audio,
-            )
+            return await self.respond(user_text, voice_id, session_id, audio_format)
 
         finally:
             if tmp_path and os.path.exists(tmp_path):
                 os.unlink(tmp_path)
 
-    async def process_text(self, text: str, voice_id: str) -> AgentResponse:
+    async def process_text(
+        self,
+        text: str,
+        voice_id: str,
+        session_id: Optional[str] = None,
+        audio_format: Optional[AudioFormat] = None,
+    ) -> AgentResponse:
         if not text.strip():
             raise HTTPException(400, "Text is empty")
 
         text = text.strip()[:1000]
 
-        ai_text = await self.agent.generate_response(text)
-        audio = await self.agent.synthesize_speech(ai_text, voice_id)
-
-        return AgentResponse(
-            userText=text,
-            text=ai_text,
-            audio=audio,
-        )
+        return await self.respond(text, voice_id, session_id, audio_format)
 
 
 # --------------------------------------------
@@ -243,9 +337,11 @@ def get_orchestrator():
 async def voice_agent(
     file: UploadFile = File(...),
     voiceId: str = Form("21m00Tcm4TlvDq8ikWAM"),
+    sessionId: Optional[str] = Form(None),
+    audioFormat: Optional[str] = Form(None),
     orchestrator: VoiceAgentOrchestrator = Depends(get_orchestrator),
 ):
-    return await orchestrator.process_voice(file, voiceId)
+    return await orchestrator.process_voice(file, voiceId, sessionId, negotiate_format(audioFormat))
 
 
 @router.post("/text-agent", response_model=AgentResponse, summary="⌨️ Type to AI agent", description="Type your question → Gemini responds → ElevenLabs speaks back")
@@ -253,7 +349,12 @@ async def text_agent(
     request: TextAgentRequest,
     orchestrator: VoiceAgentOrchestrator = Depends(get_orchestrator),
 ):
-    return await orchestrator.process_text(request.text, request.voiceId)
+    return await orchestrator.process_text(
+        request.text,
+        request.voiceId,
+        request.sessionId,
+        negotiate_format(request.audioFormat),
+    )
 
 
 @router.get("/voice-agent-health", summary="✅ Voice agent health check")
@@ -1,13 +1,19 @@
 import asyncio
-from fastapi import APIRouter, UploadFile, File, Form
+from fastapi import APIRouter, UploadFile, File, Form, Request
 from fastapi.responses import JSONResponse, StreamingResponse
 from pathlib import Path
-import google.generativeai as genai
-import httpx
+from typing import Optional
 import os
 import tempfile
 
+from exceptions.base import AppException, DeadlineExceeded
+from services.audio_formats import negotiate_format
+from services.transcription import STT_MODEL, get_transcript_cache
+from services.tts_service import open_stream
+from utils.deadline import run_stage
 from utils.logger import log_error
+from utils.tracing import tracer
+from utils.upstreams import gemini_client_kwargs
 
 router = APIRouter(tags=["🎤 Speech to Speech"])
 
@@ -20,64 +26,31 @@ def get_eleven_key():
     return os.getenv("ELEVENLABS_API_KEY")
 
 
-# ---------------------------------------------------------
-# ElevenLabs TTS
-# ---------------------------------------------------------
-async def eleven_tts(text: str, voice_id: str):
-    api_key = get_eleven_key()
-    if not api_key or not text:
-        return None
-
-    url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}"
-
-    payload = {
-        "text": text[:5000],
-        "model_id": "eleven_turbo_v2",
-        "voice_settings": {
-            "stability": 0.4,
-            "similarity_boost": 0.8,
-        },
-    }
-
-    headers = {
-        "xi-api-key": api_key,
-        "Content-Type": "application/json",
-    }
-
-    try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            res = await client.post(url, headers=headers, json=payload)
-
-        if res.status_code != 200:
-            log_error(Exception(res.text), "Voice Transform TTS")
-            return None
-
-        return res.content
-
-    except Exception as e:
-        log_error(e, "Voice Transform ElevenLabs")
-        return None
-
-
 # ---------------------------------------------------------
 # VOICE TRANSFORM ENDPOINT
 # ---------------------------------------------------------
 @router.post("/voice-transform", summary="🎤 Upload audio → get different voice", description="Upload your voice recording → Gemini transcribes → ElevenLabs speaks in selected voice")
 async def voice_transform(
+    request: Request,
     file: UploadFile = File(...),
     voiceId: str = Form(...),
+    audioFormat: Optional[str] = Form(None),
 ):
     tmp_path = None
 
     try:
+        audio_format = negotiate_format(audioFormat, request.headers.get("accept"))
+
         gemini_key = get_gemini_key()
         if not gemini_key:
             return JSONResponse(
                 {"error": "Gemini not configured"},
                 status_code=500,
             )
-        
-        genai.configure(api_key=gemini_key)
+
+        # Heavy SDK; already imported if startup warmup has run
+        import google.generativeai as genai
+        genai.configure(api_key=gemini_key, **gemini_client_kwargs())
 
         if not file.filename:
             return JSONResponse(
@@ -92,7 +65,8 @@ async def voice_transform(
                 status_code=400,
             )
 
-        content = await file.read()
+        with tracer.span("upload_read"):
+            content = await file.read()
         if not content:
             return JSONResponse(
                 {"error": "Empty file"},
@@ -105,30 +79,34 @@ async def voice_transform(
                 status_code=413,
             )
 
-        with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as temp:
-            temp.write(content)
-            tmp_path = temp.name
-
         # -------------------------
-        # Gemini Speech-to-Text
+        # Gemini Speech-to-Text (skipped for clips we've already transcribed)
         # -------------------------
-        model = genai.GenerativeModel("gemini-2.5-flash-lite")
+        async def transcribe() -> str:
+            nonlocal tmp_path
+            with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as temp:
+                temp.write(content)
+                tmp_path = temp.name
 
-        with open(tmp_path, "rb") as audio_file:
-            audio_data = audio_file.read()
+            model = genai.GenerativeModel(STT_MODEL)
 
-        import base64
-        audio_b64 = base64.b64encode(audio_data).decode()
+            with open(tmp_path, "rb") as audio_file:
+                audio_data = audio_file.read()
 
-        stt_response = await asyncio.to_thread(model.generate_content, [
-                {
-                    "mime_type": "audio/webm",
-                    "data": audio_b64,
-                },
-                "Transcribe this audio accurately. Output ONLY the text:",
-            ])
+            import base64
+            audio_b64 = base64.b64encode(audio_data).decode()
 
-        text = (stt_response.text or "").strip()
+            stt_response = await run_stage("transcribe", asyncio.to_thread(model.generate_content, [
+                    {
+                        "mime_type": "audio/webm",
+                        "data": audio_b64,
+                    },
+                    "Transcribe this audio accurately. Output ONLY the text:",
+                ]))
+            return (stt_response.text or "").strip()
+
+        with tracer.span("transcribe"):
+            text = await get_transcript_cache().get_or_transcribe(content, transcribe)
 
         if not text:
             return JSONResponse(
@@ -136,20 +114,39 @@ async def voice_transform(
                 status_code=400,
             )
 
-        # ElevenLabs TTS with gTTS fallback
-        audio_bytes = await eleven_tts(text, voiceId)
-        if not audio_bytes:
-            from gtts import gTTS
-            import io
-            tts = gTTS(text=text[:5000], lang='en', slow=False)
-            buf = io.BytesIO()
-            tts.write_to_fp(buf)
-            buf.seek(0)
-            audio_bytes = buf.read()
+        # ElevenLabs TTS with local/gTTS fallback, streamed segment by segment
+        with tracer.span("tts"):
+            stream = await open_stream(
+                text,
+                voiceId,
+                api_key=get_eleven_key(),
+                voice_settings={"stability": 0.4, "similarity_boost": 0.8},
+                context="Voice Transform",
+                audio_format=audio_format,
+            )
+        if stream is None:
+            return JSONResponse(
+                {"error": "Speech synthesis failed"},
+                status_code=500,
+            )
 
         return StreamingResponse(
-            iter([audio_bytes]),
-            media_type="audio/mpeg",
+            stream,
+            media_type=stream.media_type,
+            headers={"Vary": "Accept"},
+        )
+
+    except DeadlineExceeded as e:
+        log_error(e, "Voice Transform")
+        return JSONResponse(
+            {"error": e.message},
+            status_code=504,
+        )
+
+    except AppException as e:
+        return JSONResponse(
+            {"error": e.message},
+            status_code=e.status_code,
         )
 
     except Exception as e:
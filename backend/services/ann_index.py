@@ -0,0 +1,217 @@
+import os
+import json
+import shutil
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from utils.logger import logger
+
+QUANTIZATIONS = ("int8", "float16", "float32")
+FORMAT_VERSION = 1
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray, chunk: int = 65536) -> np.ndarray:
+    """Nearest centroid per vector, in chunks to bound the score matrix."""
+    assignments = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), chunk):
+        block = np.asarray(vectors[start:start + chunk], dtype=np.float32)
+        assignments[start:start + chunk] = np.argmax(block @ centroids.T, axis=1)
+    return assignments
+
+
+def train_centroids(vectors: np.ndarray, nlist: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Spherical k-means on a sample of up to 64 vectors per list."""
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(vectors), nlist * 64)
+    sample = vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))]
+    centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignments = _assign(sample, centroids)
+        order = np.argsort(assignments, kind="stable")
+        counts = np.bincount(assignments, minlength=nlist)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+        sums = np.zeros_like(centroids)
+        filled = counts > 0
+        sums[filled] = np.add.reduceat(sample[order], starts[filled], axis=0)
+        # Reseed empty lists from random sample points
+        empty = int((~filled).sum())
+        if empty:
+            sums[~filled] = sample[rng.choice(sample_size, empty, replace=False)]
+        centroids = _normalize(sums).astype(np.float32)
+
+    return centroids
+
+
+def quantize(vectors: np.ndarray, quantization: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Encode unit vectors for storage. int8 uses one symmetric scale per
+    vector (a quarter of float32's size); float16 halves it.
+    """
+    if quantization == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.round(vectors / scales[:, None]).astype(np.int8)
+        return codes, scales.astype(np.float32)
+    if quantization == "float16":
+        return vectors.astype(np.float16), None
+    if quantization == "float32":
+        return vectors.astype(np.float32), None
+    raise ValueError(f"Unknown quantization '{quantization}' (choose from {', '.join(QUANTIZATIONS)})")
+
+
+def build_ivf_index(
+    vectors: np.ndarray,
+    path: str,
+    nlist: Optional[int] = None,
+    quantization: str = "int8",
+    iterations: int = 10,
+    seed: int = 0,
+) -> "IVFIndex":
+    """
+    Cluster `vectors` (row i = docstore ordinal i) into `nlist` inverted
+    lists, quantize them and write the index to the directory `path`.
+
+    Vectors are stored grouped by list so a probe reads one contiguous
+    slice. The directory is built beside `path` and swapped in whole.
+    """
+    vectors = _normalize(np.asarray(vectors, dtype=np.float32))
+    count, dim = vectors.shape
+    nlist = min(count, nlist or max(1, int(4 * np.sqrt(count))))
+
+    centroids = train_centroids(vectors, nlist, iterations=iterations, seed=seed)
+    assignments = _assign(vectors, centroids)
+    order = np.argsort(assignments, kind="stable")
+    offsets = np.zeros(nlist + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(np.bincount(assignments, minlength=nlist))
+    codes, scales = quantize(vectors[order], quantization)
+
+    tmp_path = f"{path}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    np.save(os.path.join(tmp_path, "centroids.npy"), centroids)
+    np.save(os.path.join(tmp_path, "offsets.npy"), offsets)
+    np.save(os.path.join(tmp_path, "vectors.npy"), codes)
+    np.save(os.path.join(tmp_path, "ordinals.npy"), order.astype(np.int64))
+    if scales is not None:
+        np.save(os.path.join(tmp_path, "scales.npy"), scales)
+    with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+        json.dump({
+            "version": FORMAT_VERSION,
+            "count": count,
+            "dim": dim,
+            "nlist": nlist,
+            "quantization": quantization,
+            "metric": "cosine",
+        }, f)
+
+    old_path = f"{path}.old"
+    if os.path.exists(path):
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+    logger.info(f"ANN index built: {count} vectors, {nlist} lists, {quantization} at {path}")
+    return IVFIndex(path)
+
+
+class IVFIndex:
+    """
+    Inverted-file ANN index over quantized unit vectors (cosine similarity).
+
+    Centroids are loaded into memory; the vectors are memory-mapped, so
+    resident memory grows only with the lists actually probed. `nprobe` is
+    the recall/latency knob: how many of the nearest lists are scanned per
+    query.
+    """
+
+    def __init__(self, path: str, nprobe: int = 8, ids: Optional[List[str]] = None):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"{path}: unsupported ANN index version {self.meta.get('version')}")
+
+        self.quantization = self.meta["quantization"]
+        self.nlist = self.meta["nlist"]
+        self.nprobe = nprobe
+        # Docstore ids by ordinal, so `query` answers like a hosted vector index
+        self.ids = ids
+
+        self.centroids = np.load(os.path.join(path, "centroids.npy"))
+        self.offsets = np.load(os.path.join(path, "offsets.npy"))
+        self.vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+        self.ordinals = np.load(os.path.join(path, "ordinals.npy"), mmap_mode="r")
+        scales_path = os.path.join(path, "scales.npy")
+        self.scales = np.load(scales_path, mmap_mode="r") if os.path.exists(scales_path) else None
+
+    def __len__(self) -> int:
+        return self.meta["count"]
+
+    def search(self, query: np.ndarray, k: int = 3, nprobe: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-`k` (ordinals, cosine scores), best first."""
+        query = _normalize(np.asarray(query, dtype=np.float32))
+        nprobe = max(1, min(nprobe or self.nprobe, self.nlist))
+
+        centroid_scores = self.centroids @ query
+        lists = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+
+        scores, positions = [], []
+        for list_id in lists:
+            start, end = int(self.offsets[list_id]), int(self.offsets[list_id + 1])
+            if start == end:
+                continue
+            block_scores = np.asarray(self.vectors[start:end], dtype=np.float32) @ query
+            if self.scales is not None:
+                block_scores *= self.scales[start:end]
+            scores.append(block_scores)
+            positions.append(np.arange(start, end))
+
+        if not scores:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        scores = np.concatenate(scores)
+        positions = np.concatenate(positions)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return np.asarray(self.ordinals[positions[top]]), scores[top]
+
+    def query(self, vector: List[float], top_k: int = 3, **kwargs) -> dict:
+        """Pinecone-shaped query (ids and scores only), for `DocstoreRetriever`."""
+        ordinals, scores = self.search(np.asarray(vector, dtype=np.float32), top_k)
+        return {"matches": [
+            {"id": self.ids[ordinal] if self.ids is not None else str(ordinal), "score": float(score)}
+            for ordinal, score in zip(ordinals, scores)
+        ]}
+
+    def nbytes(self) -> int:
+        """Size of the stored index (what a full scan would page in)."""
+        arrays = [self.centroids, self.offsets, self.vectors, self.ordinals]
+        if self.scales is not None:
+            arrays.append(self.scales)
+        return sum(array.nbytes for array in arrays)
+
+
+def ann_index_path() -> str:
+    return os.getenv("ANN_INDEX_PATH", os.path.join("data", "ann_index"))
+
+
+def load_ann_index(ids: Optional[List[str]] = None, path: Optional[str] = None) -> Optional[IVFIndex]:
+    path = path or ann_index_path()
+    if not os.path.exists(os.path.join(path, "meta.json")):
+        return None
+    index = IVFIndex(path, nprobe=int(os.getenv("ANN_NPROBE", "8")), ids=ids)
+    logger.info(
+        f"ANN index loaded: {len(index)} vectors, {index.nlist} lists, "
+        f"{index.quantization}, nprobe={index.nprobe}"
+    )
+    return index
@@ -0,0 +1,221 @@
+import asyncio
+import shutil
+from typing import AsyncIterator, Dict, List, Optional
+
+from exceptions.base import AppException
+from utils.deadline import run_stage
+from utils.logger import logger
+
+MPEG = "audio/mpeg"
+WAV = "audio/wav"
+OGG = "audio/ogg"
+WEBM = "audio/webm"
+
+
+def audio_mime_type(audio: bytes) -> str:
+    if audio[:4] == b"RIFF" and audio[8:12] == b"WAVE":
+        return WAV
+    if audio[:4] == b"OggS":
+        return OGG
+    if audio[:4] == b"\x1a\x45\xdf\xa3":
+        return WEBM
+    return MPEG
+
+
+def audio_extension(audio: bytes) -> str:
+    return {WAV: ".wav", OGG: ".ogg", WEBM: ".webm"}.get(audio_mime_type(audio), ".mp3")
+
+
+class AudioFormat:
+    """
+    One output encoding a client can ask for.
+
+    `upstream` is the ElevenLabs `output_format` to request; audio from any
+    other backend is transcoded with ffmpeg, as is upstream audio whose
+    container (`upstream_mime`) differs. Only `concatenable` formats can be
+    streamed segment by segment by appending clips.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        mime_type: str,
+        upstream: Optional[str],
+        encode_args: List[str],
+        concatenable: bool = False,
+        upstream_mime: Optional[str] = None,
+    ):
+        self.name = name
+        self.mime_type = mime_type
+        self.upstream = upstream
+        self.encode_args = encode_args
+        self.concatenable = concatenable
+        self.upstream_mime = upstream_mime or mime_type
+
+    @property
+    def native(self) -> bool:
+        """ElevenLabs can stream this format as is."""
+        return self.upstream is not None and self.upstream_mime == self.mime_type
+
+    def ffmpeg_args(self, source_mime: Optional[str]) -> List[str]:
+        # WebM from ElevenLabs' Ogg Opus is only a remux
+        if self.mime_type == WEBM and source_mime == OGG:
+            return ["-c:a", "copy", "-f", "webm"]
+        return self.encode_args
+
+
+AUDIO_FORMATS: Dict[str, AudioFormat] = {
+    "mp3": AudioFormat(
+        "mp3", MPEG, "mp3_44100_128",
+        ["-c:a", "libmp3lame", "-b:a", "128k", "-f", "mp3"],
+        concatenable=True,
+    ),
+    # Speech is intelligible at a fraction of the default bitrate
+    "mp3_low": AudioFormat(
+        "mp3_low", MPEG, "mp3_22050_32",
+        ["-ac", "1", "-ar", "22050", "-c:a", "libmp3lame", "-b:a", "32k", "-f", "mp3"],
+        concatenable=True,
+    ),
+    "opus": AudioFormat(
+        "opus", OGG, "opus_48000_32",
+        ["-ac", "1", "-c:a", "libopus", "-b:a", "32k", "-application", "voip", "-f", "ogg"],
+    ),
+    "webm": AudioFormat(
+        "webm", WEBM, "opus_48000_32",
+        ["-ac", "1", "-c:a", "libopus", "-b:a", "32k", "-application", "voip", "-f", "webm"],
+        upstream_mime=OGG,
+    ),
+}
+
+DEFAULT_FORMAT = AUDIO_FORMATS["mp3"]
+
+# Media types in Accept -> format; among equal q-values the more compact wins
+ACCEPT_TYPES = [
+    ("audio/ogg", "opus"),
+    ("audio/opus", "opus"),
+    ("audio/webm", "webm"),
+    ("audio/mpeg", "mp3"),
+    ("audio/mp3", "mp3"),
+]
+
+
+def negotiate_format(requested: Optional[str] = None, accept: Optional[str] = None) -> AudioFormat:
+    """
+    The output format for a TTS response: an explicit `audioFormat` wins,
+    then the best explicitly listed type in `Accept`. Wildcards get MP3,
+    which every browser plays.
+    """
+    if requested:
+        audio_format = AUDIO_FORMATS.get(requested.strip().lower())
+        if audio_format is None:
+            raise AppException(
+                f"Unsupported audio format '{requested}' (choose from {', '.join(AUDIO_FORMATS)})",
+                code="UNSUPPORTED_AUDIO_FORMAT",
+            )
+        return audio_format
+
+    if not accept:
+        return DEFAULT_FORMAT
+
+    weights = {}
+    for part in accept.split(","):
+        media_type, _, params = part.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[media_type.strip().lower()] = q
+
+    best, best_q = DEFAULT_FORMAT, 0.0
+    for media_type, name in ACCEPT_TYPES:
+        q = weights.get(media_type, 0.0)
+        if q > best_q:
+            best, best_q = AUDIO_FORMATS[name], q
+    return best
+
+
+# --------------------------------------------------
+# TRANSCODING (ffmpeg)
+# --------------------------------------------------
+FFMPEG = shutil.which("ffmpeg")
+FFMPEG_INPUT = [FFMPEG or "ffmpeg", "-hide_banner", "-loglevel", "error", "-i", "pipe:0", "-vn", "-map_metadata", "-1"]
+
+
+def can_transcode() -> bool:
+    return FFMPEG is not None
+
+
+async def transcode(audio: bytes, audio_format: AudioFormat) -> Optional[bytes]:
+    """Re-encode a whole clip; None if ffmpeg is missing or fails (callers keep the original)."""
+    if not can_transcode():
+        return None
+
+    proc = await asyncio.create_subprocess_exec(
+        *FFMPEG_INPUT, *audio_format.ffmpeg_args(audio_mime_type(audio)), "pipe:1",
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        out, err = await run_stage("tts", proc.communicate(audio))
+    finally:
+        if proc.returncode is None:
+            proc.kill()
+            # Reap it so timed-out runs don't pile up as zombies
+            await proc.wait()
+
+    if proc.returncode != 0 or not out:
+        logger.error(f"ffmpeg to {audio_format.name} failed ({proc.returncode}): {err[-200:]!r}")
+        return None
+    return out
+
+
+async def transcode_stream(chunks: AsyncIterator[bytes], audio_format: AudioFormat) -> AsyncIterator[bytes]:
+    """
+    Pipe a stream of (concatenated) clips through one ffmpeg process and
+    yield its output as it is encoded. Without ffmpeg the source passes
+    through unchanged.
+    """
+    if not can_transcode():
+        async for chunk in chunks:
+            yield chunk
+        return
+
+    proc = await asyncio.create_subprocess_exec(
+        *FFMPEG_INPUT, *audio_format.encode_args, "pipe:1",
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+
+    async def feed():
+        try:
+            async for chunk in chunks:
+                proc.stdin.write(chunk)
+                await proc.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            if not proc.stdin.is_closing():
+                proc.stdin.close()
+
+    feeder = asyncio.create_task(feed())
+    try:
+        while True:
+            data = await proc.stdout.read(16 * 1024)
+            if not data:
+                break
+            yield data
+        await feeder
+    finally:
+        feeder.cancel()
+        # Let the feeder unwind before closing the generator it iterates
+        await asyncio.gather(feeder, return_exceptions=True)
+        await chunks.aclose()
+        if proc.returncode is None:
+            proc.kill()
+        await proc.wait()
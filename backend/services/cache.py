@@ -0,0 +1,316 @@
+import os
+import time
+import pickle
+import sqlite3
+import asyncio
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from utils.logger import logger
+
+
+# --------------------------------------------------
+# BASE
+# --------------------------------------------------
+class CacheBackend(ABC):
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Any]:
+        pass
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        pass
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        pass
+
+
+# --------------------------------------------------
+# IN-PROCESS TIER
+# --------------------------------------------------
+class MemoryCache(CacheBackend):
+    """Bounded LRU with per-entry expiry. Local to one worker process."""
+
+    def __init__(self, max_entries: int = 1024, default_ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[Any]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+
+        value, expires_at = item
+        if expires_at is not None and expires_at < time.time():
+            del self._data[key]
+            return None
+
+        self._data.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = ttl if ttl is not None else self.default_ttl
+        self._data[key] = (value, time.time() + ttl if ttl else None)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    async def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
+
+# --------------------------------------------------
+# SHARED TIERS
+# --------------------------------------------------
+class DiskCache(CacheBackend):
+    """
+    SQLite-backed cache shared by every worker on the same machine (or
+    volume). WAL mode lets readers proceed while another process writes.
+
+    Expired rows are deleted by a sweep that runs from `set` at most every
+    `sweep_interval` seconds. The same sweep evicts this namespace's least
+    recently read rows beyond `max_rows` or `max_bytes` of values. Read
+    times are recorded at `ACCESS_GRANULARITY` so hits are not all writes.
+    """
+
+    ACCESS_GRANULARITY = 60
+
+    def __init__(
+        self,
+        path: str,
+        namespace: str,
+        default_ttl: Optional[float] = None,
+        max_rows: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        sweep_interval: float = 300,
+    ):
+        self.path = path
+        self.namespace = namespace
+        self.default_ttl = default_ttl
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self._next_sweep = 0.0
+        self._local = threading.local()
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "ns TEXT, key TEXT, value BLOB, expires_at REAL, accessed_at REAL DEFAULT 0, "
+            "PRIMARY KEY (ns, key))"
+        )
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(cache)")}
+        if "accessed_at" not in columns:
+            try:
+                conn.execute("ALTER TABLE cache ADD COLUMN accessed_at REAL DEFAULT 0")
+            except sqlite3.OperationalError:
+                pass  # another worker added it first
+        conn.execute("CREATE INDEX IF NOT EXISTS cache_expiry ON cache (expires_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS cache_lru ON cache (ns, accessed_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _get(self, key: str) -> Optional[Any]:
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT value, expires_at, accessed_at FROM cache WHERE ns = ? AND key = ?",
+            (self.namespace, key),
+        ).fetchone()
+        if row is None:
+            return None
+
+        value, expires_at, accessed_at = row
+        now = time.time()
+        if expires_at is not None and expires_at < now:
+            self._delete(key)
+            return None
+        if (accessed_at or 0) < now - self.ACCESS_GRANULARITY:
+            conn.execute(
+                "UPDATE cache SET accessed_at = ? WHERE ns = ? AND key = ?",
+                (now, self.namespace, key),
+            )
+        return pickle.loads(value)
+
+    def _set(self, key: str, value: Any, ttl: Optional[float]) -> None:
+        ttl = ttl if ttl is not None else self.default_ttl
+        now = time.time()
+        self._connect().execute(
+            "INSERT OR REPLACE INTO cache (ns, key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+            (self.namespace, key, pickle.dumps(value), now + ttl if ttl else None, now),
+        )
+        if now >= self._next_sweep:
+            self._next_sweep = now + self.sweep_interval
+            self.sweep(now)
+
+    def _delete(self, key: str) -> None:
+        self._connect().execute(
+            "DELETE FROM cache WHERE ns = ? AND key = ?",
+            (self.namespace, key),
+        )
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Delete expired rows, then evict beyond the size limits. Returns rows removed."""
+        conn = self._connect()
+        removed = conn.execute(
+            "DELETE FROM cache WHERE expires_at < ?",
+            (now or time.time(),),
+        ).rowcount
+
+        if self.max_rows is not None:
+            removed += conn.execute(
+                "DELETE FROM cache WHERE ns = ? AND key IN ("
+                "SELECT key FROM cache WHERE ns = ? ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.namespace, self.namespace, self.max_rows),
+            ).rowcount
+        if self.max_bytes is not None:
+            removed += conn.execute(
+                "DELETE FROM cache WHERE ns = ? AND key IN ("
+                "SELECT key FROM (SELECT key, SUM(length(value)) OVER (ORDER BY accessed_at DESC, key) AS total "
+                "FROM cache WHERE ns = ?) WHERE total > ?)",
+                (self.namespace, self.namespace, self.max_bytes),
+            ).rowcount
+
+        if removed:
+            logger.info(f"Disk cache '{self.namespace}' swept {removed} rows")
+        return removed
+
+    async def get(self, key: str) -> Optional[Any]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        await asyncio.to_thread(self._set, key, value, ttl)
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self._delete, key)
+
+
+class RedisCache(CacheBackend):
+    """Redis (or any Redis-compatible store) shared across replicas."""
+
+    def __init__(self, url: str, namespace: str, default_ttl: Optional[float] = None):
+        import redis.asyncio as redis
+
+        self.client = redis.from_url(url)
+        self.namespace = namespace
+        self.default_ttl = default_ttl
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    async def get(self, key: str) -> Optional[Any]:
+        value = await self.client.get(self._key(key))
+        return pickle.loads(value) if value is not None else None
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = ttl if ttl is not None else self.default_ttl
+        # Milliseconds: int(ttl) seconds would turn a sub-second TTL into ex=0, which Redis rejects
+        await self.client.set(self._key(key), pickle.dumps(value), px=max(1, int(ttl * 1000)) if ttl else None)
+
+    async def delete(self, key: str) -> None:
+        await self.client.delete(self._key(key))
+
+
+# --------------------------------------------------
+# TIERED
+# --------------------------------------------------
+class TieredCache(CacheBackend):
+    """
+    In-process LRU in front of a shared store. Local entries live at most
+    `local_ttl` seconds so workers pick up values refreshed elsewhere.
+    A failing shared tier degrades to local-only instead of failing requests.
+    """
+
+    def __init__(self, local: MemoryCache, shared: CacheBackend, local_ttl: float = 60):
+        self.local = local
+        self.shared = shared
+        self.local_ttl = local_ttl
+
+    def _local_ttl(self, ttl: Optional[float]) -> float:
+        return min(ttl, self.local_ttl) if ttl else self.local_ttl
+
+    async def get(self, key: str) -> Optional[Any]:
+        value = await self.local.get(key)
+        if value is not None:
+            return value
+
+        try:
+            value = await self.shared.get(key)
+        except Exception as e:
+            logger.error(f"Shared cache read failed: {e}")
+            return None
+
+        if value is not None:
+            await self.local.set(key, value, ttl=self.local_ttl)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        await self.local.set(key, value, ttl=self._local_ttl(ttl))
+        try:
+            await self.shared.set(key, value, ttl=ttl)
+        except Exception as e:
+            logger.error(f"Shared cache write failed: {e}")
+
+    async def delete(self, key: str) -> None:
+        await self.local.delete(key)
+        try:
+            await self.shared.delete(key)
+        except Exception as e:
+            logger.error(f"Shared cache delete failed: {e}")
+
+
+# --------------------------------------------------
+# FACTORY
+# --------------------------------------------------
+_caches: Dict[str, CacheBackend] = {}
+
+
+def get_cache(namespace: str, max_entries: int = 1024, ttl: Optional[float] = None) -> CacheBackend:
+    """
+    Return the cache for `namespace`, built once per process.
+
+    CACHE_BACKEND selects the shared tier:
+      memory (default) - per-process only
+      disk             - SQLite file at CACHE_DIR, shared by local workers;
+                         CACHE_DISK_MAX_ROWS / CACHE_DISK_MAX_BYTES bound each namespace
+      redis            - REDIS_URL, shared across machines
+    """
+    if namespace in _caches:
+        return _caches[namespace]
+
+    backend = os.getenv("CACHE_BACKEND", "memory").lower()
+    local = MemoryCache(max_entries=max_entries, default_ttl=ttl)
+
+    if backend == "disk":
+        cache_dir = os.getenv("CACHE_DIR", "cache")
+        shared = DiskCache(
+            os.path.join(cache_dir, "shared_cache.sqlite3"),
+            namespace,
+            default_ttl=ttl,
+            max_rows=int(os.getenv("CACHE_DISK_MAX_ROWS", "10000")),
+            max_bytes=int(os.getenv("CACHE_DISK_MAX_BYTES", str(256 * 1024 * 1024))),
+            sweep_interval=float(os.getenv("CACHE_DISK_SWEEP_INTERVAL", "300")),
+        )
+        cache = TieredCache(local, shared, local_ttl=float(os.getenv("CACHE_LOCAL_TTL", "60")))
+    elif backend == "redis":
+        shared = RedisCache(os.getenv("REDIS_URL", "redis://localhost:6379/0"), namespace, default_ttl=ttl)
+        cache = TieredCache(local, shared, local_ttl=float(os.getenv("CACHE_LOCAL_TTL", "60")))
+    else:
+        cache = local
+
+    logger.info(f"Cache '{namespace}' using {backend} backend")
+    _caches[namespace] = cache
+    return cache
@@ -0,0 +1,120 @@
+import os
+import re
+import uuid
+from collections import deque
+from typing import Optional, Tuple
+
+from services.cache import get_cache
+from utils.logger import logger
+
+# Rough English average; good enough to keep prompt size bounded
+CHARS_PER_TOKEN = 4
+
+SESSION_ID_RE = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _first_sentence(text: str, limit: int) -> str:
+    sentence = re.split(r"(?<=[.!?])\s", text.strip(), maxsplit=1)[0]
+    return sentence[:limit]
+
+
+class ConversationSession:
+    """
+    Bounded state for one conversation.
+
+    Recent turns live in a ring buffer; once they exceed the token budget
+    (or the ring is full) the oldest turns are folded into a rolling
+    extractive summary, itself capped, so the prompt never grows.
+    """
+
+    def __init__(self, max_turns: int, turn_token_budget: int, summary_token_budget: int, max_turn_chars: int):
+        self.turns: deque = deque()
+        self.summary: deque = deque()
+        self.max_turns = max_turns
+        self.turn_token_budget = turn_token_budget
+        self.summary_token_budget = summary_token_budget
+        self.max_turn_chars = max_turn_chars
+
+    def add_turn(self, user_text: str, assistant_text: str):
+        self.turns.append((user_text[:self.max_turn_chars], assistant_text[:self.max_turn_chars]))
+        self._compact()
+
+    def render(self) -> str:
+        parts = []
+        if self.summary:
+            parts.append("Earlier in this conversation: " + " ".join(self.summary))
+        for user_text, assistant_text in self.turns:
+            parts.append(f"User: {user_text}\nAssistant: {assistant_text}")
+        return "\n".join(parts)
+
+    def _turn_tokens(self) -> int:
+        return sum(estimate_tokens(u) + estimate_tokens(a) for u, a in self.turns)
+
+    def _compact(self):
+        while self.turns and (len(self.turns) > self.max_turns or self._turn_tokens() > self.turn_token_budget):
+            user_text, assistant_text = self.turns.popleft()
+            self.summary.append(
+                f"User asked \"{_first_sentence(user_text, 120)}\"; "
+                f"you said \"{_first_sentence(assistant_text, 160)}\"."
+            )
+
+        while self.summary and sum(estimate_tokens(s) for s in self.summary) > self.summary_token_budget:
+            self.summary.popleft()
+
+
+class ConversationStore:
+    """
+    Session-scoped conversation state in the shared cache, so any worker
+    can continue a session. The cache's LRU bound caps sessions per process
+    and the TTL expires idle ones.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 1000,
+        session_ttl: float = 1800,
+        max_turns: int = 6,
+        turn_token_budget: int = 600,
+        summary_token_budget: int = 200,
+        max_turn_chars: int = 1000,
+    ):
+        self.cache = get_cache("conversations", max_entries=max_sessions, ttl=session_ttl)
+        self.session_ttl = session_ttl
+        self.session_kwargs = {
+            "max_turns": max_turns,
+            "turn_token_budget": turn_token_budget,
+            "summary_token_budget": summary_token_budget,
+            "max_turn_chars": max_turn_chars,
+        }
+
+    async def load(self, session_id: Optional[str]) -> Tuple[str, ConversationSession]:
+        if not session_id or not SESSION_ID_RE.match(session_id):
+            session_id = uuid.uuid4().hex
+
+        session = await self.cache.get(session_id)
+        if session is None:
+            session = ConversationSession(**self.session_kwargs)
+        return session_id, session
+
+    async def save(self, session_id: str, session: ConversationSession):
+        await self.cache.set(session_id, session, ttl=self.session_ttl)
+        logger.info(f"Session {session_id[:8]} | turns={len(session.turns)} summary={len(session.summary)}")
+
+
+_store: Optional[ConversationStore] = None
+
+
+def get_conversation_store() -> ConversationStore:
+    global _store
+    if _store is None:
+        _store = ConversationStore(
+            max_sessions=int(os.getenv("CONVERSATION_MAX_SESSIONS", "1000")),
+            session_ttl=float(os.getenv("CONVERSATION_TTL", "1800")),
+            max_turns=int(os.getenv("CONVERSATION_MAX_TURNS", "6")),
+            turn_token_budget=int(os.getenv("CONVERSATION_TOKEN_BUDGET", "600")),
+        )
+    return _store
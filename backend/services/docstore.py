@@ -0,0 +1,113 @@
+import os
+import json
+import mmap
+import struct
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from utils.logger import logger
+
+MAGIC = b"VADOCS01"
+# magic, record count, offset and length of the id table
+HEADER = struct.Struct("<8sQQQ")
+OFFSET = struct.Struct("<Q")
+
+
+def write_docstore(path: str, docs: Iterable[Tuple[str, str, dict]]) -> int:
+    """
+    Write (id, text, metadata) chunks as an immutable docstore file.
+
+    Layout: header, one offset per record (plus an end offset), the
+    records as UTF-8 JSON, then the id table. The file is written next to
+    `path` and renamed into place, so readers never see a partial store.
+    Returns the number of records.
+    """
+    ids: List[str] = []
+    records: List[bytes] = []
+    for doc_id, text, metadata in docs:
+        ids.append(doc_id)
+        records.append(json.dumps({"text": text, "metadata": metadata or {}}, ensure_ascii=False).encode())
+
+    offsets, position = [], 0
+    for record in records:
+        offsets.append(position)
+        position += len(record)
+    offsets.append(position)
+
+    id_table = json.dumps(ids).encode()
+    records_start = HEADER.size + OFFSET.size * len(offsets)
+    ids_offset = records_start + position
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(records), ids_offset, len(id_table)))
+        for offset in offsets:
+            f.write(OFFSET.pack(offset))
+        for record in records:
+            f.write(record)
+        f.write(id_table)
+    os.replace(tmp_path, path)
+    return len(records)
+
+
+class Docstore:
+    """
+    Read-only, memory-mapped chunk store: the vector index keeps only ids
+    and vectors, and context is assembled from here.
+
+    Only the id table is parsed up front; a record is decoded when it is
+    looked up, straight from the page cache.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.count, ids_offset, ids_length = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a docstore file")
+
+        self._records_start = HEADER.size + OFFSET.size * (self.count + 1)
+        self.ids: List[str] = json.loads(self._mm[ids_offset:ids_offset + ids_length])
+        self._ordinals: Dict[str, int] = {doc_id: i for i, doc_id in enumerate(self.ids)}
+
+    def __len__(self) -> int:
+        return self.count
+
+    def ordinal(self, doc_id: str) -> Optional[int]:
+        return self._ordinals.get(doc_id)
+
+    def get_by_ordinal(self, ordinal: int) -> dict:
+        position = HEADER.size + OFFSET.size * ordinal
+        start, end = struct.unpack_from("<QQ", self._mm, position)
+        record = json.loads(self._mm[self._records_start + start:self._records_start + end])
+        record["id"] = self.ids[ordinal]
+        return record
+
+    def get(self, doc_id: str) -> Optional[dict]:
+        ordinal = self._ordinals.get(doc_id)
+        return self.get_by_ordinal(ordinal) if ordinal is not None else None
+
+    def get_many(self, doc_ids: Iterable[str]) -> List[Optional[dict]]:
+        return [self.get(doc_id) for doc_id in doc_ids]
+
+    def close(self):
+        if not self._mm.closed:
+            self._mm.close()
+        self._file.close()
+
+
+def docstore_path() -> str:
+    return os.getenv("DOCSTORE_PATH", os.path.join("data", "docstore.bin"))
+
+
+def load_docstore(path: Optional[str] = None) -> Optional[Docstore]:
+    """The docstore written at ingestion, or None if there isn't one (texts are then read from the index)."""
+    path = path or docstore_path()
+    if not os.path.exists(path):
+        return None
+    docstore = Docstore(path)
+    logger.info(f"Docstore loaded: {len(docstore)} chunks from {path}")
+    return docstore
@@ -0,0 +1,199 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+from langchain_core.embeddings import Embeddings
+
+from utils.logger import logger
+
+# Gemini embeds queries and documents differently; batched queries must say which
+QUERY_TASK_TYPE = "RETRIEVAL_QUERY"
+DOCUMENT_TASK_TYPE = "RETRIEVAL_DOCUMENT"
+# batchEmbedContents accepts at most this many requests
+MAX_REST_BATCH = 100
+
+
+def normalize_query(text: str) -> str:
+    return " ".join(text.split()).casefold()
+
+
+class EmbeddingBatcher:
+    """
+    Coalesce embedding requests from many threads into one batched call.
+
+    The first request to arrive opens a window of `window` seconds; every
+    request made meanwhile joins it, and its caller then embeds the whole
+    batch in a single round trip. A full batch is sent at once. Requests
+    with the same key in the same window share one slot.
+    """
+
+    def __init__(self, embed_batch: Callable[[List[str]], List[List[float]]], window: float = 0.005, max_batch: int = 64):
+        self.embed_batch = embed_batch
+        self.window = window
+        self.max_batch = max_batch
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Tuple[str, Future]] = {}
+        self.batches = 0
+        self.texts = 0
+
+    def embed(self, key: str, text: str) -> List[float]:
+        with self._lock:
+            if key in self._pending:
+                future = self._pending[key][1]
+                leader = full = False
+            else:
+                future = Future()
+                self._pending[key] = (text, future)
+                leader = len(self._pending) == 1
+                full = len(self._pending) >= self.max_batch
+
+        if full:
+            self._flush()
+        elif leader:
+            time.sleep(self.window)
+            self._flush()
+        return future.result()
+
+    def _flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        if not batch:
+            return
+
+        texts = [text for text, _ in batch.values()]
+        futures = [future for _, future in batch.values()]
+        try:
+            vectors = self.embed_batch(texts)
+        except BaseException as e:
+            for future in futures:
+                future.set_exception(e)
+            return
+
+        with self._lock:
+            self.batches += 1
+            self.texts += len(texts)
+        if len(texts) > 1:
+            logger.debug(f"Embedded {len(texts)} queries in one call")
+        for future, vector in zip(futures, vectors):
+            future.set_result(vector)
+
+
+class GeminiRESTEmbeddings(Embeddings):
+    """
+    Gemini embeddings over the plain REST API, for GEMINI_API_ENDPOINT.
+
+    GoogleGenerativeAIEmbeddings ignores the `transport` option and always
+    opens a gRPC channel, which cannot reach an http:// endpoint override
+    (local fakes, proxies). Same model and task types, so vectors match.
+    """
+
+    def __init__(self, model: str, api_key: str, endpoint: str, timeout: float = 30.0):
+        self.model = model if model.startswith("models/") else f"models/{model}"
+        if "://" not in endpoint:
+            endpoint = f"https://{endpoint}"
+        self.url = f"{endpoint.rstrip('/')}/v1beta/{self.model}"
+        self.client = httpx.Client(timeout=timeout, headers={"x-goog-api-key": api_key or ""})
+
+    def _request(self, text: str, task_type: str) -> dict:
+        return {"model": self.model, "content": {"parts": [{"text": text}]}, "taskType": task_type}
+
+    def embed_query(self, text: str) -> List[float]:
+        res = self.client.post(f"{self.url}:embedContent", json=self._request(text, QUERY_TASK_TYPE))
+        res.raise_for_status()
+        return res.json()["embedding"]["values"]
+
+    def embed_documents(self, texts: List[str], task_type: Optional[str] = None) -> List[List[float]]:
+        vectors = []
+        for start in range(0, len(texts), MAX_REST_BATCH):
+            batch = texts[start:start + MAX_REST_BATCH]
+            res = self.client.post(f"{self.url}:batchEmbedContents", json={
+                "requests": [self._request(text, task_type or DOCUMENT_TASK_TYPE) for text in batch],
+            })
+            res.raise_for_status()
+            vectors.extend(item["values"] for item in res.json()["embeddings"])
+        return vectors
+
+
+def gemini_embeddings(model: str, api_key: str) -> Embeddings:
+    """LangChain's Gemini embeddings, or the REST client when GEMINI_API_ENDPOINT is set."""
+    endpoint = os.getenv("GEMINI_API_ENDPOINT")
+    if endpoint:
+        return GeminiRESTEmbeddings(model, api_key, endpoint)
+
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+    return GoogleGenerativeAIEmbeddings(model=model, google_api_key=api_key)
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Query embeddings through an LRU cache and an `EmbeddingBatcher`.
+
+    Queries are keyed by whitespace- and case-normalized text, so questions
+    that only differ in spacing or case reuse one vector (embedded from the
+    first spelling seen). Document embedding (ingestion) goes straight to
+    `base`.
+    """
+
+    def __init__(self, base: Embeddings, max_entries: int = 4096, window: float = 0.005, max_batch: int = 64):
+        self.base = base
+        self.max_entries = max_entries
+        self.batcher = EmbeddingBatcher(self.embed_queries, window=window, max_batch=max_batch)
+        self._cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed several queries in one call, bypassing the cache."""
+        if len(texts) == 1:
+            return [self.base.embed_query(texts[0])]
+        try:
+            return self.base.embed_documents(texts, task_type=QUERY_TASK_TYPE)
+        except TypeError:
+            # Embeddings without a task type: their queries and documents embed alike
+            return self.base.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        key = normalize_query(text)
+        with self._lock:
+            vector = self._cache.get(key)
+            if vector is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return list(vector)
+            self.misses += 1
+
+        vector = self.batcher.embed(key, text)
+
+        with self._lock:
+            self._cache[key] = vector
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return list(vector)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.base.embed_documents(texts)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._cache),
+                "hits": self.hits,
+                "misses": self.misses,
+                "batches": self.batcher.batches,
+                "embedded": self.batcher.texts,
+            }
+
+
+def cached_embeddings(base: Embeddings) -> CachedEmbeddings:
+    return CachedEmbeddings(
+        base,
+        max_entries=int(os.getenv("EMBED_CACHE_ENTRIES", "4096")),
+        window=float(os.getenv("EMBED_BATCH_WINDOW_MS", "5")) / 1000,
+        max_batch=int(os.getenv("EMBED_MAX_BATCH", "64")),
+    )
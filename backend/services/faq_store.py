@@ -0,0 +1,131 @@
+import os
+import json
+import shutil
+import hashlib
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from services.ann_index import IVFIndex, build_ivf_index
+from services.audio_formats import audio_extension
+from utils.logger import logger
+
+FORMAT_VERSION = 1
+
+
+def audio_key(text: str, voice_id: str, format_name: str) -> str:
+    return hashlib.sha256(f"{voice_id}:{format_name}:{text}".encode()).hexdigest()
+
+
+def write_faq_store(
+    path: str,
+    entries: List[dict],
+    vectors: np.ndarray,
+    model: str,
+    audio: Optional[Dict[str, bytes]] = None,
+) -> "FAQStore":
+    """
+    Write precomputed answers as an FAQ store directory.
+
+    `entries` are {"question", "answer", "sources"} dicts and row i of
+    `vectors` is the query embedding of entries[i]["question"]. `audio`
+    maps `audio_key(spoken text, voice, format)` to audio bytes. The
+    directory is built beside `path` and swapped in whole.
+    """
+    tmp_path = f"{path}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(os.path.join(tmp_path, "audio"))
+
+    # Float16 keeps match scores comparable with the threshold
+    build_ivf_index(vectors, os.path.join(tmp_path, "index"), quantization="float16")
+    with open(os.path.join(tmp_path, "entries.json"), "w") as f:
+        json.dump(entries, f, ensure_ascii=False)
+
+    audio_files = {}
+    for key, data in (audio or {}).items():
+        audio_files[key] = f"{key}{audio_extension(data)}"
+        with open(os.path.join(tmp_path, "audio", audio_files[key]), "wb") as f:
+            f.write(data)
+
+    with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+        json.dump({"version": FORMAT_VERSION, "count": len(entries), "model": model, "audio": audio_files}, f)
+
+    old_path = f"{path}.old"
+    if os.path.exists(path):
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+    logger.info(f"FAQ store written: {len(entries)} answers, {len(audio_files)} audio clips at {path}")
+    return FAQStore(path)
+
+
+class FAQStore:
+    """
+    Answers precomputed offline for likely DS Tutor questions.
+
+    A question is served from here when its embedding is within
+    `threshold` cosine similarity of a stored question, skipping
+    retrieval and the LLM. Audio, when precomputed, is looked up by the
+    exact spoken text, voice and format.
+    """
+
+    def __init__(self, path: str, threshold: float = 0.92, nprobe: int = 16):
+        self.path = path
+        self.threshold = threshold
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"{path}: unsupported FAQ store version {self.meta.get('version')}")
+
+        with open(os.path.join(path, "entries.json")) as f:
+            self.entries: List[dict] = json.load(f)
+        self.index = IVFIndex(os.path.join(path, "index"), nprobe=nprobe)
+        self.audio_files: Dict[str, str] = self.meta.get("audio", {})
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def match(self, vector: List[float]) -> Optional[dict]:
+        """Stored entry (plus its "score") for the nearest question above the threshold."""
+        ordinals, scores = self.index.search(np.asarray(vector, dtype=np.float32), k=1)
+        if len(ordinals) and scores[0] >= self.threshold:
+            self.hits += 1
+            return {**self.entries[int(ordinals[0])], "score": float(scores[0])}
+        self.misses += 1
+        return None
+
+    def audio(self, text: str, voice_id: str, format_name: str) -> Optional[bytes]:
+        filename = self.audio_files.get(audio_key(text, voice_id, format_name))
+        if filename is None:
+            return None
+        with open(os.path.join(self.path, "audio", filename), "rb") as f:
+            return f.read()
+
+    def stats(self) -> dict:
+        return {"entries": len(self), "audio": len(self.audio_files), "hits": self.hits, "misses": self.misses}
+
+
+def faq_store_path() -> str:
+    return os.getenv("FAQ_STORE_PATH", os.path.join("data", "faq"))
+
+
+def load_faq_store(model: str, path: Optional[str] = None) -> Optional[FAQStore]:
+    path = path or faq_store_path()
+    if not os.path.exists(os.path.join(path, "meta.json")):
+        return None
+
+    store = FAQStore(
+        path,
+        threshold=float(os.getenv("FAQ_MATCH_THRESHOLD", "0.92")),
+        nprobe=int(os.getenv("FAQ_NPROBE", "16")),
+    )
+    if store.meta.get("model") != model:
+        # Question vectors from another model are not comparable
+        logger.warning(f"FAQ store at {path} was embedded with {store.meta.get('model')}, not {model}; ignoring it")
+        return None
+
+    logger.info(f"FAQ store loaded: {len(store)} answers, {len(store.audio_files)} audio clips, threshold {store.threshold}")
+    return store
@@ -0,0 +1,334 @@
+import os
+import re
+import json
+import time
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+
+from utils.logger import logger
+
+# Bump when chunking changes so cached chunks are rebuilt
+CHUNKER_VERSION = 1
+PAGES_PER_TASK = 8
+
+BULLET = re.compile(r"^(?:(?:[•●▪◦‣∙·*\-–]|\(?\d{1,2}[.)]|\(?[a-z][.)])\s+|step\s*\d+\s*[:.)])", re.IGNORECASE)
+NUMBERING = re.compile(r"^(?:(?:chapter|section|part)\s+\d+|\d+(?:\.\d+)*\.?)\s+(?=[A-Za-z])", re.IGNORECASE)
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[A-Z(\"'])")
+MATH_CHARS = set("=∑∏∫√≈≠≤≥±×÷^∂∇∈∀∃→λμσθπαβγε")
+SMALL_WORDS = {"a", "an", "and", "as", "at", "by", "for", "in", "of", "on", "or", "the", "to", "vs", "with"}
+
+Chunk = Tuple[str, str, dict]
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def page_count(path: str) -> int:
+    from pypdf import PdfReader
+
+    return len(PdfReader(path).pages)
+
+
+def extract_pages(path: str, start: int, end: int) -> List[Tuple[int, str]]:
+    """Text of pages [start, end); runs in a worker process."""
+    from pypdf import PdfReader
+
+    reader = PdfReader(path)
+    return [(number, reader.pages[number].extract_text() or "") for number in range(start, end)]
+
+
+# --------------------------------------------------
+# STRUCTURE
+# --------------------------------------------------
+def is_heading(line: str) -> bool:
+    if len(line) > 80 or line[-1] in ".,;:!" or BULLET.match(line):
+        return False
+    numbering = NUMBERING.match(line)
+    title = line[numbering.end():] if numbering else line
+    # Figure labels ("NULL", "Insert 25", "NULL NULL") and code are short, numeric, repetitive or punctuated
+    words = re.findall(r"[A-Za-z][A-Za-z'-]+", title)
+    if not words or len(words) > 10 or len(set(words)) < len(words) or re.search(r"(?<![\w.])\d+\b|[;{}=<>]", title):
+        return False
+    if numbering:
+        return True
+    if line.isupper():
+        return len(line) >= 5
+    return len(words) >= 2 and words[0][0].isupper() and all(word[0].isupper() or word in SMALL_WORDS for word in words)
+
+
+def is_formula(line: str) -> bool:
+    if not any(c in MATH_CHARS for c in line):
+        return False
+    # Prose that mentions a symbol still has plenty of ordinary words
+    return len(re.findall(r"[A-Za-z]{4,}", line)) < 3
+
+
+def _running_key(line: str) -> str:
+    return re.sub(r"\d+", "#", line.casefold())
+
+
+def page_lines(text: str) -> List[str]:
+    lines = (" ".join(raw.split()) for raw in text.splitlines())
+    return [line for line in lines if line and not line.isdigit()]
+
+
+def page_blocks(lines: List[str]) -> Iterator[Tuple[str, str]]:
+    """
+    Split one page's lines into (kind, text) blocks: "heading", "item" (one
+    list item, wrapped lines rejoined), "formula" (one line, kept verbatim)
+    and "text" (a sentence).
+    """
+    prose = ""
+    item: Optional[str] = None
+
+    def flush_prose():
+        nonlocal prose
+        if prose:
+            for sentence in SENTENCE_END.split(prose):
+                yield "text", sentence
+            prose = ""
+
+    for line in lines:
+        if BULLET.match(line):
+            yield from flush_prose()
+            if item:
+                yield "item", item
+            item = line
+        elif is_formula(line):
+            yield from flush_prose()
+            if item:
+                yield "item", item
+                item = None
+            yield "formula", line
+        elif is_heading(line):
+            yield from flush_prose()
+            if item:
+                yield "item", item
+                item = None
+            yield "heading", line
+        elif item is not None and not (line[0].isupper() and item[-1] in ".!?"):
+            # Wrapped continuation of the current list item
+            item = f"{item} {line}"
+        else:
+            if item:
+                yield "item", item
+                item = None
+            # Rejoin words hyphenated across a line break
+            if prose.endswith("-") and line[0].islower():
+                prose = prose[:-1] + line
+            else:
+                prose = f"{prose} {line}" if prose else line
+
+    yield from flush_prose()
+    if item:
+        yield "item", item
+
+
+class StructureChunker:
+    """
+    Packs page blocks into chunks of about `chunk_size` characters without
+    cutting through the document's structure.
+
+    A heading always starts a new chunk and is repeated at the top of every
+    chunk in its section. Chunks break between sentences, list items and
+    formulas, never inside one; a formula stays with the sentence that
+    introduces it. Consecutive chunks in a section share up to `overlap`
+    characters of whole blocks. Each chunk records the page it starts on.
+    """
+
+    def __init__(self, source: str, chunk_size: int = 1000, overlap: int = 200):
+        self.source = source
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self.section = ""
+        self.blocks: List[Tuple[str, str, int]] = []
+        self.fresh = 0  # blocks not carried over from the previous chunk
+        self.running = set()
+
+    def add_page(self, number: int, text: str) -> Iterator[Tuple[str, dict]]:
+        lines = page_lines(text)
+        # Drop running headers/footers: edge lines that repeat the previous page's, page numbers aside
+        edges = {_running_key(line) for line in lines[:2] + lines[-2:]}
+        lines = [line for line in lines if _running_key(line) not in self.running or line not in lines[:2] + lines[-2:]]
+        self.running = edges
+
+        for kind, block in page_blocks(lines):
+            if kind == "heading":
+                yield from self._flush()
+                self.blocks = []
+                self.section = block
+                continue
+            if self.fresh and self._size() + len(block) > self.chunk_size:
+                # Keep a formula with the sentence that introduces it
+                keep = 1 if kind == "formula" and self.fresh > 1 and self.blocks[-1][0] == "text" else 0
+                held = self.blocks[-keep:] if keep else []
+                if keep:
+                    self.blocks = self.blocks[:-keep]
+                    self.fresh -= keep
+                yield from self._flush()
+                self.blocks = self._overlap_tail() + held
+                self.fresh = len(held)
+            self.blocks.append((kind, block, number))
+            self.fresh += 1
+
+    def finish(self) -> Iterator[Tuple[str, dict]]:
+        yield from self._flush()
+        self.blocks = []
+
+    def _size(self) -> int:
+        return len(self.section) + sum(len(block) + 1 for _, block, _ in self.blocks)
+
+    def _overlap_tail(self) -> List[Tuple[str, str, int]]:
+        tail, size = [], 0
+        for entry in reversed(self.blocks):
+            size += len(entry[1]) + 1
+            if size > self.overlap:
+                break
+            tail.insert(0, entry)
+        return tail
+
+    def _flush(self) -> Iterator[Tuple[str, dict]]:
+        if not self.fresh:
+            return
+        lines = [self.section] if self.section else []
+        previous = None
+        for kind, block, _ in self.blocks:
+            # Sentences run on as prose; headings, items and formulas keep their own line
+            if kind == "text" and previous == "text":
+                lines[-1] = f"{lines[-1]} {block}"
+            else:
+                lines.append(block)
+            previous = kind
+
+        pages = [number for _, _, number in self.blocks[len(self.blocks) - self.fresh:]]
+        metadata = {"page": pages[0], "source": self.source}
+        if pages[-1] != pages[0]:
+            metadata["page_end"] = pages[-1]
+        if self.section:
+            metadata["section"] = self.section
+        self.fresh = 0
+        yield "\n".join(lines), metadata
+
+
+# --------------------------------------------------
+# INGESTION
+# --------------------------------------------------
+class IngestResult:
+    def __init__(self):
+        self.chunks: List[Chunk] = []
+        self.files = 0
+        self.parsed_files = 0
+        self.pages = 0
+        self.parsed_pages = 0
+        self.seconds = 0.0
+
+    @property
+    def pages_per_second(self) -> float:
+        return self.parsed_pages / self.seconds if self.seconds else 0.0
+
+
+def ingest_cache_dir() -> str:
+    return os.getenv("INGEST_CACHE_DIR", os.path.join("data", "ingest_cache"))
+
+
+def _cache_file(cache_dir: str, digest: str, chunk_size: int, overlap: int) -> str:
+    return os.path.join(cache_dir, f"{digest}-v{CHUNKER_VERSION}-{chunk_size}-{overlap}.json")
+
+
+def _write_json(path: str, data) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def ingest_directory(
+    source: str,
+    chunk_size: int = 1000,
+    overlap: int = 200,
+    workers: Optional[int] = None,
+    cache_dir: Optional[str] = None,
+    force: bool = False,
+    prune: bool = True,
+) -> IngestResult:
+    """
+    Chunk every PDF under `source` into (id, text, metadata) records.
+
+    Pages are extracted in a process pool, `PAGES_PER_TASK` at a time, and
+    streamed in order through a `StructureChunker` per file. Chunks are
+    cached per file hash and chunker settings, so unchanged files are not
+    parsed again. Chunk ids are `<hash prefix>-<n>`: stable while a file
+    is unchanged, new when it changes. With `prune`, cache entries for
+    files that are gone or changed are deleted.
+    """
+    cache_dir = cache_dir or ingest_cache_dir()
+    os.makedirs(cache_dir, exist_ok=True)
+    result = IngestResult()
+    start = time.perf_counter()
+
+    paths = sorted(
+        os.path.join(root, name)
+        for root, _, names in os.walk(source)
+        for name in names
+        if name.lower().endswith(".pdf")
+    )
+    result.files = len(paths)
+
+    cached, pending, used = {}, [], set()
+    for path in paths:
+        digest = file_hash(path)
+        cache_path = _cache_file(cache_dir, digest, chunk_size, overlap)
+        used.add(os.path.basename(cache_path))
+        if not force and os.path.exists(cache_path):
+            with open(cache_path) as f:
+                cached[path] = json.load(f)
+        else:
+            pending.append((path, digest, cache_path, page_count(path)))
+
+    if pending:
+        tasks = [
+            (path, first, min(first + PAGES_PER_TASK, pages))
+            for path, _, _, pages in pending
+            for first in range(0, pages, PAGES_PER_TASK)
+        ]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # map yields in submission order, so each file's pages arrive in sequence
+            batches = pool.map(extract_pages, *zip(*tasks))
+            for path, digest, cache_path, pages in pending:
+                chunker = StructureChunker(os.path.relpath(path, source), chunk_size, overlap)
+                chunks = []
+                for _ in range(0, pages, PAGES_PER_TASK):
+                    for number, text in next(batches):
+                        chunks.extend(chunker.add_page(number, text))
+                chunks.extend(chunker.finish())
+
+                record = {"pages": pages, "chunks": [
+                    [f"{digest[:12]}-{i}", text, metadata] for i, (text, metadata) in enumerate(chunks)
+                ]}
+                _write_json(cache_path, record)
+                cached[path] = record
+                result.parsed_files += 1
+                result.parsed_pages += pages
+
+    for path in paths:
+        result.pages += cached[path]["pages"]
+        result.chunks.extend(tuple(chunk) for chunk in cached[path]["chunks"])
+
+    if prune:
+        for name in os.listdir(cache_dir):
+            if name.endswith(".json") and name not in used:
+                os.remove(os.path.join(cache_dir, name))
+
+    result.seconds = time.perf_counter() - start
+    logger.info(
+        f"Ingested {result.files} PDFs ({result.parsed_files} parsed, {result.files - result.parsed_files} unchanged): "
+        f"{result.pages} pages, {len(result.chunks)} chunks in {result.seconds:.2f}s"
+    )
+    return result
+
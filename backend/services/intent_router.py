@@ -0,0 +1,132 @@
+import os
+import re
+import json
+import math
+from collections import Counter
+from typing import Iterable, Optional, Tuple
+
+from utils.logger import logger
+
+DIRECT = "direct"
+AGENT = "agent"
+
+# Turns that need fresh information from the web
+REALTIME_PATTERN = re.compile(
+    r"\b(news|headlines?|weather|forecast|temperature|today|tonight|tomorrow|yesterday|"
+    r"right now|currently|current|latest|recent|this (week|month|year)|live|"
+    r"price|prices|stock|stocks|shares?|exchange rate|bitcoin|crypto|"
+    r"score|scores|who won|election|released?|launch(ed)?|update[sd]?|"
+    r"20[2-9]\d)\b",
+    re.IGNORECASE,
+)
+
+# Conversational turns that never need a tool
+SMALL_TALK_PATTERN = re.compile(
+    r"^\s*(hi|hii+|hello|hey|yo|good (morning|afternoon|evening|night)|thanks?|thank you|"
+    r"ok(ay)?|cool|great|nice|bye|goodbye|see you|how are you|who are you|what'?s your name)\b",
+    re.IGNORECASE,
+)
+
+TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+
+def tokenize(text: str):
+    return TOKEN_RE.findall(text.lower())
+
+
+class NaiveBayesIntentModel:
+    """
+    Tiny multinomial Naive Bayes over word unigrams, trained on labelled
+    turns. Small enough to load from JSON at startup and score in microseconds.
+    """
+
+    def __init__(self, priors: dict, word_counts: dict, totals: dict, vocab_size: int):
+        self.priors = priors
+        self.word_counts = word_counts
+        self.totals = totals
+        self.vocab_size = vocab_size
+
+    @classmethod
+    def train(cls, samples: Iterable[Tuple[str, str]]) -> "NaiveBayesIntentModel":
+        label_counts = Counter()
+        word_counts = {DIRECT: Counter(), AGENT: Counter()}
+        for text, label in samples:
+            label_counts[label] += 1
+            word_counts[label].update(tokenize(text))
+
+        total = sum(label_counts.values()) or 1
+        vocab = set(word_counts[DIRECT]) | set(word_counts[AGENT])
+        return cls(
+            priors={label: label_counts[label] / total for label in (DIRECT, AGENT)},
+            word_counts={label: dict(counts) for label, counts in word_counts.items()},
+            totals={label: sum(counts.values()) for label, counts in word_counts.items()},
+            vocab_size=len(vocab),
+        )
+
+    def agent_probability(self, text: str) -> float:
+        scores = {}
+        for label in (DIRECT, AGENT):
+            score = math.log(self.priors.get(label) or 1e-9)
+            denom = self.totals[label] + self.vocab_size + 1
+            for token in tokenize(text):
+                score += math.log((self.word_counts[label].get(token, 0) + 1) / denom)
+            scores[label] = score
+
+        top = max(scores.values())
+        exp = {label: math.exp(s - top) for label, s in scores.items()}
+        return exp[AGENT] / sum(exp.values())
+
+    def save(self, path: str):
+        with open(path, "w") as f:
+            json.dump({
+                "priors": self.priors,
+                "word_counts": self.word_counts,
+                "totals": self.totals,
+                "vocab_size": self.vocab_size,
+            }, f)
+
+    @classmethod
+    def load(cls, path: str) -> "NaiveBayesIntentModel":
+        with open(path) as f:
+            return cls(**json.load(f))
+
+
+class IntentRouter:
+    """
+    Decide whether a turn needs the tool-calling agent.
+
+    Rules catch the obvious cases; an optional local model scores the rest.
+    Without a model, turns with no real-time cue go straight to the LLM.
+    """
+
+    def __init__(self, model: Optional[NaiveBayesIntentModel] = None, threshold: float = 0.5):
+        self.model = model
+        self.threshold = threshold
+
+    def route(self, text: str) -> Tuple[str, str]:
+        if REALTIME_PATTERN.search(text):
+            return AGENT, "realtime_rule"
+        if SMALL_TALK_PATTERN.match(text) and len(text) < 60:
+            return DIRECT, "small_talk_rule"
+        if self.model is not None:
+            p_agent = self.model.agent_probability(text)
+            return (AGENT if p_agent >= self.threshold else DIRECT), f"model p_agent={p_agent:.2f}"
+        return DIRECT, "default"
+
+
+_router: Optional[IntentRouter] = None
+
+
+def get_intent_router() -> IntentRouter:
+    global _router
+    if _router is None:
+        model = None
+        model_path = os.getenv("INTENT_MODEL_PATH")
+        if model_path:
+            try:
+                model = NaiveBayesIntentModel.load(model_path)
+                logger.info(f"Loaded intent model from {model_path}")
+            except Exception as e:
+                logger.error(f"Intent model load failed, using rules only: {e}")
+        _router = IntentRouter(model, threshold=float(os.getenv("INTENT_AGENT_THRESHOLD", "0.5")))
+    return _router
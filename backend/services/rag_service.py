@@ -1,34 +1,44 @@
 import os
-import base64
-import time
+import hashlib
 import httpx
 from typing import List, Optional, Tuple
 
-from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
-from langchain_pinecone import PineconeVectorStore
-from langchain.chains import RetrievalQA
-from langchain.prompts import PromptTemplate
-from langchain_core.prompts import PromptTemplate
-from pinecone import Pinecone
 
+from exceptions.base import DeadlineExceeded
+from services.cache import get_cache
+from services.tts_service import synthesize, to_data_uri
+from utils.deadline import run_stage
 from utils.logger import logger
+from utils.tracing import tracer
+from utils.upstreams import gemini_client_kwargs, pinecone_index
+
+# Answers only change when the index is rebuilt
+ANSWER_CACHE_TTL = 24 * 3600
+EMBEDDING_MODEL = "models/gemini-embedding-001"
 
 
 class RAGService:
     """
     LangChain-powered RAG service using Pinecone + Gemini.
+
+    LangChain and Pinecone are imported inside `startup` so that importing
+    this module (and the routers that depend on it) stays cheap.
     """
 
     def __init__(self):
         self.http_client: Optional[httpx.AsyncClient] = None
         self.qa_chain = None
         self.vectorstore = None
-        self.cache = {}
+        self.embeddings = None
+        self.docstore = None
+        self.faq = None
+        self.cache = get_cache("rag_answers", max_entries=512, ttl=ANSWER_CACHE_TTL)
 
     # --------------------------------------------------
     # LIFECYCLE
     # --------------------------------------------------
-    async def startup(self):
+    async def startup(self) -> bool:
+        """Build the QA chain. Returns False when RAG is disabled by config."""
         logger.info("Initializing LangChain RAG service")
 
         self.http_client = httpx.AsyncClient(timeout=30.0)
@@ -36,29 +46,69 @@ class RAGService:
         api_key = os.getenv("RAG_GEMINI_API_KEY") or os.getenv("GEMINI_API_KEY")
         pc_api_key = os.getenv("PINECONE_API_KEY")
 
-        if not pc_api_key:
+        # VECTOR_INDEX=local searches an in-process ANN index instead of Pinecone
+        local_index = os.getenv("VECTOR_INDEX", "pinecone") == "local"
+
+        if not pc_api_key and not local_index:
             logger.warning("PINECONE_API_KEY not set. RAG disabled.")
-            return
+            return False
 
-        try:
-            # LangChain Embeddings
-            embeddings = GoogleGenerativeAIEmbeddings(
-                model="models/gemini-embedding-001",
-                google_api_key=api_key
-            )
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        from langchain.chains import RetrievalQA
+        from langchain_core.prompts import PromptTemplate
+        from services.docstore import load_docstore
+        from services.embeddings import cached_embeddings, gemini_embeddings
+        from services.faq_store import load_faq_store
 
-            # LangChain Pinecone VectorStore
-            self.vectorstore = PineconeVectorStore(
-                index_name="ds-tutor",
-                embedding=embeddings,
-                pinecone_api_key=pc_api_key
-            )
+        try:
+            # LangChain Embeddings; question embeddings are cached and batched across requests
+            self.embeddings = embeddings = cached_embeddings(gemini_embeddings(EMBEDDING_MODEL, api_key))
+
+            # Offline-precomputed answers for the most likely questions (build_faq_store.py)
+            self.faq = load_faq_store(EMBEDDING_MODEL)
+
+            # With a local docstore the index returns only ids; chunk text is read from disk
+            self.docstore = load_docstore()
+
+            if local_index:
+                from services.ann_index import load_ann_index
+
+                if self.docstore is None:
+                    logger.warning("VECTOR_INDEX=local needs a docstore. RAG disabled.")
+                    return False
+                index = load_ann_index(ids=self.docstore.ids)
+                if index is None:
+                    logger.warning("VECTOR_INDEX=local but no ANN index was found. RAG disabled.")
+                    return False
+                if len(index) != len(self.docstore):
+                    logger.warning(f"ANN index has {len(index)} vectors but the docstore {len(self.docstore)} chunks; rebuild it")
+            else:
+                from langchain_pinecone import PineconeVectorStore
+
+                # LangChain Pinecone VectorStore (pinned to PINECONE_INDEX_HOST when set)
+                index = pinecone_index(pc_api_key)
+                if index is not None:
+                    self.vectorstore = PineconeVectorStore(index=index, embedding=embeddings)
+                else:
+                    self.vectorstore = PineconeVectorStore(
+                        index_name="ds-tutor",
+                        embedding=embeddings,
+                        pinecone_api_key=pc_api_key
+                    )
+                index = self.vectorstore._index
+
+            if self.docstore is not None:
+                from services.retrievers import DocstoreRetriever
+                retriever = DocstoreRetriever(index=index, embeddings=embeddings, docstore=self.docstore, k=3)
+            else:
+                retriever = self.vectorstore.as_retriever(search_kwargs={"k": 3})
 
             # LangChain LLM
             llm = ChatGoogleGenerativeAI(
                 model="gemini-2.5-flash-lite",
                 google_api_key=api_key,
-                temperature=0.3
+                temperature=0.3,
+                **gemini_client_kwargs(),
             )
 
             # LangChain Prompt Template
@@ -83,20 +133,24 @@ Answer:"""
             self.qa_chain = RetrievalQA.from_chain_type(
                 llm=llm,
                 chain_type="stuff",
-                retriever=self.vectorstore.as_retriever(search_kwargs={"k": 3}),
+                retriever=retriever,
                 chain_type_kwargs={"prompt": prompt_template},
                 return_source_documents=True
             )
 
             logger.info("LangChain RAG service initialized successfully")
+            return True
 
         except Exception as e:
             logger.error(f"RAG init failed: {e}")
+            raise
 
     async def shutdown(self):
         if self.http_client:
             await self.http_client.aclose()
             logger.info("RAG HTTP client closed")
+        if self.docstore:
+            self.docstore.close()
 
     # --------------------------------------------------
     # HEALTH CHECK
@@ -104,26 +158,60 @@ Answer:"""
     def health_check(self) -> bool:
         return self.qa_chain is not None
 
+    async def probe(self):
+        """Cheap round trip to Pinecone and the embedding model (warmup and keep-warm)."""
+        import asyncio
+
+        index = getattr(self.vectorstore, "_index", None)
+        if index is not None:
+            await asyncio.to_thread(index.describe_index_stats)
+        # Past the query cache, or keep-warm would never leave the process
+        await asyncio.to_thread(self.embeddings.base.embed_query, "warmup")
+
     # --------------------------------------------------
     # MAIN RAG PIPELINE
     # --------------------------------------------------
+    @staticmethod
+    def _cache_key(question: str) -> str:
+        return hashlib.sha256(question.encode()).hexdigest()
+
     async def process_question(self, question: str) -> Tuple[str, List[str], str]:
-        if question in self.cache:
+        cache_key = self._cache_key(question)
+        cached = await self.cache.get(cache_key)
+        if cached is not None:
             logger.info("RAG cache hit")
-            return self.cache[question]
+            return tuple(cached)
 
         if not self.qa_chain:
             return "RAG service is not available.", [], "none"
 
         try:
             import asyncio
-            result = await asyncio.to_thread(self.qa_chain.invoke, {"query": question})
 
-            answer = result.get("result", "Unable to generate response.")
+            if self.faq is not None:
+                # The question embedding is cached, so a miss does not embed it twice
+                with tracer.span("faq"):
+                    vector = await run_stage("retrieve", asyncio.to_thread(self.embeddings.embed_query, question))
+                    match = self.faq.match(vector)
+                if match is not None:
+                    logger.info(f"FAQ hit ({match['score']:.3f}): {match['question']!r}")
+                    return match["answer"], match["sources"], "faq"
+
+            # Run the RetrievalQA steps separately so each stage gets its own span
+            with tracer.span("retrieve"):
+                docs = await run_stage("retrieve", asyncio.to_thread(self.qa_chain.retriever.invoke, question))
+
+            with tracer.span("llm"):
+                result = await run_stage("llm", asyncio.to_thread(
+                    self.qa_chain.combine_documents_chain.invoke,
+                    {"input_documents": docs, "question": question},
+                ))
+
+            answer = result.get("output_text", "Unable to generate response.")
 
             # Extract source pages from documents
             sources = []
-            for doc in result.get("source_documents", []):
+            for doc in docs:
                 page = doc.metadata.get("page")
                 if isinstance(page, int):
                     sources.append(f"Page {page + 1}")
@@ -131,32 +219,23 @@ Answer:"""
 
             logger.info(f"RAG answer generated | sources: {sources}")
 
-            self.cache[question] = (answer, sources, "gemini")
+            await self.cache.set(cache_key, (answer, sources, "gemini"))
             return answer, sources, "gemini"
 
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.error(f"RAG pipeline error: {e}")
             return "Unable to generate response.", [], "none"
 
+    def faq_audio(self, text: str, voice_id: str, format_name: str) -> Optional[bytes]:
+        """Audio precomputed with an FAQ answer, if this exact text, voice and format was."""
+        return self.faq.audio(text, voice_id, format_name) if self.faq is not None else None
+
     # --------------------------------------------------
     # TTS
     # --------------------------------------------------
     async def synthesize_speech(self, text: str, voice_id: str = None) -> Optional[str]:
-        try:
-            from gtts import gTTS
-            import io
-
-            if not text:
-                return None
-
-            tts = gTTS(text=text[:5000], lang='en', slow=False)
-            audio_buffer = io.BytesIO()
-            tts.write_to_fp(audio_buffer)
-            audio_buffer.seek(0)
-
-            audio_data = audio_buffer.read()
-            return f"data:audio/mpeg;base64,{base64.b64encode(audio_data).decode()}"
-
-        except Exception as e:
-            logger.error(f"TTS error: {e}")
-            return None
+        # No ElevenLabs key: local engine, then gTTS, through the shared audio cache
+        audio = await synthesize(text, voice_id or "", context="RAG")
+        return to_data_uri(audio)
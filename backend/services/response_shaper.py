@@ -0,0 +1,88 @@
+import os
+import re
+from typing import Optional
+
+MARKDOWN_PATTERNS = [
+    (re.compile(r"```.*?```", re.DOTALL), " "),          # code blocks are unreadable aloud
+    (re.compile(r"`([^`]*)`"), r"\1"),
+    (re.compile(r"!\[[^\]]*\]\([^)]*\)"), " "),
+    (re.compile(r"\[([^\]]+)\]\([^)]*\)"), r"\1"),
+    (re.compile(r"^\s{0,3}#{1,6}\s*(.+?)[.:]?\s*$", re.MULTILINE), r"\1."),
+    (re.compile(r"^\s*([-*+]|\d+[.)])\s+", re.MULTILINE), ""),
+    (re.compile(r"[*_~]{1,3}"), ""),
+    (re.compile(r"https?://\S+"), " "),
+]
+
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+class ShapedResponse:
+    def __init__(self, full_text: str, spoken_text: str, truncated: bool):
+        self.full_text = full_text
+        self.spoken_text = spoken_text
+        self.truncated = truncated
+
+
+class ResponseShaper:
+    """
+    Turn an LLM answer into a spoken version that fits an audio budget.
+
+    Whole sentences are kept until the word budget (seconds x speaking
+    rate) is reached; the full answer is still returned as text.
+    """
+
+    def __init__(self, max_spoken_seconds: float = 20.0, words_per_second: float = 2.6):
+        self.max_spoken_seconds = max_spoken_seconds
+        self.words_per_second = words_per_second
+
+    @property
+    def word_budget(self) -> int:
+        return max(1, int(self.max_spoken_seconds * self.words_per_second))
+
+    def prompt_hint(self) -> str:
+        return f"Keep answers under about {self.word_budget} words unless the user asks for detail."
+
+    @staticmethod
+    def to_plain_speech(text: str) -> str:
+        for pattern, replacement in MARKDOWN_PATTERNS:
+            text = pattern.sub(replacement, text)
+        return re.sub(r"[ \t]+", " ", text).strip()
+
+    def shape(self, text: str) -> ShapedResponse:
+        budget = self.word_budget
+        plain = self.to_plain_speech(text or "")
+        sentences = [s.strip() for s in SENTENCE_SPLIT.split(plain) if s.strip()]
+
+        spoken, words = [], 0
+        for sentence in sentences:
+            count = len(sentence.split())
+            if words + count > budget:
+                break
+            spoken.append(sentence)
+            words += count
+
+        cut = False
+        if not spoken and sentences:
+            # One very long first sentence: cut at a word boundary
+            spoken = [" ".join(sentences[0].split()[:budget]) + "…"]
+            cut = True
+
+        truncated = cut or len(spoken) < len(sentences)
+        spoken_text = " ".join(spoken)
+        if truncated:
+            spoken_text += " The full answer is on your screen."
+
+        return ShapedResponse(full_text=text, spoken_text=spoken_text, truncated=truncated)
+
+
+_shaper: Optional[ResponseShaper] = None
+
+
+def get_response_shaper() -> ResponseShaper:
+    global _shaper
+    if _shaper is None:
+        _shaper = ResponseShaper(
+            max_spoken_seconds=float(os.getenv("SPOKEN_MAX_SECONDS", "20")),
+            words_per_second=float(os.getenv("SPEECH_WORDS_PER_SECOND", "2.6")),
+        )
+    return _shaper
@@ -0,0 +1,37 @@
+from typing import Any, List
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from utils.logger import logger
+
+
+class DocstoreRetriever(BaseRetriever):
+    """
+    Ask the vector index for ids and scores only, then assemble the chunks
+    from the local docstore, so query responses stay a few hundred bytes
+    however long the chunks are.
+    """
+
+    index: Any
+    embeddings: Any
+    docstore: Any
+    k: int = 3
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        vector = self.embeddings.embed_query(query)
+        res = self.index.query(vector=vector, top_k=self.k, include_metadata=False, include_values=False)
+
+        docs, missing = [], 0
+        for match in res["matches"]:
+            record = self.docstore.get(match["id"])
+            if record is None:
+                missing += 1
+                continue
+            metadata = {**record["metadata"], "id": match["id"], "score": match["score"]}
+            docs.append(Document(page_content=record["text"], metadata=metadata))
+
+        if missing:
+            logger.warning(f"{missing} retrieved ids are not in the docstore; rebuild it together with the index")
+        return docs
@@ -0,0 +1,125 @@
+import time
+import asyncio
+import importlib
+import threading
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from utils.logger import logger
+
+COLD = "cold"
+WARMING = "warming"
+READY = "ready"
+FAILED = "failed"
+DISABLED = "disabled"
+
+# Subsystems share packages (google.generativeai, langchain); importing them
+# from several threads at once can hand one thread a partially initialized module
+_import_lock = threading.Lock()
+
+
+class Subsystem:
+    def __init__(self, name: str, modules: List[str], required: bool = True):
+        self.name = name
+        self.modules = modules
+        self.required = required
+        self.status = COLD
+        self.import_seconds: Optional[float] = None
+        self.warm_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+        self.details: Dict[str, dict] = {}
+
+    def to_dict(self) -> dict:
+        return {
+            "status": self.status,
+            "required": self.required,
+            "import_seconds": self.import_seconds,
+            "warm_seconds": self.warm_seconds,
+            "error": self.error,
+            "details": self.details or None,
+        }
+
+
+class StartupRegistry:
+    """
+    Tracks warmup of each backend subsystem.
+
+    Heavy modules are imported in a worker thread so the event loop keeps
+    answering liveness probes; readiness flips only once every required
+    subsystem is ready (or explicitly disabled by configuration).
+    """
+
+    def __init__(self):
+        self.subsystems: Dict[str, Subsystem] = {}
+        self.started_at = time.monotonic()
+
+    def register(self, name: str, modules: List[str], required: bool = True) -> Subsystem:
+        self.subsystems[name] = Subsystem(name, modules, required)
+        return self.subsystems[name]
+
+    def status(self, name: str) -> str:
+        subsystem = self.subsystems.get(name)
+        return subsystem.status if subsystem else COLD
+
+    def is_ready(self, name: Optional[str] = None) -> bool:
+        if name is not None:
+            return self.status(name) in (READY, DISABLED)
+        return all(
+            s.status in (READY, DISABLED)
+            for s in self.subsystems.values()
+            if s.required
+        )
+
+    def record(self, name: str, details: Dict[str, dict]):
+        """Attach per-component timings (e.g. one entry per upstream) to a subsystem."""
+        self.subsystems[name].details = details
+
+    def snapshot(self) -> dict:
+        return {name: s.to_dict() for name, s in self.subsystems.items()}
+
+    # --------------------------------------------------
+    # WARMUP
+    # --------------------------------------------------
+    async def warm(self, name: str, init: Optional[Callable[[], Awaitable[Optional[str]]]] = None):
+        """
+        Import the subsystem's modules, then run its optional async init.
+
+        `init` may return DISABLED to mark the subsystem as intentionally off.
+        """
+        subsystem = self.subsystems[name]
+        subsystem.status = WARMING
+        start = time.perf_counter()
+
+        try:
+            await asyncio.to_thread(self._import_modules, subsystem.modules)
+            subsystem.import_seconds = round(time.perf_counter() - start, 3)
+
+            result = await init() if init else None
+
+            subsystem.warm_seconds = round(time.perf_counter() - start, 3)
+            subsystem.status = DISABLED if result == DISABLED else READY
+            logger.info(
+                f"Subsystem '{name}' {subsystem.status} "
+                f"(import={subsystem.import_seconds}s, total={subsystem.warm_seconds}s)"
+            )
+
+        except Exception as e:
+            subsystem.status = FAILED
+            subsystem.error = str(e)
+            logger.error(f"Subsystem '{name}' failed to warm: {e}")
+
+    async def warm_all(self, inits: Dict[str, Callable[[], Awaitable[Optional[str]]]]):
+        await asyncio.gather(*(
+            self.warm(name, inits.get(name))
+            for name in self.subsystems
+        ))
+        elapsed = round(time.monotonic() - self.started_at, 3)
+        logger.info(f"Warmup finished in {elapsed}s | ready={self.is_ready()}")
+
+    @staticmethod
+    def _import_modules(modules: List[str]):
+        with _import_lock:
+            for module in modules:
+                importlib.import_module(module)
+
+
+startup_registry = StartupRegistry()
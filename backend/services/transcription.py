@@ -0,0 +1,100 @@
+import os
+import asyncio
+import hashlib
+from typing import Awaitable, Callable, Dict, Optional
+
+from services.cache import get_cache
+from utils.logger import logger
+
+STT_MODEL = "gemini-2.5-flash-lite"
+
+
+def normalize_audio(audio: bytes) -> bytes:
+    """
+    The part of an upload that actually carries sound.
+
+    Re-encoded copies of the same clip often differ only in container
+    metadata, so WAV is reduced to its `data` chunk and MP3 loses its
+    ID3 tags. Other containers (WebM) are hashed as sent.
+    """
+    if audio[:4] == b"RIFF" and audio[8:12] == b"WAVE":
+        index = audio.find(b"data", 12)
+        if index != -1:
+            return audio[index + 8:]
+
+    if audio[:3] == b"ID3" and len(audio) >= 10:
+        size = (audio[6] << 21) | (audio[7] << 14) | (audio[8] << 7) | audio[9]
+        audio = audio[10 + size:]
+    if len(audio) >= 128 and audio[-128:-125] == b"TAG":
+        audio = audio[:-128]
+    return audio
+
+
+def audio_fingerprint(audio: bytes) -> str:
+    return hashlib.sha256(normalize_audio(audio)).hexdigest()
+
+
+class TranscriptCache:
+    """
+    Transcripts keyed by a content hash of the audio, checked before STT.
+
+    Backed by the shared cache (LRU-bounded in process, shared across
+    workers when a shared tier is configured). Concurrent uploads of the
+    same clip, such as a client retrying while the first attempt is still
+    running, share one STT call; if the request making it is cancelled,
+    a waiting one makes the call itself. Empty transcripts are not cached,
+    since they may come from a transient STT failure.
+    """
+
+    def __init__(self, max_entries: int = 2048, ttl: float = 7 * 24 * 3600):
+        self.cache = get_cache("transcripts", max_entries=max_entries, ttl=ttl)
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def get_or_transcribe(self, audio: bytes, transcribe: Callable[[], Awaitable[str]]) -> str:
+        key = f"{STT_MODEL}:{audio_fingerprint(audio)}"
+
+        cached = await self.cache.get(key)
+        if cached is not None:
+            logger.info("Transcript cache hit")
+            return cached
+
+        while key in self._inflight:
+            shared = self._inflight[key]
+            try:
+                return await asyncio.shield(shared)
+            except asyncio.CancelledError:
+                if not shared.cancelled():
+                    raise
+                # The leader's request was cancelled, not ours: take over the call
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            text = await transcribe()
+            if text:
+                await self.cache.set(key, text)
+            future.set_result(text)
+            return text
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                # Followers re-raise it; don't warn about an unretrieved exception
+                future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+
+_transcripts: Optional[TranscriptCache] = None
+
+
+def get_transcript_cache() -> TranscriptCache:
+    global _transcripts
+    if _transcripts is None:
+        _transcripts = TranscriptCache(
+            max_entries=int(os.getenv("TRANSCRIPT_CACHE_ENTRIES", "2048")),
+            ttl=float(os.getenv("TRANSCRIPT_CACHE_TTL", str(7 * 24 * 3600))),
+        )
+    return _transcripts
@@ -0,0 +1,262 @@
+import io
+import os
+import wave
+import shutil
+import asyncio
+import threading
+import httpx
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, List, Optional
+
+from services.audio_formats import MPEG, WAV
+from utils.deadline import run_stage, stage_timeout
+from utils.logger import logger
+from utils.upstreams import elevenlabs_base_url, get_http_client
+
+ELEVEN_MODEL = "eleven_turbo_v2"
+
+
+class TTSBackend(ABC):
+    """
+    One speech synthesizer. Backends are tried in order (see `tts_backends`)
+    until one returns audio; each caches under its own name.
+    """
+
+    name: str = ""
+    mime_type: str = MPEG
+    # Whether the output depends on the requested voice/settings (cache key)
+    voice_aware: bool = False
+    # Whether `output_format` is honoured; other backends' audio is transcoded
+    native_formats: bool = False
+
+    def available(self) -> bool:
+        return True
+
+    @property
+    def cache_name(self) -> str:
+        """Distinguishes cached audio from differently configured engines."""
+        return self.name
+
+    @abstractmethod
+    async def synthesize(
+        self,
+        text: str,
+        voice_id: str,
+        voice_settings: Optional[dict],
+        client: Optional[httpx.AsyncClient],
+        output_format: Optional[str] = None,
+    ) -> Optional[bytes]:
+        pass
+
+    async def stream(
+        self,
+        text: str,
+        voice_id: str,
+        voice_settings: Optional[dict],
+        client: Optional[httpx.AsyncClient],
+        output_format: Optional[str] = None,
+    ) -> AsyncIterator[bytes]:
+        """Chunks as they are produced; by default the whole clip at once."""
+        audio = await self.synthesize(text, voice_id, voice_settings, client, output_format)
+        if audio:
+            yield audio
+
+
+# --------------------------------------------------
+# ELEVENLABS
+# --------------------------------------------------
+class ElevenLabsBackend(TTSBackend):
+    name = "elevenlabs"
+    voice_aware = True
+    native_formats = True
+
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+
+    def _request(self, text: str, voice_settings: Optional[dict], output_format: Optional[str]):
+        payload = {"text": text, "model_id": ELEVEN_MODEL}
+        if voice_settings:
+            payload["voice_settings"] = voice_settings
+        headers = {"xi-api-key": self.api_key, "Content-Type": "application/json"}
+        params = {"output_format": output_format} if output_format else None
+        return payload, headers, params
+
+    async def synthesize(self, text, voice_id, voice_settings, client, output_format=None):
+        payload, headers, params = self._request(text, voice_settings, output_format)
+        url = f"{elevenlabs_base_url()}/text-to-speech/{voice_id}"
+
+        # Bounded by what is left of the request; a timeout here falls through to the next backend
+        client = client or get_http_client()
+        res = await client.post(url, headers=headers, params=params, json=payload, timeout=stage_timeout("tts", cap=30.0))
+
+        if res.status_code != 200:
+            logger.error(f"ElevenLabs error {res.status_code}: {res.text[:200]}")
+            return None
+
+        return res.content
+
+    async def stream(self, text, voice_id, voice_settings, client, output_format=None):
+        """Proxy ElevenLabs' streaming endpoint chunk by chunk; yields nothing on an error status."""
+        payload, headers, params = self._request(text, voice_settings, output_format)
+        url = f"{elevenlabs_base_url()}/text-to-speech/{voice_id}/stream"
+
+        client = client or get_http_client()
+        timeout = stage_timeout("tts", cap=30.0)
+        async with client.stream("POST", url, headers=headers, params=params, json=payload, timeout=timeout) as res:
+            if res.status_code != 200:
+                body = await res.aread()
+                logger.error(f"ElevenLabs stream error {res.status_code}: {body[:200]!r}")
+                return
+
+            async for chunk in res.aiter_bytes():
+                yield chunk
+
+
+# --------------------------------------------------
+# LOCAL ENGINES (no network)
+# --------------------------------------------------
+class PiperBackend(TTSBackend):
+    """Piper neural TTS; the ONNX voice is loaded once per process."""
+
+    name = "piper"
+    mime_type = WAV
+
+    def __init__(self, model_path: str):
+        self.model_path = model_path
+        self._voice = None
+        self._lock = threading.Lock()
+
+    @property
+    def cache_name(self) -> str:
+        return f"piper:{os.path.basename(self.model_path)}"
+
+    def available(self) -> bool:
+        if not os.path.exists(self.model_path):
+            return False
+        try:
+            import piper  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def load(self):
+        with self._lock:
+            if self._voice is None:
+                from piper import PiperVoice
+                self._voice = PiperVoice.load(self.model_path)
+                logger.info(f"Piper voice loaded from {self.model_path}")
+        return self._voice
+
+    def _synthesize_wav(self, text: str) -> bytes:
+        voice = self.load()
+        buf = io.BytesIO()
+        with wave.open(buf, "wb") as wav_file:
+            # piper-tts >= 1.3 renamed synthesize() to synthesize_wav()
+            write = getattr(voice, "synthesize_wav", None) or voice.synthesize
+            write(text, wav_file)
+        return buf.getvalue()
+
+    async def synthesize(self, text, voice_id, voice_settings, client, output_format=None):
+        return await run_stage("tts", asyncio.to_thread(self._synthesize_wav, text))
+
+
+class EspeakBackend(TTSBackend):
+    """espeak-ng formant synthesizer: robotic, but tiny, fast and always available."""
+
+    name = "espeak"
+    mime_type = WAV
+
+    def __init__(self, voice: str = "en-us", words_per_minute: int = 170):
+        self.binary = shutil.which("espeak-ng") or shutil.which("espeak")
+        self.voice = voice
+        self.words_per_minute = words_per_minute
+
+    @property
+    def cache_name(self) -> str:
+        return f"espeak:{self.voice}:{self.words_per_minute}"
+
+    def available(self) -> bool:
+        return self.binary is not None
+
+    async def synthesize(self, text, voice_id, voice_settings, client, output_format=None):
+        proc = await asyncio.create_subprocess_exec(
+            self.binary, "--stdout", "--stdin", "-v", self.voice, "-s", str(self.words_per_minute),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            audio, err = await run_stage("tts", proc.communicate(text.encode()))
+        finally:
+            if proc.returncode is None:
+                proc.kill()
+                # Reap it so timed-out runs don't pile up as zombies
+                await proc.wait()
+
+        if proc.returncode != 0:
+            logger.error(f"espeak failed ({proc.returncode}): {err[:200]!r}")
+            return None
+        return audio
+
+
+# --------------------------------------------------
+# GTTS (network, last resort)
+# --------------------------------------------------
+def gtts_tts(text: str) -> bytes:
+    from gtts import gTTS
+
+    tts = gTTS(text=text, lang='en', slow=False)
+    buf = io.BytesIO()
+    tts.write_to_fp(buf)
+    return buf.getvalue()
+
+
+class GTTSBackend(TTSBackend):
+    name = "gtts"
+
+    async def synthesize(self, text, voice_id, voice_settings, client, output_format=None):
+        return await run_stage("tts", asyncio.to_thread(gtts_tts, text))
+
+
+# --------------------------------------------------
+# CHAIN
+# --------------------------------------------------
+_local_backend: Optional[TTSBackend] = None
+_local_checked = False
+
+
+def get_local_backend() -> Optional[TTSBackend]:
+    """Piper when PIPER_MODEL points at a voice, otherwise espeak-ng if installed."""
+    global _local_backend, _local_checked
+    if not _local_checked:
+        _local_checked = True
+        candidates = []
+        if os.getenv("PIPER_MODEL"):
+            candidates.append(PiperBackend(os.getenv("PIPER_MODEL")))
+        candidates.append(EspeakBackend(voice=os.getenv("ESPEAK_VOICE", "en-us")))
+        _local_backend = next((b for b in candidates if b.available()), None)
+        logger.info(f"Local TTS engine: {_local_backend.name if _local_backend else 'none'}")
+    return _local_backend
+
+
+_gtts = GTTSBackend()
+
+
+def tts_backends(api_key: Optional[str]) -> List[TTSBackend]:
+    """
+    Backends to try, in TTS_BACKENDS order (default: elevenlabs, local, gtts).
+
+    ElevenLabs is skipped without an API key, the local engine when none is
+    installed; set TTS_BACKENDS=elevenlabs,local to never leave the box on
+    fallback.
+    """
+    chain = []
+    for name in os.getenv("TTS_BACKENDS", "elevenlabs,local,gtts").split(","):
+        name = name.strip()
+        if name == "elevenlabs" and api_key:
+            chain.append(ElevenLabsBackend(api_key))
+        elif name == "local" and get_local_backend() is not None:
+            chain.append(get_local_backend())
+        elif name == "gtts":
+            chain.append(_gtts)
+    return chain
@@ -0,0 +1,198 @@
+import io
+import os
+import json
+import asyncio
+import hashlib
+import zipfile
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from exceptions.base import DeadlineExceeded
+from services.cache import get_cache
+from services.audio_formats import audio_extension
+from services.tts_service import synthesize
+from utils.logger import logger
+from utils.upstreams import get_http_client
+
+# Batch results are fetched by id after the batch returns; keep them a day
+BATCH_AUDIO_TTL = 24 * 3600
+
+OK = "ok"
+FAILED = "failed"
+TIMEOUT = "timeout"
+INVALID = "invalid"
+
+
+def batch_audio_cache():
+    return get_cache("tts_batch", max_entries=1024, ttl=BATCH_AUDIO_TTL)
+
+
+def audio_id(text: str, voice_id: str, voice_settings: Optional[dict] = None) -> str:
+    raw = json.dumps([voice_id, voice_settings, text], sort_keys=True)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class BatchJob:
+    """One unique (text, voice) pair and every input index that asked for it."""
+
+    def __init__(self, job_id: str, text: str, voice_id: str):
+        self.id = job_id
+        self.text = text
+        self.voice_id = voice_id
+        self.indices: List[int] = []
+        self.status: Optional[str] = None
+        self.error: Optional[str] = None
+        self.audio: Optional[bytes] = None
+
+
+class TTSBatch:
+    """
+    Synthesize many texts over the shared pooled HTTP client.
+
+    Identical (text, voice) items are synthesized once; at most
+    `concurrency` syntheses run at a time so a large batch can't exhaust
+    the ElevenLabs quota or starve interactive requests.
+    """
+
+    def __init__(
+        self,
+        items: List[Tuple[str, str]],
+        api_key: Optional[str],
+        voice_settings: Optional[dict] = None,
+        concurrency: int = 4,
+    ):
+        self.api_key = api_key
+        self.voice_settings = voice_settings
+        self.concurrency = concurrency
+        self.invalid: List[int] = []
+        self.jobs: Dict[str, BatchJob] = {}
+
+        for index, (text, voice_id) in enumerate(items):
+            text = (text or "").strip()
+            if not text or not voice_id:
+                self.invalid.append(index)
+                continue
+            job_id = audio_id(text, voice_id, voice_settings)
+            job = self.jobs.setdefault(job_id, BatchJob(job_id, text, voice_id))
+            job.indices.append(index)
+
+        self.size = len(items)
+
+    async def run(self) -> AsyncIterator[BatchJob]:
+        """Yield each unique job as soon as it finishes, in completion order."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        cache = batch_audio_cache()
+        client = get_http_client()
+
+        async def process(job: BatchJob) -> BatchJob:
+            async with semaphore:
+                try:
+                    job.audio = await synthesize(
+                        job.text,
+                        job.voice_id,
+                        api_key=self.api_key,
+                        voice_settings=self.voice_settings,
+                        client=client,
+                        context="TTS Batch",
+                    )
+                except DeadlineExceeded as e:
+                    job.status, job.error = TIMEOUT, e.message
+                    return job
+                except Exception as e:
+                    logger.error(f"Batch item {job.id[:12]} failed: {e}")
+                    job.status, job.error = FAILED, "Speech synthesis failed"
+                    return job
+
+            if not job.audio:
+                job.status, job.error = FAILED, "Speech synthesis failed"
+                return job
+
+            await cache.set(job.id, job.audio)
+            job.status = OK
+            return job
+
+        tasks = [asyncio.create_task(process(job)) for job in self.jobs.values()]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            # Client went away or the deadline hit: stop queued items too
+            for task in tasks:
+                task.cancel()
+
+    def item_statuses(self) -> List[dict]:
+        """Per-input status, in request order."""
+        statuses = [None] * self.size
+        for index in self.invalid:
+            statuses[index] = {"index": index, "id": None, "status": INVALID, "error": "Text or voiceId is empty"}
+        for job in self.jobs.values():
+            for index in job.indices:
+                statuses[index] = {
+                    "index": index,
+                    "id": job.id if job.status == OK else None,
+                    "status": job.status or FAILED,
+                    "error": job.error,
+                }
+        return statuses
+
+    def summary(self) -> dict:
+        items = self.item_statuses()
+        return {
+            "items": items,
+            "unique": len(self.jobs),
+            "succeeded": sum(item["status"] == OK for item in items),
+        }
+
+
+# --------------------------------------------------
+# STREAMED ZIP
+# --------------------------------------------------
+class _ChunkWriter(io.RawIOBase):
+    """Write-only, unseekable sink; zipfile then emits data descriptors and we drain as we go."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._offset = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._offset
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def stream_zip(batch: TTSBatch) -> AsyncIterator[bytes]:
+    """
+    Stream a zip archive: one `<id>.mp3` (or `.wav` if it came from a local
+    engine) per unique item as it finishes, then `manifest.json` with the
+    per-item status.
+    """
+    sink = _ChunkWriter()
+    archive = zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED)  # MP3 doesn't compress; WAV is rare
+
+    async for job in batch.run():
+        if job.status == OK:
+            archive.writestr(f"{job.id}{audio_extension(job.audio)}", job.audio)
+            job.audio = None  # already on the wire
+            yield sink.drain()
+
+    archive.writestr("manifest.json", json.dumps(batch.summary(), indent=2))
+    archive.close()
+    yield sink.drain()
+
+
+def batch_concurrency() -> int:
+    return int(os.getenv("BATCH_TTS_CONCURRENCY", "4"))
+
+
+def batch_max_items() -> int:
+    return int(os.getenv("BATCH_TTS_MAX_ITEMS", "200"))
@@ -0,0 +1,451 @@
+import os
+import re
+import base64
+import asyncio
+import hashlib
+import json
+import struct
+import httpx
+from collections import deque
+from typing import AsyncIterator, Deque, List, Optional
+
+from exceptions.base import DeadlineExceeded
+from services.cache import get_cache
+from services.audio_formats import (
+    DEFAULT_FORMAT,
+    WAV,
+    AudioFormat,
+    audio_mime_type,
+    can_transcode,
+    transcode,
+    transcode_stream,
+)
+from services.tts_backends import ELEVEN_MODEL, TTSBackend, tts_backends
+from utils.logger import logger
+from utils.upstreams import get_http_client
+
+# Long text is synthesized as segments of at most this many characters.
+# The first segment is kept short so audio starts quickly.
+SEGMENT_CHARS = int(os.getenv("TTS_SEGMENT_CHARS", "1000"))
+FIRST_SEGMENT_CHARS = int(os.getenv("TTS_FIRST_SEGMENT_CHARS", "250"))
+SEGMENT_CONCURRENCY = int(os.getenv("TTS_SEGMENT_CONCURRENCY", "3"))
+# Long passages stream segment by segment; this only stops absurd payloads
+MAX_TEXT_CHARS = int(os.getenv("TTS_MAX_TEXT_CHARS", "200000"))
+
+PARAGRAPH_SPLIT = re.compile(r"\n\s*\n")
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?;:])\s+")
+
+# Synthesized audio is deterministic for (voice, settings, text); share it across workers
+AUDIO_CACHE_TTL = 7 * 24 * 3600
+
+
+def _audio_cache():
+    return get_cache("tts_audio", max_entries=256, ttl=AUDIO_CACHE_TTL)
+
+
+def _cache_key(provider: str, text: str, voice_id: str = "", voice_settings: Optional[dict] = None) -> str:
+    raw = json.dumps([provider, ELEVEN_MODEL, voice_id, voice_settings, text], sort_keys=True)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _backend_key(
+    backend: TTSBackend,
+    text: str,
+    voice_id: str,
+    voice_settings: Optional[dict],
+    audio_format: AudioFormat,
+) -> str:
+    # MP3 keeps the original keys; other formats are cached as separate variants
+    provider = backend.cache_name
+    if audio_format is not DEFAULT_FORMAT:
+        provider = f"{provider}:{audio_format.name}"
+    # Fallback engines ignore the voice, so one clip serves every voice
+    if backend.voice_aware:
+        return _cache_key(provider, text, voice_id, voice_settings)
+    return _cache_key(provider, text)
+
+
+# --------------------------------------------------
+# SEGMENTING
+# --------------------------------------------------
+def split_segments(text: str, max_chars: int = None, first_max_chars: int = None) -> List[str]:
+    """
+    Split text into segments at paragraph, then sentence, then word
+    boundaries. Nothing is dropped; a single over-long word becomes its
+    own segment.
+    """
+    max_chars = max_chars or SEGMENT_CHARS
+    first_max_chars = min(first_max_chars or FIRST_SEGMENT_CHARS, max_chars)
+
+    units = []
+    for paragraph in PARAGRAPH_SPLIT.split(text):
+        paragraph = " ".join(paragraph.split())
+        if not paragraph:
+            continue
+        sentences = SENTENCE_SPLIT.split(paragraph)
+        # Remember paragraph ends; a reasonably full segment closes there
+        units.extend((sentence, i == len(sentences) - 1) for i, sentence in enumerate(sentences))
+
+    segments, current = [], ""
+
+    def limit():
+        return first_max_chars if not segments else max_chars
+
+    for unit, ends_paragraph in units:
+        for piece in _split_words(unit, max_chars):
+            if current and len(current) + 1 + len(piece) > limit():
+                segments.append(current)
+                current = ""
+            current = f"{current} {piece}" if current else piece
+        if ends_paragraph and len(current) >= limit() // 2:
+            segments.append(current)
+            current = ""
+
+    if current:
+        segments.append(current)
+    return segments
+
+
+def _split_words(sentence: str, max_chars: int) -> List[str]:
+    if len(sentence) <= max_chars:
+        return [sentence]
+
+    pieces, current = [], ""
+    for word in sentence.split():
+        if current and len(current) + 1 + len(word) > max_chars:
+            pieces.append(current)
+            current = ""
+        current = f"{current} {word}" if current else word
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def _strip_id3(audio: bytes) -> bytes:
+    """Drop a leading ID3v2 tag so concatenated segments play as one MP3 stream."""
+    if len(audio) < 10 or audio[:3] != b"ID3":
+        return audio
+    size = (audio[6] << 21) | (audio[7] << 14) | (audio[8] << 7) | audio[9]
+    footer = 10 if audio[5] & 0x10 else 0
+    return audio[10 + size + footer:]
+
+
+def _wav_data_offset(audio: bytes) -> int:
+    """Offset of the sample data in a RIFF/WAVE clip, or -1."""
+    index = audio.find(b"data", 12)
+    return index + 8 if index != -1 else -1
+
+
+def _wav_samples(audio: bytes) -> bytes:
+    """Drop the header so later segments continue the first segment's WAV stream."""
+    offset = _wav_data_offset(audio)
+    return audio[offset:] if offset != -1 else audio
+
+
+def _wav_sizes(audio: bytes, streaming: bool = False) -> bytes:
+    """
+    Rewrite the RIFF and data chunk sizes. A streamed WAV's length isn't
+    known up front, so it gets the conventional 0xFFFFFFFF ("until EOF").
+    """
+    offset = _wav_data_offset(audio)
+    if offset == -1:
+        return audio
+    riff_size = 0xFFFFFFFF if streaming else len(audio) - 8
+    data_size = 0xFFFFFFFF if streaming else len(audio) - offset
+    audio = bytearray(audio)
+    audio[4:8] = struct.pack("<I", riff_size)
+    audio[offset - 4:offset] = struct.pack("<I", data_size)
+    return bytes(audio)
+
+
+# --------------------------------------------------
+# CACHED SYNTHESIS
+# --------------------------------------------------
+async def synthesize(
+    text: str,
+    voice_id: str,
+    api_key: Optional[str] = None,
+    voice_settings: Optional[dict] = None,
+    client: Optional[httpx.AsyncClient] = None,
+    context: str = "TTS",
+    audio_format: Optional[AudioFormat] = None,
+) -> Optional[bytes]:
+    """
+    First backend in the `tts_backends` chain that succeeds, in
+    `audio_format` (MP3 by default), cached in the shared audio cache.
+
+    Text longer than one segment is synthesized segment by segment (see
+    `synthesize_stream`) and joined.
+    """
+    if not text:
+        return None
+
+    if len(text) > SEGMENT_CHARS:
+        stream = synthesize_stream(text, voice_id, api_key, voice_settings, client, context, audio_format)
+        audio = b"".join([chunk async for chunk in stream])
+        if audio and audio_mime_type(audio) == WAV:
+            audio = _wav_sizes(audio)
+        return audio or None
+
+    audio_format = audio_format or DEFAULT_FORMAT
+    return await _synthesize_segment(text, voice_id, api_key, voice_settings, client, context, audio_format)
+
+
+async def synthesize_stream(
+    text: str,
+    voice_id: str,
+    api_key: Optional[str] = None,
+    voice_settings: Optional[dict] = None,
+    client: Optional[httpx.AsyncClient] = None,
+    context: str = "TTS",
+    audio_format: Optional[AudioFormat] = None,
+) -> AsyncIterator[bytes]:
+    """
+    Yield audio for `text` segment by segment, in order.
+
+    The first segment is passed through as its bytes arrive (ElevenLabs
+    streams; local engines hand over a whole clip), while up to
+    SEGMENT_CONCURRENCY - 1 later segments are synthesized in the
+    background, each started as an earlier one is yielded. A failed segment ends the stream there rather than
+    skipping ahead mid-passage, as does a segment that fell back to an
+    engine with a different format than the first.
+
+    Ogg and WebM clips can't simply be appended, so long text in those
+    formats is synthesized as MP3 and encoded once, as it streams.
+    """
+    audio_format = audio_format or DEFAULT_FORMAT
+    segments = split_segments(text)
+    if not segments:
+        return
+
+    if audio_format.concatenable or len(segments) == 1:
+        stream = _segment_stream(segments, voice_id, api_key, voice_settings, client, context, audio_format)
+    else:
+        source = _segment_stream(segments, voice_id, api_key, voice_settings, client, context, DEFAULT_FORMAT)
+        stream = transcode_stream(source, audio_format)
+
+    try:
+        async for chunk in stream:
+            yield chunk
+    finally:
+        await stream.aclose()
+
+
+async def _segment_stream(
+    segments: List[str],
+    voice_id: str,
+    api_key: Optional[str],
+    voice_settings: Optional[dict],
+    client: Optional[httpx.AsyncClient],
+    context: str,
+    audio_format: AudioFormat,
+) -> AsyncIterator[bytes]:
+    # The first segment streams live; the next few are prefetched whole meanwhile.
+    # A new prefetch starts only once a segment has been yielded, so a client
+    # that stops reading doesn't leave the rest of the text being synthesized.
+    window = max(1, SEGMENT_CONCURRENCY - 1)
+    client = client or get_http_client()
+    pending = iter(segments[1:])
+    tasks: Deque[asyncio.Task] = deque()
+
+    def prefetch_next():
+        segment = next(pending, None)
+        if segment is not None:
+            tasks.append(asyncio.create_task(
+                _synthesize_segment(segment, voice_id, api_key, voice_settings, client, context, audio_format)
+            ))
+
+    for _ in range(window):
+        prefetch_next()
+    try:
+        mime_type = None
+        async for chunk in _stream_segment(segments[0], voice_id, api_key, voice_settings, client, context, audio_format):
+            if mime_type is None:
+                mime_type = audio_mime_type(chunk)
+                if mime_type == WAV and len(segments) > 1:
+                    chunk = _wav_sizes(chunk, streaming=True)
+            yield chunk
+        if mime_type is None:
+            return
+
+        for index in range(2, len(segments) + 1):
+            task = tasks.popleft()
+            try:
+                audio = await task
+            except DeadlineExceeded:
+                # Headers are already sent; end the audio cleanly instead
+                logger.error(f"{context} ran out of time at segment {index}/{len(segments)}")
+                return
+            if not audio:
+                logger.error(f"{context} segment {index}/{len(segments)} failed, ending stream")
+                return
+            if audio_mime_type(audio) != mime_type:
+                logger.error(f"{context} segment {index}/{len(segments)} came back as a different format, ending stream")
+                return
+            yield _wav_samples(audio) if mime_type == WAV else _strip_id3(audio)
+            prefetch_next()
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+class AudioStream:
+    """An open `synthesize_stream` with its first chunk in hand, and the media type that chunk revealed."""
+
+    def __init__(self, first: bytes, rest: AsyncIterator[bytes]):
+        self.media_type = audio_mime_type(first)
+        self._first = first
+        self._rest = rest
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        try:
+            yield self._first
+            async for chunk in self._rest:
+                yield chunk
+        finally:
+            await self._rest.aclose()
+
+
+async def open_stream(
+    text: str,
+    voice_id: str,
+    api_key: Optional[str] = None,
+    voice_settings: Optional[dict] = None,
+    client: Optional[httpx.AsyncClient] = None,
+    context: str = "TTS",
+    audio_format: Optional[AudioFormat] = None,
+) -> Optional[AudioStream]:
+    """
+    Start `synthesize_stream` and wait for its first chunk, so a route can
+    still answer with an error status if nothing could be synthesized, and
+    knows which media type it is sending.
+    """
+    stream = synthesize_stream(text, voice_id, api_key, voice_settings, client, context, audio_format)
+    try:
+        first = await stream.__anext__()
+    except StopAsyncIteration:
+        return None
+    return AudioStream(first, stream)
+
+
+async def _render(
+    backend: TTSBackend,
+    text: str,
+    voice_id: str,
+    voice_settings: Optional[dict],
+    client: Optional[httpx.AsyncClient],
+    audio_format: AudioFormat,
+) -> Optional[bytes]:
+    """One whole clip from `backend`, transcoded if it can't produce `audio_format` itself."""
+    output_format = audio_format.upstream if backend.native_formats else None
+    audio = await backend.synthesize(text, voice_id, voice_settings, client, output_format)
+    if audio and audio_mime_type(audio) != audio_format.mime_type:
+        audio = await transcode(audio, audio_format) or audio
+    return audio
+
+
+def _cacheable(audio: bytes, audio_format: AudioFormat) -> bool:
+    # A failed transcode may be transient; without ffmpeg the original is all there will be
+    return audio_mime_type(audio) == audio_format.mime_type or not can_transcode()
+
+
+async def _stream_segment(
+    text: str,
+    voice_id: str,
+    api_key: Optional[str],
+    voice_settings: Optional[dict],
+    client: Optional[httpx.AsyncClient],
+    context: str,
+    audio_format: AudioFormat,
+) -> AsyncIterator[bytes]:
+    """
+    Like `_synthesize_segment`, but passes chunks through as the backend
+    produces them when it can stream the requested format. A clip is
+    cached only once it has streamed completely.
+    """
+    cache = _audio_cache()
+
+    for backend in tts_backends(api_key):
+        key = _backend_key(backend, text, voice_id, voice_settings, audio_format)
+        audio = await cache.get(key)
+        if audio is not None:
+            yield audio
+            return
+
+        if not (backend.native_formats and audio_format.native):
+            try:
+                audio = await _render(backend, text, voice_id, voice_settings, client, audio_format)
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                logger.error(f"{context} {backend.name} failed: {e}, trying next backend")
+                continue
+            if audio:
+                if _cacheable(audio, audio_format):
+                    await cache.set(key, audio)
+                yield audio
+                return
+            continue
+
+        chunks = []
+        try:
+            async for chunk in backend.stream(text, voice_id, voice_settings, client, audio_format.upstream):
+                chunks.append(chunk)
+                yield chunk
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            if chunks:
+                # Too late to switch voices mid-clip
+                logger.error(f"{context} {backend.name} stream broke off: {e}")
+                return
+            logger.error(f"{context} {backend.name} failed: {e}, trying next backend")
+
+        if chunks:
+            await cache.set(key, b"".join(chunks))
+            return
+
+
+async def _synthesize_segment(
+    text: str,
+    voice_id: str,
+    api_key: Optional[str],
+    voice_settings: Optional[dict],
+    client: Optional[httpx.AsyncClient],
+    context: str,
+    audio_format: AudioFormat,
+) -> Optional[bytes]:
+    """
+    One request down the backend chain. Results are cached per backend
+    and format so a fallback voice is never served in place of the real
+    one once ElevenLabs recovers.
+    """
+    cache = _audio_cache()
+
+    for backend in tts_backends(api_key):
+        key = _backend_key(backend, text, voice_id, voice_settings, audio_format)
+        audio = await cache.get(key)
+        if audio is not None:
+            return audio
+
+        try:
+            audio = await _render(backend, text, voice_id, voice_settings, client, audio_format)
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            logger.error(f"{context} {backend.name} failed: {e}, trying next backend")
+            audio = None
+
+        if audio:
+            if _cacheable(audio, audio_format):
+                await cache.set(key, audio)
+            return audio
+
+    return None
+
+
+def to_data_uri(audio: Optional[bytes], mime_type: Optional[str] = None) -> Optional[str]:
+    if not audio:
+        return None
+    mime_type = mime_type or audio_mime_type(audio)
+    return f"data:{mime_type};base64,{base64.b64encode(audio).decode()}"
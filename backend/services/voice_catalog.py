@@ -0,0 +1,151 @@
+import os
+import time
+import json
+import asyncio
+import hashlib
+from typing import List, Optional, Tuple
+
+from services.cache import CacheBackend, get_cache
+from utils.logger import logger
+from utils.upstreams import elevenlabs_base_url, get_http_client
+
+CATALOG_KEY = "elevenlabs_voices"
+
+
+class VoiceCatalogError(Exception):
+    pass
+
+
+class VoiceCatalog:
+    """
+    Server-side cache of the ElevenLabs voice list.
+
+    Fresh for `ttl` seconds, then served stale for up to `stale_ttl`
+    seconds while a single background task refreshes it. The entry lives
+    in the shared cache so every worker serves the same list and ETag.
+    After a failed background refresh the next attempt waits `retry_backoff`
+    seconds, doubling with each further failure up to `ttl`.
+    """
+
+    def __init__(self, cache: CacheBackend, ttl: float = 3600, stale_ttl: float = 86400, retry_backoff: float = 30):
+        self.cache = cache
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.retry_backoff = retry_backoff
+        self._lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._failures = 0
+        self._retry_at = 0.0
+
+    # --------------------------------------------------
+    # PUBLIC
+    # --------------------------------------------------
+    async def get(self) -> Tuple[List[dict], str]:
+        entry = await self.cache.get(CATALOG_KEY)
+
+        if self._age(entry) > self.ttl + self.stale_ttl:
+            async with self._lock:
+                # Another request may have refreshed while we waited
+                entry = await self.cache.get(CATALOG_KEY)
+                if self._age(entry) > self.ttl + self.stale_ttl:
+                    entry = await self._refresh()
+        elif self._age(entry) > self.ttl:
+            self._schedule_refresh()
+
+        return entry["voices"], entry["etag"]
+
+    async def invalidate(self):
+        await self.cache.delete(CATALOG_KEY)
+
+    @staticmethod
+    def _age(entry: Optional[dict]) -> float:
+        if entry is None:
+            return float("inf")
+        return time.time() - entry["fetched_at"]
+
+    # --------------------------------------------------
+    # REFRESH
+    # --------------------------------------------------
+    def _schedule_refresh(self):
+        if self._refresh_task and not self._refresh_task.done():
+            return
+        if time.monotonic() < self._retry_at:
+            return
+        self._refresh_task = asyncio.create_task(self._background_refresh())
+
+    async def _background_refresh(self):
+        try:
+            async with self._lock:
+                await self._refresh()
+            self._failures = 0
+        except Exception as e:
+            # Keep serving the stale list; a request past TTL retries once the backoff ends
+            backoff = min(self.retry_backoff * 2 ** self._failures, self.ttl)
+            self._failures += 1
+            self._retry_at = time.monotonic() + backoff
+            logger.error(f"Voice catalog background refresh failed, retrying in {backoff:.0f}s: {e}")
+
+    async def _refresh(self) -> dict:
+        voices = await self._fetch()
+        body = json.dumps(voices, sort_keys=True).encode()
+
+        entry = {
+            "voices": voices,
+            "etag": f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+            "fetched_at": time.time(),
+        }
+        await self.cache.set(CATALOG_KEY, entry, ttl=self.ttl + self.stale_ttl)
+        logger.info(f"Voice catalog refreshed ({len(voices)} voices)")
+        return entry
+
+    async def _fetch(self) -> List[dict]:
+        api_key = os.getenv("ELEVENLABS_API_KEY")
+        if not api_key:
+            raise VoiceCatalogError("API key not configured")
+
+        headers = {
+            "xi-api-key": api_key,
+            "Accept": "application/json",
+        }
+
+        res = await get_http_client().get(f"{elevenlabs_base_url()}/voices", headers=headers)
+
+        if res.status_code != 200:
+            raise VoiceCatalogError(f"ElevenLabs returned {res.status_code}: {res.text}")
+
+        voices = res.json().get("voices", [])
+
+        return [
+            {"id": v.get("voice_id"), "name": v.get("name")}
+            for v in voices
+            if v.get("voice_id") and v.get("name")
+        ]
+
+
+def etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag in candidates
+
+
+# --------------------------------------------------
+# SINGLETON
+# --------------------------------------------------
+_catalog: Optional[VoiceCatalog] = None
+
+
+def get_voice_catalog() -> VoiceCatalog:
+    global _catalog
+    if _catalog is None:
+        ttl = float(os.getenv("VOICES_CACHE_TTL", "3600"))
+        stale_ttl = float(os.getenv("VOICES_STALE_TTL", "86400"))
+        _catalog = VoiceCatalog(
+            get_cache("voices", max_entries=4, ttl=ttl + stale_ttl),
+            ttl=ttl,
+            stale_ttl=stale_ttl,
+            retry_backoff=float(os.getenv("VOICES_REFRESH_BACKOFF", "30")),
+        )
+    return _catalog
@@ -0,0 +1,134 @@
+import os
+import time
+import asyncio
+from urllib.parse import urlparse
+from typing import Awaitable, Callable, Dict, Optional
+
+from utils.logger import logger
+from utils.upstreams import elevenlabs_base_url, gemini_client_kwargs, get_http_client, search_base_url
+
+GEMINI_DEFAULT_URL = "https://generativelanguage.googleapis.com"
+SEARCH_DEFAULT_URL = "https://duckduckgo.com"
+PROBE_MODEL = "models/gemini-2.5-flash-lite"
+
+Probe = Callable[[], Awaitable[None]]
+
+
+class Upstream:
+    def __init__(self, name: str, url: str, probe: Optional[Probe] = None):
+        parsed = urlparse(url)
+        self.name = name
+        self.host = parsed.hostname
+        self.port = parsed.port or (443 if parsed.scheme == "https" else 80)
+        self.probe = probe
+
+
+class UpstreamWarmer:
+    """
+    Keeps the network path to each external service hot.
+
+    Each pass resolves the host (priming the resolver cache) and runs a
+    cheap authenticated probe, which leaves a pooled connection with TLS
+    already negotiated. Running a pass every `interval` seconds stops idle
+    replicas from going cold.
+    """
+
+    def __init__(self, interval: float = 60.0, timeout: float = 5.0):
+        self.interval = interval
+        self.timeout = timeout
+        self.upstreams: Dict[str, Upstream] = {}
+        self.last: Dict[str, dict] = {}
+
+    def add(self, name: str, url: str, probe: Optional[Probe] = None):
+        self.upstreams[name] = Upstream(name, url, probe)
+
+    async def warm_once(self) -> Dict[str, dict]:
+        names = list(self.upstreams)
+        results = await asyncio.gather(*(self._warm(self.upstreams[name]) for name in names))
+        self.last = dict(zip(names, results))
+        return self.last
+
+    async def keep_warm(self, on_result: Optional[Callable[[Dict[str, dict]], None]] = None):
+        while True:
+            await asyncio.sleep(self.interval)
+            results = await self.warm_once()
+            failed = [name for name, result in results.items() if not result["ok"]]
+            if failed:
+                logger.warning(f"Keep-warm probe failed for: {', '.join(failed)}")
+            if on_result:
+                on_result(results)
+
+    async def _warm(self, upstream: Upstream) -> dict:
+        result = {"host": upstream.host, "ok": True}
+        try:
+            if upstream.host:
+                start = time.perf_counter()
+                await asyncio.wait_for(
+                    asyncio.get_running_loop().getaddrinfo(upstream.host, upstream.port),
+                    timeout=self.timeout,
+                )
+                result["dns_seconds"] = round(time.perf_counter() - start, 3)
+
+            if upstream.probe:
+                start = time.perf_counter()
+                await asyncio.wait_for(upstream.probe(), timeout=self.timeout)
+                result["probe_seconds"] = round(time.perf_counter() - start, 3)
+
+        except Exception as e:
+            result["ok"] = False
+            result["error"] = str(e) or type(e).__name__
+        return result
+
+
+# --------------------------------------------------
+# PROBES
+# --------------------------------------------------
+async def probe_elevenlabs():
+    # Model list: authenticated, tiny, and costs no characters
+    res = await get_http_client().get(
+        f"{elevenlabs_base_url()}/models",
+        headers={"xi-api-key": os.getenv("ELEVENLABS_API_KEY", "")},
+    )
+    res.raise_for_status()
+
+
+async def probe_gemini():
+    import google.generativeai as genai
+
+    def fetch_model():
+        genai.configure(
+            api_key=os.getenv("VOICE_AGENT_GEMINI_API_KEY") or os.getenv("GEMINI_API_KEY"),
+            **gemini_client_kwargs(),
+        )
+        genai.get_model(PROBE_MODEL)
+
+    await asyncio.to_thread(fetch_model)
+
+
+def get_upstream_warmer(rag_service=None) -> UpstreamWarmer:
+    """Warmer for every upstream that is configured in this deployment."""
+    warmer = UpstreamWarmer(
+        interval=float(os.getenv("UPSTREAM_KEEPWARM_SECONDS", "60")),
+        timeout=float(os.getenv("UPSTREAM_PROBE_TIMEOUT", "5")),
+    )
+
+    if os.getenv("ELEVENLABS_API_KEY"):
+        warmer.add("elevenlabs", elevenlabs_base_url(), probe_elevenlabs)
+
+    if os.getenv("VOICE_AGENT_GEMINI_API_KEY") or os.getenv("GEMINI_API_KEY"):
+        endpoint = os.getenv("GEMINI_API_ENDPOINT", GEMINI_DEFAULT_URL)
+        if "://" not in endpoint:
+            endpoint = f"https://{endpoint}"
+        warmer.add("gemini", endpoint, probe_gemini)
+
+    if rag_service is not None and os.getenv("PINECONE_API_KEY") and os.getenv("VECTOR_INDEX", "pinecone") != "local":
+        # Probed once the RAG chain exists; its own warmup covers startup
+        async def probe_pinecone():
+            if rag_service.health_check():
+                await rag_service.probe()
+
+        host = os.getenv("PINECONE_INDEX_HOST")
+        warmer.add("pinecone", host if host and "://" in host else f"https://{host or 'api.pinecone.io'}", probe_pinecone)
+
+    warmer.add("search", search_base_url() or SEARCH_DEFAULT_URL)
+    return warmer
@@ -0,0 +1,144 @@
+import os
+import re
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+from services.cache import get_cache
+from utils.deadline import stage_timeout
+from utils.logger import logger
+from utils.tracing import tracer
+from utils.upstreams import get_http_client, search_base_url
+
+
+# --------------------------------------------------
+# BACKENDS
+# --------------------------------------------------
+class SearchBackend(ABC):
+    @abstractmethod
+    async def search(self, query: str, max_results: int) -> List[dict]:
+        pass
+
+
+class DuckDuckGoBackend(SearchBackend):
+    async def search(self, query: str, max_results: int) -> List[dict]:
+        from ddgs import DDGS
+        return await asyncio.to_thread(DDGS().text, query, max_results=max_results) or []
+
+
+class HttpSearchBackend(SearchBackend):
+    """Any service returning DDG-shaped results at GET {base_url}/search (e.g. the benchmark fake)."""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip("/")
+    async def search(self, query: str, max_results: int) -> List[dict]:
+        res = await get_http_client().get(
+            f"{self.base_url}/search",
+            params={"q": query, "max_results": max_results},
+            timeout=10.0,
+        )
+        res.raise_for_status()
+        return res.json()
+
+
+# --------------------------------------------------
+# SERVICE
+# --------------------------------------------------
+class WebSearchService:
+    """
+    Cached, time-boxed web search for the agent's `web_search` tool.
+
+    Results are cached per normalized query for a short TTL, identical
+    queries in flight share one upstream call (taken over by a waiting
+    caller if the one making it is cancelled), and each call is cut off
+    after `timeout` seconds so a slow search can't stall the agent loop.
+    """
+
+    def __init__(self, backend: SearchBackend, ttl: float = 300, timeout: float = 4.0, max_results: int = 3):
+        self.backend = backend
+        self.ttl = ttl
+        self.timeout = timeout
+        self.max_results = max_results
+        self.cache = get_cache("web_search", max_entries=512, ttl=ttl)
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        query = re.sub(r"\s+", " ", query.lower()).strip()
+        return query.strip(" ?!.,")
+
+    async def search(self, query: str) -> str:
+        key = self.normalize(query)
+        if not key:
+            return "No results found."
+
+        cached = await self.cache.get(key)
+        if cached is not None:
+            logger.info("Web search cache hit")
+            return cached
+
+        while key in self._inflight:
+            shared = self._inflight[key]
+            try:
+                return await asyncio.shield(shared)
+            except asyncio.CancelledError:
+                if not shared.cancelled():
+                    raise
+                # The leader's request was cancelled, not ours: search ourselves
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._search_uncached(query, key)
+            future.set_result(result)
+            return result
+        except BaseException:
+            # Only cancellation gets here; _search_uncached turns errors into text
+            future.cancel()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def search_many(self, queries: List[str]) -> List[str]:
+        return await asyncio.gather(*(self.search(q) for q in queries))
+
+    async def _search_uncached(self, query: str, key: str) -> str:
+        timeout = self.timeout
+        try:
+            # Never outlive the request; the agent still needs time to answer
+            timeout = min(self.timeout, stage_timeout("search"))
+            with tracer.span("search"):
+                results = await asyncio.wait_for(
+                    self.backend.search(query, self.max_results),
+                    timeout=timeout,
+                )
+        except asyncio.TimeoutError:
+            logger.warning(f"Web search timed out after {timeout:.1f}s")
+            return "Search timed out."
+        except Exception as e:
+            return f"Search failed: {e}"
+
+        if not results:
+            text = "No results found."
+        else:
+            text = "\n".join(f"{r['title']}: {r['body']}" for r in results)
+
+        # Only successful lookups are cached; failures retry on the next turn
+        await self.cache.set(key, text)
+        return text
+
+
+_service: Optional[WebSearchService] = None
+
+
+def get_search_service() -> WebSearchService:
+    global _service
+    if _service is None:
+        base_url = search_base_url()
+        backend = HttpSearchBackend(base_url) if base_url else DuckDuckGoBackend()
+        _service = WebSearchService(
+            backend,
+            ttl=float(os.getenv("SEARCH_CACHE_TTL", "300")),
+            timeout=float(os.getenv("SEARCH_TIMEOUT", "4.0")),
+        )
+    return _service
@@ -0,0 +1,12 @@
+"""
+Unit tests for the backend services. Run from backend/:
+
+    python -m pytest tests
+"""
+import os
+import sys
+
+# Modules import each other as top-level packages (services., utils., ...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Keep test runs from writing app.log
+os.environ.setdefault("LOG_FILE", "")
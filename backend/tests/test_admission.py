@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from middleware.admission import AdmissionController, AdmissionMiddleware, EndpointPolicy, Rejected
+
+
+def scope(peer: str, forwarded_for: str = None) -> dict:
+    headers = [(b"x-forwarded-for", forwarded_for.encode())] if forwarded_for else []
+    return {"type": "http", "client": (peer, 1234), "headers": headers}
+
+
+def middleware(trusted_proxies=()):
+    return AdmissionMiddleware(None, controller=AdmissionController([]), trusted_proxies=list(trusted_proxies))
+
+
+def test_key_is_the_peer_when_it_is_not_a_trusted_proxy():
+    assert middleware().client_key(scope("203.0.113.7", "198.51.100.1")) == "203.0.113.7"
+
+
+def test_key_is_the_rightmost_untrusted_hop_behind_a_trusted_proxy():
+    admission = middleware(["10.0.0.1", "10.0.0.2"])
+    key = admission.client_key(scope("10.0.0.1", "1.2.3.4, 198.51.100.9, 10.0.0.2"))
+    # 1.2.3.4 was supplied by the client and can't be trusted
+    assert key == "198.51.100.9"
+
+
+def test_key_falls_back_to_the_peer():
+    assert middleware(["10.0.0.1"]).client_key(scope("10.0.0.1")) == "10.0.0.1"
+    assert middleware().client_key({"type": "http", "headers": []}) == "unknown"
+
+
+def test_rate_limit_is_per_client_and_endpoint():
+    policy = EndpointPolicy("/api/text-agent", max_concurrency=1, priority=0, rate_per_minute=1, burst=2)
+    controller = AdmissionController([policy])
+
+    controller.check_rate(policy, "a")
+    controller.check_rate(policy, "a")
+    with pytest.raises(Rejected) as e:
+        controller.check_rate(policy, "a")
+    assert e.value.status_code == 429
+    assert e.value.retry_after > 0
+    controller.check_rate(policy, "b")
+
+
+def test_queued_requests_are_served_by_priority():
+    low = EndpointPolicy("/low", max_concurrency=4, priority=2, rate_per_minute=60, burst=10)
+    high = EndpointPolicy("/high", max_concurrency=4, priority=0, rate_per_minute=60, burst=10)
+    controller = AdmissionController([low, high], max_inflight=1)
+    order = []
+
+    async def request(policy, name):
+        await controller.acquire(policy)
+        order.append(name)
+        await asyncio.sleep(0)
+        controller.release(policy)
+
+    async def main():
+        await controller.acquire(low)
+        waiters = [asyncio.create_task(request(low, "low")), asyncio.create_task(request(high, "high"))]
+        await asyncio.sleep(0)
+        controller.release(low)
+        await asyncio.gather(*waiters)
+
+    asyncio.run(main())
+    assert order == ["high", "low"]
+
+
+def test_full_queue_is_rejected_with_503():
+    policy = EndpointPolicy("/api/speech", max_concurrency=1, priority=0, rate_per_minute=60, burst=10)
+    controller = AdmissionController([policy], max_inflight=1, max_queue=0)
+
+    async def main():
+        await controller.acquire(policy)
+        with pytest.raises(Rejected) as e:
+            await controller.acquire(policy)
+        assert e.value.status_code == 503
+
+    asyncio.run(main())
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from services.ann_index import IVFIndex, build_ivf_index
+
+
+def exact_top_k(vectors: np.ndarray, query: np.ndarray, k: int) -> set:
+    vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    return set(np.argsort(-(vectors @ (query / np.linalg.norm(query))))[:k])
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    rng = np.random.default_rng(0)
+    # Clustered like real embeddings, so IVF lists are meaningful
+    centers = rng.normal(size=(20, 64))
+    vectors = centers[rng.integers(0, 20, size=2000)] + 0.3 * rng.normal(size=(2000, 64))
+    queries = centers[rng.integers(0, 20, size=50)] + 0.3 * rng.normal(size=(50, 64))
+    return vectors.astype(np.float32), queries.astype(np.float32)
+
+
+@pytest.mark.parametrize("quantization", ["int8", "float16", "float32"])
+def test_recall_at_10(tmp_path, corpus, quantization):
+    vectors, queries = corpus
+    index = build_ivf_index(vectors, str(tmp_path / "index"), quantization=quantization)
+    index.nprobe = 16
+
+    hits = 0
+    for query in queries:
+        ordinals, _ = index.search(query, k=10)
+        hits += len(set(ordinals) & exact_top_k(vectors, query, 10))
+    assert hits / (10 * len(queries)) >= 0.9
+
+
+def test_full_probe_scores_match_cosine(tmp_path, corpus):
+    vectors, queries = corpus
+    index = build_ivf_index(vectors, str(tmp_path / "index"), quantization="float32")
+
+    ordinals, scores = index.search(queries[0], k=5, nprobe=index.nlist)
+    assert set(ordinals) == exact_top_k(vectors, queries[0], 5)
+    assert list(scores) == sorted(scores, reverse=True)
+    expected = vectors[ordinals[0]] @ queries[0] / (np.linalg.norm(vectors[ordinals[0]]) * np.linalg.norm(queries[0]))
+    assert scores[0] == pytest.approx(expected, abs=1e-4)
+
+
+def test_reload_and_pinecone_shaped_query(tmp_path, corpus):
+    vectors, queries = corpus
+    build_ivf_index(vectors, str(tmp_path / "index"))
+    ids = [f"doc-{i}" for i in range(len(vectors))]
+    index = IVFIndex(str(tmp_path / "index"), ids=ids)
+
+    assert len(index) == len(vectors)
+    matches = index.query(queries[0].tolist(), top_k=3)["matches"]
+    assert len(matches) == 3
+    assert all(match["id"].startswith("doc-") for match in matches)
@@ -0,0 +1,97 @@
+import time
+import asyncio
+
+from services.cache import DiskCache, MemoryCache
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_memory_cache_expires_entries():
+    cache = MemoryCache(default_ttl=0.05)
+    run(cache.set("a", 1))
+    assert run(cache.get("a")) == 1
+    time.sleep(0.06)
+    assert run(cache.get("a")) is None
+
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryCache(max_entries=2)
+    run(cache.set("a", 1))
+    run(cache.set("b", 2))
+    run(cache.get("a"))
+    run(cache.set("c", 3))
+    assert run(cache.get("a")) == 1
+    assert run(cache.get("b")) is None
+    assert run(cache.get("c")) == 3
+
+
+def test_disk_cache_sweep_deletes_expired_rows(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache.sqlite3"), "ns")
+    run(cache.set("short", "x", ttl=0.01))
+    run(cache.set("long", "y", ttl=60))
+    run(cache.set("forever", "z"))
+    time.sleep(0.02)
+
+    assert cache.sweep() == 1
+    count = cache._connect().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+    assert count == 2
+    assert run(cache.get("long")) == "y"
+    assert run(cache.get("forever")) == "z"
+
+
+def test_disk_cache_evicts_least_recently_read_beyond_max_rows(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache.sqlite3"), "ns", max_rows=2)
+    for i, key in enumerate(["a", "b", "c"]):
+        run(cache.set(key, i))
+    # Make "a" the most recently read
+    cache._connect().execute("UPDATE cache SET accessed_at = accessed_at - 1000 WHERE key != 'a'")
+
+    assert cache.sweep() == 1
+    assert run(cache.get("a")) == 0
+    assert run(cache.get("b")) is None
+    assert run(cache.get("c")) == 2
+
+
+def test_disk_cache_evicts_beyond_max_bytes(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache.sqlite3"), "ns", max_bytes=2500)
+    for i in range(3):
+        run(cache.set(f"k{i}", b"x" * 1000))
+        cache._connect().execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (i, f"k{i}"))
+
+    assert cache.sweep() == 1
+    assert run(cache.get("k0")) is None
+    assert run(cache.get("k2")) is not None
+
+
+def test_disk_cache_limits_are_per_namespace(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    small = DiskCache(path, "small", max_rows=1)
+    other = DiskCache(path, "other")
+    run(other.set("keep", 1))
+    run(other.set("keep2", 2))
+    run(small.set("a", 1))
+    run(small.set("b", 2))
+
+    small.sweep()
+    assert run(other.get("keep")) == 1
+    assert run(other.get("keep2")) == 2
+
+
+def test_redis_cache_sends_sub_second_ttls_in_milliseconds():
+    from services.cache import RedisCache
+
+    class FakeRedis:
+        async def set(self, key, value, ex=None, px=None):
+            self.call = (key, ex, px)
+
+    cache = RedisCache.__new__(RedisCache)
+    cache.client, cache.namespace, cache.default_ttl = FakeRedis(), "ns", None
+
+    run(cache.set("k", 1, ttl=0.5))
+    assert cache.client.call == ("ns:k", None, 500)
+    run(cache.set("k", 1, ttl=0.0001))
+    assert cache.client.call[2] == 1
+    run(cache.set("k", 1))
+    assert cache.client.call == ("ns:k", None, None)
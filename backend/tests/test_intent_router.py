@@ -0,0 +1,40 @@
+import pytest
+
+from services.intent_router import AGENT, DIRECT, IntentRouter, NaiveBayesIntentModel
+
+
+@pytest.mark.parametrize("text", [
+    "What's the weather in Paris tomorrow?",
+    "Latest news about the election",
+    "What is the bitcoin price right now",
+])
+def test_realtime_turns_go_to_agent(text):
+    assert IntentRouter().route(text) == (AGENT, "realtime_rule")
+
+
+@pytest.mark.parametrize("text", ["Hi there", "thanks!", "How are you?"])
+def test_small_talk_goes_direct(text):
+    assert IntentRouter().route(text) == (DIRECT, "small_talk_rule")
+
+
+def test_without_model_unmatched_turns_go_direct():
+    assert IntentRouter().route("Explain how a hash map works") == (DIRECT, "default")
+
+
+def test_model_scores_turns_the_rules_miss(tmp_path):
+    samples = [
+        ("look up the opening hours of the museum", AGENT),
+        ("search for reviews of the new phone", AGENT),
+        ("look up flights to berlin", AGENT),
+        ("explain recursion with an example", DIRECT),
+        ("what is a linked list", DIRECT),
+        ("explain the difference between tcp and udp", DIRECT),
+    ]
+    path = str(tmp_path / "model.json")
+    NaiveBayesIntentModel.train(samples).save(path)
+    router = IntentRouter(NaiveBayesIntentModel.load(path))
+
+    assert router.route("look up the museum address")[0] == AGENT
+    assert router.route("explain a binary tree")[0] == DIRECT
+    # Rules still win over the model
+    assert router.route("explain today's headlines") == (AGENT, "realtime_rule")
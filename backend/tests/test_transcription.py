@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+
+from services.transcription import TranscriptCache
+
+
+def test_concurrent_uploads_share_one_call():
+    cache = TranscriptCache()
+    calls = 0
+
+    async def transcribe():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "hello there"
+
+    async def main():
+        return await asyncio.gather(*(cache.get_or_transcribe(b"shared clip", transcribe) for _ in range(3)))
+
+    assert asyncio.run(main()) == ["hello there"] * 3
+    assert calls == 1
+
+
+def test_follower_takes_over_when_the_leader_is_cancelled():
+    cache = TranscriptCache()
+    calls = 0
+
+    async def transcribe():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return f"transcript {calls}"
+
+    async def main():
+        leader = asyncio.create_task(cache.get_or_transcribe(b"retried clip", transcribe))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(cache.get_or_transcribe(b"retried clip", transcribe))
+        await asyncio.sleep(0.01)
+        # e.g. the first attempt's client disconnected
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(main()) == "transcript 2"
+    assert calls == 2
+
+
+def test_cancelled_follower_does_not_cancel_the_call():
+    cache = TranscriptCache()
+
+    async def transcribe():
+        await asyncio.sleep(0.02)
+        return "still here"
+
+    async def main():
+        leader = asyncio.create_task(cache.get_or_transcribe(b"another clip", transcribe))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(cache.get_or_transcribe(b"another clip", transcribe))
+        await asyncio.sleep(0.005)
+        follower.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await follower
+        return await leader
+
+    assert asyncio.run(main()) == "still here"
@@ -0,0 +1,103 @@
+import asyncio
+
+import services.tts_batch as tts_batch
+from exceptions.base import DeadlineExceeded
+from services.tts_batch import FAILED, INVALID, OK, TIMEOUT, TTSBatch
+
+
+def run_batch(batch: TTSBatch):
+    async def consume():
+        return [job async for job in batch.run()]
+    return asyncio.run(consume())
+
+
+def test_identical_items_are_synthesized_once(monkeypatch):
+    calls = []
+
+    async def synthesize(text, voice_id, **kwargs):
+        calls.append((text, voice_id))
+        return b"audio:" + text.encode()
+
+    monkeypatch.setattr(tts_batch, "synthesize", synthesize)
+    batch = TTSBatch([("Hello", "v1"), ("  Hello ", "v1"), ("Hello", "v2"), ("Bye", "v1")], api_key=None)
+
+    assert len(batch.jobs) == 3
+    run_batch(batch)
+    assert sorted(calls) == [("Bye", "v1"), ("Hello", "v1"), ("Hello", "v2")]
+
+    items = batch.item_statuses()
+    assert [item["status"] for item in items] == [OK] * 4
+    assert items[0]["id"] == items[1]["id"] != items[2]["id"]
+
+
+def test_statuses_follow_request_order(monkeypatch):
+    async def synthesize(text, voice_id, **kwargs):
+        if text == "fail":
+            return None
+        if text == "slow":
+            raise DeadlineExceeded("tts")
+        if text == "boom":
+            raise RuntimeError("upstream")
+        return b"audio"
+
+    monkeypatch.setattr(tts_batch, "synthesize", synthesize)
+    batch = TTSBatch([("ok", "v"), ("", "v"), ("fail", "v"), ("slow", "v"), ("boom", "v"), ("ok", "")], api_key=None)
+    run_batch(batch)
+
+    summary = batch.summary()
+    assert [item["status"] for item in summary["items"]] == [OK, INVALID, FAILED, TIMEOUT, FAILED, INVALID]
+    assert [item["index"] for item in summary["items"]] == list(range(6))
+    assert all(item["id"] is None for item in summary["items"][1:])
+    assert summary["succeeded"] == 1
+    assert summary["unique"] == 4
+
+
+def test_concurrency_is_bounded(monkeypatch):
+    active = peak = 0
+
+    async def synthesize(text, voice_id, **kwargs):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return b"audio"
+
+    monkeypatch.setattr(tts_batch, "synthesize", synthesize)
+    batch = TTSBatch([(f"text {i}", "v") for i in range(10)], api_key=None, concurrency=3)
+    run_batch(batch)
+    assert peak == 3
+
+
+def batch_app():
+    from fastapi import FastAPI
+    from routes.text_speech_routes import router
+
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    return app
+
+
+def test_batch_accepts_long_passages(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    async def synthesize(text, voice_id, **kwargs):
+        return b"audio"
+
+    monkeypatch.setattr(tts_batch, "synthesize", synthesize)
+    long_text = "A sentence that goes on for a while. " * 200
+    assert len(long_text) > 5000
+
+    res = TestClient(batch_app()).post("/api/speech/batch", json={"items": [{"text": long_text}]})
+    assert res.status_code == 200
+    assert res.json()["succeeded"] == 1
+
+
+def test_batch_rejects_items_over_the_abuse_guard(monkeypatch):
+    from fastapi.testclient import TestClient
+    import routes.text_speech_routes as routes
+
+    monkeypatch.setattr(routes, "MAX_TEXT_CHARS", 100)
+    res = TestClient(batch_app()).post("/api/speech/batch", json={"items": [{"text": "ok"}, {"text": "x" * 101}]})
+    assert res.status_code == 413
+    assert res.json()["items"] == [1]
@@ -0,0 +1,37 @@
+import asyncio
+
+import services.tts_service as tts_service
+from services.tts_service import synthesize_stream
+
+MP3_FRAME = b"\xff\xfb\x90\x00"
+
+
+def sentence(i: int) -> str:
+    return f"This is sentence number {i} of a long passage that is read out loud."
+
+
+def test_text_longer_than_5000_chars_streams_every_segment(monkeypatch):
+    text = " ".join(sentence(i) for i in range(200))
+    assert len(text) > 5000
+    synthesized = []
+
+    async def stream_segment(segment, *args):
+        synthesized.append(segment)
+        yield MP3_FRAME + segment.encode()
+
+    async def synthesize_segment(segment, *args):
+        synthesized.append(segment)
+        await asyncio.sleep(0)
+        return MP3_FRAME + segment.encode()
+
+    monkeypatch.setattr(tts_service, "_stream_segment", stream_segment)
+    monkeypatch.setattr(tts_service, "_synthesize_segment", synthesize_segment)
+
+    async def consume():
+        return [chunk async for chunk in synthesize_stream(text, "voice", client=object())]
+
+    chunks = asyncio.run(consume())
+    assert len(chunks) == len(synthesized) > 5
+    # Every segment arrives, in order, and nothing is dropped
+    spoken = " ".join(chunk[len(MP3_FRAME):].decode() for chunk in chunks)
+    assert spoken == text
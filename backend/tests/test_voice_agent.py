@@ -0,0 +1,45 @@
+import asyncio
+
+from routes.voice_agent import ERROR_REPLY, VoiceAgentOrchestrator
+from services.conversation import ConversationStore
+from services.response_shaper import get_response_shaper
+
+
+class StubAgent:
+    def __init__(self, reply: str):
+        self.reply = reply
+
+    async def generate_direct_response(self, text, history=""):
+        return self.reply
+
+    async def generate_response(self, text, history=""):
+        return self.reply
+
+    async def synthesize_speech(self, text, voice_id, audio_format=None):
+        return None
+
+
+def orchestrator(reply: str) -> VoiceAgentOrchestrator:
+    orchestrator = VoiceAgentOrchestrator.__new__(VoiceAgentOrchestrator)
+    orchestrator.agent = StubAgent(reply)
+    orchestrator.conversations = ConversationStore()
+    orchestrator.shaper = get_response_shaper()
+    orchestrator.router = None
+    return orchestrator
+
+
+def turns(orchestrator: VoiceAgentOrchestrator, session_id: str) -> int:
+    return len(asyncio.run(orchestrator.conversations.load(session_id))[1].turns)
+
+
+def test_answered_turn_is_kept_in_the_session():
+    agent = orchestrator("Paris is the capital of France.")
+    response = asyncio.run(agent.respond("What is the capital of France?", "voice", None))
+    assert turns(agent, response.sessionId) == 1
+
+
+def test_error_fallback_is_not_saved_as_an_assistant_turn():
+    agent = orchestrator(ERROR_REPLY)
+    response = asyncio.run(agent.respond("What is the capital of France?", "voice", None))
+    assert response.text == ERROR_REPLY
+    assert turns(agent, response.sessionId) == 0
@@ -0,0 +1,45 @@
+import asyncio
+
+import pytest
+
+from services.web_search import SearchBackend, WebSearchService
+
+
+class SlowBackend(SearchBackend):
+    def __init__(self):
+        self.calls = 0
+
+    async def search(self, query: str, max_results: int):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        return [{"title": f"Result {self.calls}", "body": query}]
+
+
+def test_identical_queries_share_one_call():
+    backend = SlowBackend()
+    service = WebSearchService(backend, timeout=1.0)
+
+    async def main():
+        return await asyncio.gather(service.search("Shared query?"), service.search("shared   query"))
+
+    first, second = asyncio.run(main())
+    assert first == second == "Result 1: Shared query?"
+    assert backend.calls == 1
+
+
+def test_follower_searches_itself_when_the_leader_is_cancelled():
+    backend = SlowBackend()
+    service = WebSearchService(backend, timeout=1.0)
+
+    async def main():
+        leader = asyncio.create_task(service.search("cancelled leader"))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(service.search("cancelled leader"))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(main()) == "Result 2: cancelled leader"
+    assert backend.calls == 2
@@ -0,0 +1,8 @@
+from contextvars import ContextVar
+from typing import List, Optional
+
+# Set per request by RequestIDMiddleware; copied into asyncio tasks and to_thread workers
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+# Completed (stage, seconds) spans for the current request, used for Server-Timing
+request_spans_var: ContextVar[Optional[List[tuple]]] = ContextVar("request_spans", default=None)
@@ -0,0 +1,69 @@
+import os
+import time
+import asyncio
+from contextvars import ContextVar
+from typing import Awaitable, Optional, TypeVar
+
+from exceptions.base import DeadlineExceeded
+
+T = TypeVar("T")
+
+# Share of the *remaining* request budget a stage may use when it starts.
+# Later stages get whatever is left, so an early slow stage can't starve them silently.
+STAGE_BUDGETS = {
+    "transcribe": 0.3,
+    "retrieve": 0.25,
+    "search": 0.3,
+    "llm": 0.7,
+    "tts": 1.0,
+}
+
+# Never hand an upstream call less than this; fail fast instead
+MIN_STAGE_SECONDS = 0.5
+
+
+class Deadline:
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def stage_timeout(self, stage: str, cap: Optional[float] = None) -> float:
+        remaining = self.remaining()
+        if remaining < MIN_STAGE_SECONDS:
+            raise DeadlineExceeded(f"No time left for {stage}")
+        budget = max(MIN_STAGE_SECONDS, remaining * STAGE_BUDGETS.get(stage, 1.0))
+        return min(budget, cap) if cap else budget
+
+
+def default_deadline_seconds() -> float:
+    return float(os.getenv("REQUEST_DEADLINE_SECONDS", "60"))
+
+
+deadline_var: ContextVar[Optional[Deadline]] = ContextVar("deadline", default=None)
+
+
+def current_deadline() -> Deadline:
+    """The request's deadline, or a fresh default one outside a request (scripts, warmup)."""
+    deadline = deadline_var.get()
+    if deadline is None:
+        deadline = Deadline(default_deadline_seconds())
+    return deadline
+
+
+def stage_timeout(stage: str, cap: Optional[float] = None) -> float:
+    return current_deadline().stage_timeout(stage, cap)
+
+
+async def run_stage(stage: str, awaitable: Awaitable[T], cap: Optional[float] = None) -> T:
+    """Await `awaitable` within the stage's share of the request budget."""
+    timeout = stage_timeout(stage, cap)
+    try:
+        return await asyncio.wait_for(awaitable, timeout=timeout)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded(f"{stage} exceeded its {timeout:.1f}s budget")
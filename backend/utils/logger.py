@@ -1,17 +1,164 @@
-import logging
+import os
 import sys
-from datetime import datetime
+import json
+import copy
+import queue
+import atexit
+import logging
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+from utils.context import request_id_var
+
+# Longest message / traceback shipped per record; agent traces can be megabytes
+MAX_FIELD_CHARS = int(os.getenv("LOG_MAX_FIELD_CHARS", "2000"))
+
+
+class RequestIDFilter(logging.Filter):
+    """Stamp every record with the request ID of the current context"""
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep 1 in N records below WARNING for the configured loggers.
+
+    Rates come from LOG_SAMPLE, e.g. "httpx=0.1,langchain=0.01"; a rate
+    applies to that logger and its children. Warnings and errors always pass.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.every = {name: max(1, round(1 / rate)) for name, rate in rates.items() if rate > 0}
+        self.dropped_all = {name for name, rate in rates.items() if rate <= 0}
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "SamplingFilter":
+        rates = {}
+        for item in os.getenv("LOG_SAMPLE", "").split(","):
+            name, _, rate = item.partition("=")
+            if name.strip() and rate.strip():
+                rates[name.strip()] = float(rate)
+        return cls(rates)
+
+    def _rule(self, name: str) -> Optional[str]:
+        while name:
+            if name in self.every or name in self.dropped_all:
+                return name
+            name = name.rpartition(".")[0]
+        return None
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rule = self._rule(record.name)
+        if rule is None:
+            return True
+        if rule in self.dropped_all:
+            return False
+        with self._lock:
+            count = self._counts.get(rule, 0)
+            self._counts[rule] = count + 1
+        return count % self.every[rule] == 0
+
+
+def _cap(text: str) -> str:
+    if len(text) <= MAX_FIELD_CHARS:
+        return text
+    return f"{text[:MAX_FIELD_CHARS]}… [{len(text) - MAX_FIELD_CHARS} chars truncated]"
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, request_id, msg (+ exc)."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "msg": record.getMessage(),
+        }
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__('%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s')
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Runs on the caller's thread: stamps, samples and caps the record, then
+    hands it to the listener thread. A full queue drops the record rather
+    than blocking the event loop.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = _cap(record.getMessage())
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _cap(logging.Formatter().formatException(record.exc_info))
+        record.exc_info = None
+        record.stack_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener: Optional[QueueListener] = None
+
 
 def setup_logging():
-    """Configure logging for the application"""
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler('app.log'),
-            logging.StreamHandler(sys.stdout)
-        ]
-    )
+    """
+    Configure logging for the application (idempotent).
+
+    Handlers that touch stdout or disk run on a background listener thread;
+    request handlers only pay for a queue put. LOG_FORMAT=text gives the
+    old human-readable lines, LOG_FILE='' turns off the file handler.
+    """
+    global _listener
+    if _listener is not None:
+        return logging.getLogger(__name__)
+
+    formatter = TextFormatter() if os.getenv("LOG_FORMAT", "json") == "text" else JSONFormatter()
+
+    handlers = [logging.StreamHandler(sys.stdout)]
+    log_file = os.getenv("LOG_FILE", "app.log")
+    if log_file:
+        handlers.append(logging.FileHandler(log_file))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=int(os.getenv("LOG_QUEUE_SIZE", "10000"))))
+    queue_handler.addFilter(RequestIDFilter())
+    queue_handler.addFilter(SamplingFilter.from_env())
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+
+    _listener = QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
     return logging.getLogger(__name__)
 
 logger = setup_logging()
@@ -26,4 +173,4 @@ def log_error(error: Exception, context: str = ""):
 
 def log_api_call(service: str, status: str):
     """Log external API calls"""
-    logger.info(f"{service} API call - Status: {status}")
\ No newline at end of file
+    logger.info(f"{service} API call - Status: {status}")
@@ -0,0 +1,129 @@
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from utils.context import request_id_var, request_spans_var
+from utils.logger import logger
+
+# Span lines get their own logger so LOG_SAMPLE can thin them out
+# ("voice_agent.tracing=0.1") without touching the rest of the app log
+span_logger = logging.getLogger("voice_agent.tracing")
+
+# Seconds; covers cache hits through slow LLM/TTS calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus exposition format."""
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...], buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # one counter per bucket, then +Inf, sum
+                series = self._series[labels] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                base = ",".join(f'{k}="{v}"' for k, v in zip(self.label_names, labels))
+                sep = "," if base else ""
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f'{self.name}_bucket{{{base}{sep}le="{bound}"}} {int(count)}')
+                lines.append(f'{self.name}_bucket{{{base}{sep}le="+Inf"}} {int(series[-2])}')
+                lines.append(f"{self.name}_count{{{base}}} {int(series[-2])}")
+                lines.append(f"{self.name}_sum{{{base}}} {round(series[-1], 6)}")
+        return lines
+
+
+class Tracer:
+    """
+    Built-in span recorder for pipeline stages.
+
+    Every span feeds a per-stage histogram, is logged with the current
+    request ID, and is mirrored to OpenTelemetry when OTEL_ENABLED=1 and
+    the SDK is installed.
+    """
+
+    def __init__(self):
+        self.stage_seconds = Histogram(
+            "pipeline_stage_duration_seconds",
+            "Duration of each pipeline stage (upload_read, transcribe, retrieve, llm, tts, encode)",
+            ("stage",),
+        )
+        self.request_seconds = Histogram(
+            "http_request_duration_seconds",
+            "End-to-end HTTP request duration",
+            ("method", "path", "status"),
+        )
+        self._otel = self._load_otel()
+
+    @staticmethod
+    def _load_otel():
+        if os.getenv("OTEL_ENABLED") != "1":
+            return None
+        try:
+            from opentelemetry import trace
+            return trace.get_tracer("voice-agent")
+        except ImportError:
+            logger.warning("OTEL_ENABLED=1 but opentelemetry is not installed")
+            return None
+
+    @contextmanager
+    def span(self, stage: str, **attributes) -> Iterator[None]:
+        otel_span = self._otel.start_as_current_span(stage, attributes=attributes) if self._otel else None
+        if otel_span:
+            otel_span.__enter__()
+
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            yield
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self.stage_seconds.observe(elapsed, stage)
+
+            spans = request_spans_var.get()
+            if spans is not None:
+                spans.append((stage, elapsed))
+
+            span_logger.info(f"span stage={stage} duration={elapsed:.3f}s status={status}")
+            if otel_span:
+                otel_span.__exit__(None, None, None)
+
+    def observe_request(self, method: str, path: str, status: int, seconds: float):
+        self.request_seconds.observe(seconds, method, path, str(status))
+
+    def render_prometheus(self) -> str:
+        return "\n".join(self.stage_seconds.render() + self.request_seconds.render()) + "\n"
+
+
+def server_timing(spans: Optional[List[tuple]]) -> str:
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in (spans or []))
+
+
+def current_request_id() -> str:
+    return request_id_var.get()
+
+
+tracer = Tracer()
@@ -0,0 +1,78 @@
+import os
+from typing import Optional
+
+import httpx
+
+# Base URLs default to the real services; override them to point the app at
+# local fakes (see benchmarks/fake_upstreams.py) or a regional proxy.
+# Read lazily because main.py loads .env after the routers are imported.
+
+
+def elevenlabs_base_url() -> str:
+    return os.getenv("ELEVENLABS_BASE_URL", "https://api.elevenlabs.io/v1").rstrip("/")
+
+
+def search_base_url() -> Optional[str]:
+    return os.getenv("SEARCH_BASE_URL")
+
+
+def gemini_client_kwargs() -> dict:
+    """Extra kwargs for genai.configure / LangChain Gemini clients."""
+    endpoint = os.getenv("GEMINI_API_ENDPOINT")
+    if not endpoint:
+        return {}
+    return {
+        "transport": "rest",
+        "client_options": {"api_endpoint": endpoint},
+    }
+
+
+def gemini_async_supported() -> bool:
+    """
+    False under the REST transport used for GEMINI_API_ENDPOINT: its
+    generate_content_async returns objects LangChain cannot await, so
+    callers run the sync client on a thread instead.
+    """
+    return not os.getenv("GEMINI_API_ENDPOINT")
+
+
+def pinecone_index(api_key: str) -> Optional[object]:
+    """Index handle bound to PINECONE_INDEX_HOST, or None to resolve by name."""
+    host = os.getenv("PINECONE_INDEX_HOST")
+    if not host:
+        return None
+    from pinecone import Pinecone
+    return Pinecone(api_key=api_key).Index(host=host)
+
+
+# --------------------------------------------------
+# SHARED HTTP CLIENT
+# --------------------------------------------------
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    One pooled client per worker for ElevenLabs and other HTTP upstreams.
+
+    Connections are kept alive long enough for the keep-warm task
+    (services/warmup.py) to stop them from going cold between requests.
+    """
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=30.0,
+            limits=httpx.Limits(
+                max_connections=int(os.getenv("UPSTREAM_MAX_CONNECTIONS", "100")),
+                max_keepalive_connections=int(os.getenv("UPSTREAM_MAX_KEEPALIVE", "20")),
+                keepalive_expiry=float(os.getenv("UPSTREAM_KEEPALIVE_SECONDS", "120")),
+            ),
+        )
+    return _http_client
+
+
+async def close_http_client():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
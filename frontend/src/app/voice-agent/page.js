@@ -12,6 +12,8 @@ export default function VoiceAgentPage() {
   const [text, setText] = useState("");
   const [input, setInput] = useState("");
   const [loading, setLoading] = useState(false);
+  // Server-issued conversation ID so follow-up turns keep context
+  const [sessionId, setSessionId] = useState(null);
 
   const { voices, selectedVoice, setSelectedVoice } = useVoices();
   const currentAudioRef = useRef(null);
@@ -38,6 +40,7 @@ export default function VoiceAgentPage() {
 
       setText(`🗣 You: ${data.userText}\n\n🤖 AI: ${data.text}`);
       setAudioURL(data.audio);
+      if (data.sessionId) setSessionId(data.sessionId);
       setInput("");
     } catch (err) {
       console.error(err);
@@ -57,6 +60,7 @@ export default function VoiceAgentPage() {
     const body = JSON.stringify({
       text: input,
       voiceId: selectedVoice,
+      ...(sessionId && { sessionId }),
     });
 
     await sendRequest(`${BACKEND}/text-agent`, body, true);
@@ -69,6 +73,7 @@ export default function VoiceAgentPage() {
     const form = new FormData();
     form.append("file", blob, "input.webm");
     form.append("voiceId", selectedVoice);
+    if (sessionId) form.append("sessionId", sessionId);
 
     await sendRequest(`${BACKEND}/voice-agent`, form);
   };